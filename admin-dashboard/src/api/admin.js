@@ -1,10 +1,9 @@
 // src/api/admin.js
-import client from "./client";
+import client, { getAllPages } from "./client";
 
 // List all admins
 export const getAdmins = async () => {
-  const res = await client.get("/admin/admins");
-  return res.data;
+  return getAllPages(client, "/admin/admins");
 };
 
 // Create new admin
@@ -1,10 +1,10 @@
 import axios from "axios";
+import { getAllPages } from "./client";
 
 const API_BASE = "http://127.0.0.1:8000";
 
 export const getAssignments = async () => {
-  const response = await axios.get(`${API_BASE}/assign/assignments`);
-  return response.data;
+  return getAllPages(axios, `${API_BASE}/assign/assignments`);
 };
 
 export const getAssignmentById = async (assignmentId) => {
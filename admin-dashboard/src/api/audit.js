@@ -1,4 +1,5 @@
 import axios from "axios";
+import { getAllPages } from "./client";
 
 const API_BASE = "http://127.0.0.1:8000";
 
@@ -11,8 +12,7 @@ export const createAuditLog = async (log) => {
 
 // ---------------- List Audit Logs ----------------
 export const listAuditLogs = async () => {
-  const response = await axios.get(`${API_BASE}/audit/`);
-  return response.data;
+  return getAllPages(axios, `${API_BASE}/audit/`);
 };
 
 // ---------------- Get Audit Log by ID ----------------
@@ -17,4 +17,22 @@ client.interceptors.request.use((config) => {
   return config;
 });
 
+// List endpoints return one page at a time and put the cursor of the next
+// page in the X-Next-Cursor header; follow it until the list is complete.
+export const PAGE_LIMIT = 1000;
+
+export const getAllPages = async (http, url, config = {}) => {
+  const items = [];
+  let cursor;
+  do {
+    const res = await http.get(url, {
+      ...config,
+      params: { ...config.params, limit: PAGE_LIMIT, ...(cursor ? { cursor } : {}) },
+    });
+    items.push(...res.data);
+    cursor = res.headers["x-next-cursor"];
+  } while (cursor);
+  return items;
+};
+
 export default client;
@@ -1,10 +1,9 @@
 // src/api/conductor.js
-import client from "./client";
+import client, { getAllPages } from "./client";
 
 // List conductors
 export const getConductors = async () => {
-  const res = await client.get("/admin/conductors");
-  return res.data;
+  return getAllPages(client, "/admin/conductors");
 };
 
 // Create conductor
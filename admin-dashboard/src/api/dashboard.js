@@ -1,4 +1,5 @@
 import axios from "axios";
+import { getAllPages } from "./client";
 
 const API_BASE = "http://127.0.0.1:8000/admin";
 
@@ -6,20 +7,20 @@ const API_BASE = "http://127.0.0.1:8000/admin";
 export const getDashboardSummary = async () => {
   const [drivers, conductors, passengers, vehicles, devices, sessions] =
     await Promise.all([
-      axios.get(`${API_BASE}/drivers`),
-      axios.get(`${API_BASE}/conductors`),
-      axios.get(`${API_BASE}/passengers`),
-      axios.get(`${API_BASE}/vehicles`),
-      axios.get(`${API_BASE}/devices`),
-      axios.get(`${API_BASE}/sessions`),
+      getAllPages(axios, `${API_BASE}/drivers`),
+      getAllPages(axios, `${API_BASE}/conductors`),
+      getAllPages(axios, `${API_BASE}/passengers`),
+      getAllPages(axios, `${API_BASE}/vehicles`),
+      getAllPages(axios, `${API_BASE}/devices`),
+      getAllPages(axios, `${API_BASE}/sessions`),
     ]);
 
   return {
-    drivers: drivers.data.length,
-    conductors: conductors.data.length,
-    passengers: passengers.data.length,
-    vehicles: vehicles.data.length,
-    devices: devices.data.length,
-    sessions: sessions.data.length,
+    drivers: drivers.length,
+    conductors: conductors.length,
+    passengers: passengers.length,
+    vehicles: vehicles.length,
+    devices: devices.length,
+    sessions: sessions.length,
   };
 };
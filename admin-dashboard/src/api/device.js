@@ -1,9 +1,8 @@
-import axios from "./client";
+import axios, { getAllPages } from "./client";
 
 // Fetch all devices
 export const getDevices = async () => {
-  const res = await axios.get("/device/");
-  return res.data;
+  return getAllPages(axios, "/device/");
 };
 
 // Fetch device by ID
@@ -1,10 +1,9 @@
 // src/api/driver.js
-import client from "./client";
+import client, { getAllPages } from "./client";
 
 // List all drivers
 export const getDrivers = async () => {
-  const res = await client.get("/admin/drivers");
-  return res.data;
+  return getAllPages(client, "/admin/drivers");
 };
 
 // Create new driver
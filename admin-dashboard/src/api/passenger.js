@@ -1,10 +1,9 @@
 // src/api/passenger.js
-import client from "./client";
+import client, { getAllPages } from "./client";
 
 // List passengers
 export const getPassengers = async () => {
-  const res = await client.get("/admin/passengers");
-  return res.data;
+  return getAllPages(client, "/admin/passengers");
 };
 
 // Get single passenger
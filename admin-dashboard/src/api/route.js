@@ -1,9 +1,8 @@
-import client from "./client";
+import client, { getAllPages } from "./client";
 
 // List all routes
 export const getRoutes = async () => {
-  const res = await client.get("/routes");
-  return res.data;
+  return getAllPages(client, "/routes");
 };
 
 // Create new route
@@ -1,12 +1,11 @@
 // src/api/session.js
-import client from "./client";
+import client, { getAllPages } from "./client";
 
 const BASE = "/session";
 
 // ---------------- List Sessions ----------------
 export const getSessions = async () => {
-  const res = await client.get(`${BASE}/`);
-  return res.data;
+  return getAllPages(client, `${BASE}/`);
 };
 
 // ---------------- Create / Start Session ----------------
@@ -1,10 +1,9 @@
 // src/api/vehicle.js
-import client from "./client";
+import client, { getAllPages } from "./client";
 
 // List all vehicles
 export const getVehicles = async () => {
-  const res = await client.get("/vehicle");
-  return res.data;
+  return getAllPages(client, "/vehicle");
 };
 
 // Get single vehicle
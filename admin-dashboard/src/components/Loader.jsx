@@ -20,6 +20,8 @@ import {
   Divider,
 } from "@mui/material";
 import NotificationsIcon from "@mui/icons-material/Notifications";
+import axios from "axios";
+import { getAllPages } from "../api/client";
 
 // Use Vite's import.meta.env for environment variables
 const NOTIF_API_URL = import.meta.env.VITE_API_BASE_URL
@@ -43,19 +45,15 @@ export default function NotificationLayout({ navbarHeight = 72 }) {
 
     const fetchNotifications = async () => {
       try {
-        const res = await fetch(NOTIF_API_URL);
-        if (res.status === 404) return;
-        if (res.ok) {
-          const data = await res.json();
-          if (!isMounted) return;
-          setNotifications(data);
-          if (data.length > 0) {
-            const newest = data[data.length - 1];
-            if (lastNotifIdRef.current !== newest.id) {
-              setLatest(newest);
-              setOpen(true);
-              lastNotifIdRef.current = newest.id;
-            }
+        const data = await getAllPages(axios, NOTIF_API_URL);
+        if (!isMounted) return;
+        setNotifications(data);
+        if (data.length > 0) {
+          const newest = data[data.length - 1];
+          if (lastNotifIdRef.current !== newest.id) {
+            setLatest(newest);
+            setOpen(true);
+            lastNotifIdRef.current = newest.id;
           }
         }
       } catch (e) {}
@@ -97,8 +95,7 @@ export default function NotificationLayout({ navbarHeight = 72 }) {
 
   const handleBellClick = () => {
     setDialogOpen(true);
-    fetch(NOTIF_API_URL)
-      .then((res) => (res.ok ? res.json() : []))
+    getAllPages(axios, NOTIF_API_URL)
       .then((data) => setNotifications(data))
       .catch(() => {});
   };
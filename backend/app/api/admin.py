@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Response
 from typing import List
 from app.schemas.user import (
     AdminCreate, AdminResponse,
@@ -10,6 +10,7 @@ from app.crud import admin as admin_crud
 from app.crud import driver as driver_crud
 from app.crud import conductor as conductor_crud
 from app.crud import passenger as passenger_crud
+from app.utils.pagination import PageParams, paged
 
 router = APIRouter()
 
@@ -23,8 +24,8 @@ async def create_admin(admin: AdminCreate):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/admins", response_model=List[AdminResponse])
-async def list_admins():
-    return await admin_crud.list_admins()
+async def list_admins(response: Response, page: PageParams = Depends()):
+    return await paged(response, page, admin_crud.list_admins(page), AdminResponse)
 
 @router.get("/admins/{admin_id}", response_model=AdminResponse)
 async def get_admin(admin_id: str):
@@ -58,8 +59,8 @@ async def create_driver(driver: DriverCreate):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/drivers", response_model=List[DriverResponse])
-async def list_drivers():
-    return await driver_crud.list_drivers()
+async def list_drivers(response: Response, page: PageParams = Depends()):
+    return await paged(response, page, driver_crud.list_drivers(page), DriverResponse)
 
 @router.get("/drivers/{driver_id}", response_model=DriverResponse)
 async def get_driver(driver_id: str):
@@ -96,8 +97,8 @@ async def create_conductor(conductor: ConductorCreate):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/conductors", response_model=List[ConductorResponse])
-async def list_conductors():
-    return await conductor_crud.list_conductors()
+async def list_conductors(response: Response, page: PageParams = Depends()):
+    return await paged(response, page, conductor_crud.list_conductors(page), ConductorResponse)
 
 @router.get("/conductors/{conductor_id}", response_model=ConductorResponse)
 async def get_conductor(conductor_id: str):
@@ -126,8 +127,8 @@ async def delete_conductor(conductor_id: str):
 
 # ------------------- Passengers -------------------
 @router.get("/passengers", response_model=List[PassengerResponse])
-async def list_passengers():
-    return await passenger_crud.list_passengers()
+async def list_passengers(response: Response, page: PageParams = Depends()):
+    return await paged(response, page, passenger_crud.list_passengers(page), PassengerResponse)
 
 @router.get("/passengers/{passenger_id}", response_model=PassengerResponse)
 async def get_passenger(passenger_id: str):
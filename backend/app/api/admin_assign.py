@@ -1,9 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Response
 from typing import List
 from app.schemas.admin_assign import DeviceAssignment, DeviceAttestation, AssignmentCreate, AssignmentResponse
 from app.crud import admin_assign as admin_assign_crud
 from app.schemas.device import DeviceResponse
 from app.schemas.vehicle import VehicleResponse
+from app.utils.pagination import PageParams, paged
 
 router = APIRouter()
 
@@ -60,8 +61,8 @@ async def assign_driver(assignment: AssignmentCreate):
 
 # ---------------- List Assignments ----------------
 @router.get("/assignments", response_model=List[AssignmentResponse])
-async def list_assignments():
-    return await admin_assign_crud.list_assignments()
+async def list_assignments(response: Response, page: PageParams = Depends()):
+    return await paged(response, page, admin_assign_crud.list_assignments(page), AssignmentResponse)
 
 # ---------------- Get Assignment by ID ----------------
 @router.get("/assignments/{assignment_id}", response_model=AssignmentResponse)
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, HTTPException, Depends, Response
+from typing import List, Optional
+from app.crud import anchor as anchor_crud
+from app.schemas.anchor import AnchorResponse, AnchoredEventKind, InclusionProofResponse
+from app.utils.pagination import PageParams, paged
+
+router = APIRouter()
+
+# ---------------- List Anchors ----------------
+@router.get("/", response_model=List[AnchorResponse])
+async def list_anchors(response: Response, page: PageParams = Depends(), status: Optional[str] = None):
+    return await paged(response, page, anchor_crud.list_anchors(page, status), AnchorResponse)
+
+# ---------------- Anchor Now ----------------
+@router.post("/run", response_model=Optional[AnchorResponse])
+async def anchor_now():
+    """
+    Anchor the pending events without waiting for the next cycle;
+    null when there is nothing to anchor
+    """
+    return await anchor_crud.anchor_now()
+
+# ---------------- Inclusion Proof ----------------
+@router.get("/proof/{kind}/{event_id}", response_model=InclusionProofResponse)
+async def get_inclusion_proof(kind: AnchoredEventKind, event_id: str):
+    """
+    Merkle proof that an audit record or assignment is in an anchored root,
+    checked against the root and against the event as stored now
+    """
+    proof = await anchor_crud.get_inclusion_proof(kind.value, event_id)
+    if not proof:
+        raise HTTPException(status_code=404, detail="Event has not been anchored")
+    return proof
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from typing import List, Optional
 from app.crud import audit as audit_crud
-from app.schemas.audit import AuditLogCreate, AuditLogResponse
+from app.schemas.audit import AuditLogCreate, AuditLogResponse, AuditChainReport
+from app.schemas.export import ExportFormat
+from app.utils.export import export_response
+from app.utils.pagination import PageParams, paged
 
 router = APIRouter()
 
@@ -20,8 +24,45 @@ async def create_audit_log(data: AuditLogCreate):
 
 # ---------------- List Audit Logs ----------------
 @router.get("/", response_model=List[AuditLogResponse])
-async def list_audit_logs():
-    return await audit_crud.list_audit_logs()
+async def list_audit_logs(
+    response: Response, page: PageParams = Depends(), user_id: Optional[str] = None, action: Optional[str] = None
+):
+    return await paged(response, page, audit_crud.list_audit_logs(page, user_id, action), AuditLogResponse)
+
+# ---------------- Export Audit Logs ----------------
+@router.get("/export")
+async def export_audit_logs(
+    format: ExportFormat = ExportFormat.ndjson,
+    gzip: bool = False,
+    user_id: Optional[str] = None,
+    action: Optional[str] = None,
+    session_id: Optional[str] = None,
+    vehicle_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """
+    Stream matching audit logs (oldest first) as NDJSON or CSV, optionally gzipped
+    """
+    if format == ExportFormat.trace:
+        raise HTTPException(status_code=400, detail="Trace format is only available for telemetry")
+    cursor = audit_crud.export_audit_cursor(user_id, action, session_id, vehicle_id, since, until)
+    return export_response(
+        cursor, audit_crud.serialize, format.value, "audit_logs",
+        columns=audit_crud.AUDIT_EXPORT_COLUMNS, compress=gzip,
+    )
+
+# ---------------- Verify Audit Chain ----------------
+@router.get("/verify", response_model=AuditChainReport)
+async def verify_audit_chain(from_seq: int = Query(1, ge=1), to_seq: Optional[int] = Query(None, ge=1)):
+    """
+    Re-hash a range of the audit chain (the whole chain by default) and
+    report the first record that is missing, altered or out of line
+    """
+    try:
+        return await audit_crud.verify_audit_chain(from_seq, to_seq)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # ---------------- Get Audit Log by ID ----------------
 @router.get("/{audit_id}", response_model=AuditLogResponse)
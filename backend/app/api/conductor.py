@@ -1,7 +1,8 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Response
 from typing import List
 from app.schemas.user import ConductorCreate, ConductorResponse
 from app.crud import conductor as conductor_crud
+from app.utils.pagination import PageParams, paged
 
 router = APIRouter()
 
@@ -14,8 +15,8 @@ async def create_conductor(conductor: ConductorCreate):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/", response_model=List[ConductorResponse])
-async def list_conductors():
-    return await conductor_crud.list_conductors()
+async def list_conductors(response: Response, page: PageParams = Depends()):
+    return await paged(response, page, conductor_crud.list_conductors(page), ConductorResponse)
 
 @router.get("/{conductor_id}", response_model=ConductorResponse)
 async def get_conductor(conductor_id: str):
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Response
+from typing import List, Optional
 from app.schemas.device import DeviceCreate, DeviceResponse, DeviceUpdate, DeviceAssignment, DeviceAttestation
 from app.crud import device as device_crud
+from app.utils.pagination import PageParams, paged
 
 router = APIRouter()
 
@@ -15,8 +16,8 @@ async def register_device(device: DeviceCreate):
 
 # ---------------- List Devices ----------------
 @router.get("/", response_model=List[DeviceResponse])
-async def list_devices():
-    return await device_crud.list_devices()
+async def list_devices(response: Response, page: PageParams = Depends(), user_id: Optional[str] = None):
+    return await paged(response, page, device_crud.list_devices(page, user_id), DeviceResponse)
 
 # ---------------- Get Device by ID ----------------
 @router.get("/{device_id}", response_model=DeviceResponse)
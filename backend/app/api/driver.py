@@ -1,7 +1,8 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Response
 from typing import List
 from app.schemas.user import DriverCreate, DriverResponse
 from app.crud import driver as driver_crud
+from app.utils.pagination import PageParams, paged
 
 router = APIRouter()
 
@@ -14,8 +15,8 @@ async def create_driver(driver: DriverCreate):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/", response_model=List[DriverResponse])
-async def list_drivers():
-    return await driver_crud.list_drivers()
+async def list_drivers(response: Response, page: PageParams = Depends()):
+    return await paged(response, page, driver_crud.list_drivers(page), DriverResponse)
 
 @router.get("/{driver_id}", response_model=DriverResponse)
 async def get_driver(driver_id: str):
@@ -0,0 +1,109 @@
+import json
+
+import anyio
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from app.config import LIVE_KEEPALIVE_SECONDS
+from app.services.live_hub import Subscriber, live_hub
+
+router = APIRouter()
+
+
+def _ids(value: Optional[str]) -> List[str]:
+    return [part.strip() for part in value.split(",") if part.strip()] if value else []
+
+
+def _id_list(request: dict, key: str) -> list:
+    """
+    A WebSocket subscription field: a list of string or integer ids
+    """
+    value = request.get(key) or []
+    if not isinstance(value, list) or not all(isinstance(v, (str, int)) and not isinstance(v, bool) for v in value):
+        raise ValueError(f"'{key}' must be a list of ids")
+    return value
+
+
+# ---------------- WebSocket ----------------
+@router.websocket("/ws")
+async def live_websocket(websocket: WebSocket):
+    """
+    Send {"sessions": [...], "routes": [...], "stops": [...]} at any time to
+    (re)subscribe; updates arrive as JSON arrays of position/eta messages
+    """
+    await websocket.accept()
+    subscriber = live_hub.connect()
+
+    async def receive():
+        while True:
+            try:
+                text = await websocket.receive_text()
+            except WebSocketDisconnect:
+                return
+            try:
+                request = json.loads(text)
+                if not isinstance(request, dict):
+                    raise ValueError("Subscription must be a JSON object")
+                live_hub.subscribe(
+                    subscriber, _id_list(request, "sessions"), _id_list(request, "routes"), _id_list(request, "stops")
+                )
+                await websocket.send_text(json.dumps({"type": "subscribed", "topics": len(subscriber.topics)}))
+            except (ValueError, AttributeError) as e:
+                await websocket.send_text(json.dumps({"type": "error", "detail": str(e)}))
+
+    async def send():
+        while True:
+            batch = await subscriber.next_batch()
+            await websocket.send_text("[" + ",".join(batch) + "]")
+
+    async def until_done(group, step):
+        # Whichever side stops first (client gone, send failed) ends both
+        try:
+            await step()
+        finally:
+            group.cancel_scope.cancel()
+
+    try:
+        async with anyio.create_task_group() as group:
+            group.start_soon(until_done, group, receive)
+            group.start_soon(until_done, group, send)
+    finally:
+        live_hub.disconnect(subscriber)
+
+
+# ---------------- Server-Sent Events ----------------
+async def _events(request: Request, subscriber: Subscriber):
+    try:
+        while not await request.is_disconnected():
+            batch = await subscriber.next_batch(timeout=LIVE_KEEPALIVE_SECONDS)
+            if not batch:
+                yield ": keepalive\n\n"
+                continue
+            yield "".join(f"data: {message}\n\n" for message in batch)
+    finally:
+        live_hub.disconnect(subscriber)
+
+
+@router.get("/sse")
+async def live_events(
+    request: Request,
+    sessions: Optional[str] = Query(None, description="Comma-separated session ids"),
+    routes: Optional[str] = Query(None, description="Comma-separated route ids"),
+    stops: Optional[str] = Query(None, description="Comma-separated stop names"),
+):
+    """
+    Same updates as the WebSocket, one SSE event per message
+    """
+    subscriber = live_hub.connect()
+    try:
+        live_hub.subscribe(subscriber, _ids(sessions), _ids(routes), _ids(stops))
+    except ValueError as e:
+        live_hub.disconnect(subscriber)
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        _events(request, subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
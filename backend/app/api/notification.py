@@ -1,47 +1,77 @@
-from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
-from typing import List
-from app.schemas.notification import NotificationResponse, NotificationCreate, NotificationUpdate
+import json
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Depends, Query, Response
+from typing import List, Optional
+from app.schemas.notification import (
+    NotificationResponse, NotificationCreate, NotificationUpdate, NotificationBulkUpdate, NotificationBulkResult
+)
 from app.crud import notification as notification_crud
+from app.services.connections import notification_connections
+from app.services.pubsub import pubsub, NOTIFICATIONS_CHANNEL
+from app.utils.pagination import PageParams, paged
 
 router = APIRouter(
     prefix="/admin/notifications",
     tags=["notifications"]
 )
 
-# Store connected WebSocket clients
-websocket_clients: List[WebSocket] = []
-
 @router.websocket("/ws/notifications")
-async def websocket_notifications(websocket: WebSocket):
-    await websocket.accept()
-    websocket_clients.append(websocket)
+async def websocket_notifications(websocket: WebSocket, types: Optional[str] = Query(None)):
+    """
+    ?types=SOS,breakdown limits the stream to those notification types;
+    send {"types": [...]} later to change it (an empty list means all)
+    """
+    connection = await notification_connections.connect(websocket, types.split(",") if types else None)
     try:
         while True:
-            await websocket.receive_text()  # Keep the connection alive
+            text = await websocket.receive_text()
+            try:
+                request = json.loads(text)
+            except ValueError:
+                continue  # plain keep-alive pings
+            if isinstance(request, dict) and "types" in request:
+                notification_connections.set_topics(connection, request["types"])
     except WebSocketDisconnect:
-        websocket_clients.remove(websocket)
+        pass
+    finally:
+        await notification_connections.disconnect(connection)
+
+# Helper to broadcast to all clients, in every worker
+def broadcast_notification(notification: dict):
+    pubsub.publish(NOTIFICATIONS_CHANNEL, notification)
 
-# Helper to broadcast to all clients
-async def broadcast_notification(notification):
-    for ws in websocket_clients:
-        try:
-            await ws.send_json(notification)
-        except Exception:
-            pass  # Ignore failed sends
+# Pub/sub handler: fan a notification out to this worker's sockets
+def deliver_notification(notification: dict) -> int:
+    return notification_connections.broadcast(notification, topic=notification.get("type"))
 
 @router.get("/", response_model=List[NotificationResponse])
-async def list_notifications():
-    return await notification_crud.list_notifications()
+async def list_notifications(
+    response: Response,
+    page: PageParams = Depends(),
+    session_id: Optional[str] = None,
+    driver_id: Optional[str] = None,
+    status: Optional[str] = Query(None, description="List this status instead of the open notifications"),
+):
+    return await paged(
+        response, page, notification_crud.list_notifications(page, session_id, driver_id, status), NotificationResponse
+    )
 
 @router.post("/", response_model=NotificationResponse)
 async def create_notification(notification: NotificationCreate):
     notif = await notification_crud.create_notification(notification.dict())
-    # Broadcast to WebSocket clients
-    from fastapi.concurrency import run_in_threadpool
-    import asyncio
-    asyncio.create_task(broadcast_notification(notif))
+    # Every worker queues it per client; each connection's writer task delivers it
+    broadcast_notification(notif)
     return notif
 
+@router.patch("/bulk", response_model=NotificationBulkResult)
+async def update_notifications_bulk(update: NotificationBulkUpdate):
+    """
+    Set one status on many notifications, e.g. clearing alerts after an incident
+    """
+    try:
+        return await notification_crud.update_notification_statuses(update.ids, update.status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.patch("/{notification_id}", response_model=NotificationResponse)
 async def update_notification(notification_id: str, update: NotificationUpdate):
     notif = await notification_crud.update_notification_status(notification_id, update.status)
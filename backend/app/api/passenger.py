@@ -1,11 +1,11 @@
-from fastapi import APIRouter, HTTPException, Body, Query
+from fastapi import APIRouter, HTTPException, Body, Query, Depends, Response
 from typing import List, Optional
 from app.schemas.user import PassengerCreate, PassengerResponse
 from app.crud import passenger as passenger_crud
 from app.crud import route as route_crud
-from app.crud import session as session_crud
-from app.crud import telemetry as telemetry_crud
-from app.crud import eta as eta_crud  # You will need to implement eta.py
+from app.crud import eta as eta_crud
+from app.crud import search as search_crud
+from app.utils.pagination import PageParams, paged
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -32,15 +32,8 @@ async def login_passenger(
 
 # ------------------- Admin-only endpoints -------------------
 @router.get("/", response_model=List[PassengerResponse])
-async def list_passengers():
-    return await passenger_crud.list_passengers()
-
-@router.get("/{passenger_id}", response_model=PassengerResponse)
-async def get_passenger(passenger_id: str):
-    passenger = await passenger_crud.get_passenger_by_id(passenger_id)
-    if not passenger:
-        raise HTTPException(status_code=404, detail="Passenger not found")
-    return passenger
+async def list_passengers(response: Response, page: PageParams = Depends()):
+    return await paged(response, page, passenger_crud.list_passengers(page), PassengerResponse)
 
 @router.delete("/{passenger_id}")
 async def delete_passenger(passenger_id: str):
@@ -61,57 +54,20 @@ async def search_buses(req: SearchBusesRequest):
     """
     Main search endpoint for passenger to find upcoming buses.
     """
-    # 1. Validate destination exists
-    destination = req.destination
-    bus_stop = req.bus_stop
-    current_lat = req.current_lat
-    current_lng = req.current_lng
-
-    # Find all routes with this destination
-    routes = await route_crud.find_routes_by_destination(destination)
-    if not routes:
-        return {"nearest_stop": None, "buses": []}
-
-    # If bus_stop is provided, filter routes that pass through it
-    if bus_stop:
-        candidate_routes = [r for r in routes if any(s["name"] == bus_stop for s in r.get("route_points", []))]
-        nearest_stop = bus_stop
-    else:
-        # Find nearest stop among all route_points in all routes
-        if current_lat is None or current_lng is None:
-            return {"detail": "current_lat and current_lng required if bus_stop not provided"}, 400
-        nearest_stop, candidate_routes = await route_crud.find_nearest_stop_and_routes(routes, current_lat, current_lng)
-        if not nearest_stop:
-            return {"nearest_stop": None, "buses": []}
-    # For each candidate route, find active sessions
-    buses = []
-    for route in candidate_routes:
-        sessions = await session_crud.find_active_sessions_by_route(route["id"])
-        for sess in sessions:
-            telemetry = await telemetry_crud.get_latest_position(sess["id"])
-            if not telemetry:
-                continue
-            eta_minutes = await eta_crud.compute_eta_to_stop(sess["id"], nearest_stop)
-            driver_info = await session_crud.get_driver_info(sess["driver_id"])
-            buses.append({
-                "vehicle_id": sess["vehicle_id"],
-                "route_name": route["route_name"],
-                "driver": driver_info.get("name") if driver_info else None,
-                "eta_minutes": eta_minutes,
-                "current_lat": telemetry.get("latitude"),
-                "current_lng": telemetry.get("longitude"),
-            })
-    return {"nearest_stop": nearest_stop, "buses": buses}
+    try:
+        return await search_crud.search_buses(req.destination, req.bus_stop, req.current_lat, req.current_lng)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/nearest-stop")
 async def nearest_stop(
-    lat: float = Query(...), lng: float = Query(...)
+    lat: float = Query(...), lng: float = Query(...), k: int = Query(1, ge=1, le=50)
 ):
     """
-    Helper to find nearest bus stop to a coordinate.
+    Helper to find nearest bus stop to a coordinate (and the k nearest stops).
     """
-    stop, _ = await route_crud.find_nearest_stop_and_routes(await route_crud.list_routes(), lat, lng)
-    return {"nearest_stop": stop}
+    stops = route_crud.find_nearest_stops(lat, lng, k)
+    return {"nearest_stop": stops[0]["name"] if stops else None, "stops": stops}
 
 @router.get("/eta/{session_id}/{stop_name}")
 async def eta(session_id: str, stop_name: str):
@@ -121,6 +77,14 @@ async def eta(session_id: str, stop_name: str):
     eta_minutes = await eta_crud.compute_eta_to_stop(session_id, stop_name)
     return {"session_id": session_id, "stop_name": stop_name, "eta_minutes": eta_minutes}
 
+# Declared after the fixed GET paths so "/nearest-stop" is not read as an id
+@router.get("/{passenger_id}", response_model=PassengerResponse)
+async def get_passenger(passenger_id: str):
+    passenger = await passenger_crud.get_passenger_by_id(passenger_id)
+    if not passenger:
+        raise HTTPException(status_code=404, detail="Passenger not found")
+    return passenger
+
 @router.put("/{passenger_id}", response_model=PassengerResponse)
 async def update_passenger(passenger_id: str, data: dict = Body(...)):
     passenger = await passenger_crud.get_passenger_by_id(passenger_id)
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from app.schemas.route import RouteCreate, RouteResponse, RouteUpdate
+from fastapi import APIRouter, HTTPException, Query, Depends, Response
+from typing import List, Optional
+from app.schemas.route import RouteCreate, RouteResponse, RouteUpdate, RouteBulkResponse, GeometryView
 from app.crud import route as route_crud
+from app.utils.pagination import PageParams, paged
 
 router = APIRouter()
 
@@ -13,15 +14,32 @@ async def create_route(route: RouteCreate):
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+# ---------------- Bulk Create Routes ----------------
+@router.post("/bulk", response_model=RouteBulkResponse)
+async def create_routes_bulk(routes: List[RouteCreate]):
+    return await route_crud.create_routes_bulk([route.dict() for route in routes])
+
 # ---------------- List Routes ----------------
+# geometry=none|simplified|full|encoded; tolerance_m picks the simplification level
 @router.get("/", response_model=List[RouteResponse])
-async def list_routes():
-    return await route_crud.list_routes()
+async def list_routes(
+    response: Response,
+    page: PageParams = Depends(),
+    geometry: GeometryView = GeometryView.full,
+    tolerance_m: Optional[float] = Query(None, gt=0),
+    vehicle_id: Optional[str] = None,
+    destination: Optional[str] = None,
+):
+    return await paged(
+        response, page, route_crud.list_routes(page, geometry.value, tolerance_m, vehicle_id, destination), RouteResponse
+    )
 
 # ---------------- Get Route by ID ----------------
 @router.get("/{route_id}", response_model=RouteResponse)
-async def get_route(route_id: str):
-    route = await route_crud.get_route_by_id(route_id)
+async def get_route(
+    route_id: str, geometry: GeometryView = GeometryView.full, tolerance_m: Optional[float] = Query(None, gt=0)
+):
+    route = await route_crud.get_route_by_id(route_id, geometry.value, tolerance_m)
     if not route:
         raise HTTPException(status_code=404, detail="Route not found")
     return route
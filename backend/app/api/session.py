@@ -1,7 +1,8 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from app.schemas.session import SessionCreate, SessionResponse, SessionUpdate
+from fastapi import APIRouter, HTTPException, File, UploadFile, Depends, Response
+from typing import List, Optional
+from app.schemas.session import SessionCreate, SessionResponse, SessionUpdate, SessionBulkResponse
 from app.crud import session as session_crud
+from app.utils.pagination import PageParams, paged
 
 router = APIRouter()
 
@@ -15,10 +16,47 @@ async def start_session(session: SessionCreate):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+# ---------------- Bulk Import Sessions ----------------
+@router.post("/bulk", response_model=SessionBulkResponse)
+async def create_sessions_bulk(sessions: List[SessionCreate], dry_run: bool = False):
+    """
+    Import a day's timetable in one request; returns a per-row report.
+    With dry_run=true the rows are only validated.
+    """
+    try:
+        return await session_crud.create_sessions_bulk([s.dict() for s in sessions], dry_run)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/bulk/upload", response_model=SessionBulkResponse)
+async def upload_sessions_bulk(file: UploadFile = File(...), dry_run: bool = False):
+    """
+    Same as /bulk for a CSV file (header: vehicle_id,driver_id,conductor_id,route_id,start_time)
+    or a JSON-lines file with one session per line
+    """
+    try:
+        text = (await file.read()).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Timetable must be UTF-8 text")
+    try:
+        return await session_crud.create_sessions_bulk(session_crud.parse_timetable(text, file.filename or ""), dry_run)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 # ---------------- List Sessions ----------------
 @router.get("/", response_model=List[SessionResponse])
-async def list_sessions():
-    return await session_crud.list_sessions()
+async def list_sessions(
+    response: Response,
+    page: PageParams = Depends(),
+    driver_id: Optional[str] = None,
+    vehicle_id: Optional[str] = None,
+    route_id: Optional[str] = None,
+):
+    return await paged(
+        response, page, session_crud.list_sessions(page, driver_id, vehicle_id, route_id), SessionResponse
+    )
 
 
 # ---------------- Get Session by ID ----------------
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from app.schemas.telemetry import TelemetryCreate, TelemetryResponse
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Response
+from typing import List, Optional
+from app.schemas.telemetry import TelemetryCreate, TelemetryResponse, TelemetryBatchResponse
 from app.crud import telemetry as telemetry_crud
+from app.schemas.export import ExportFormat
+from app.utils.export import export_response
+from app.utils.pagination import PageParams, paged
 
 router = APIRouter()
 
@@ -27,12 +31,71 @@ async def post_telemetry(telemetry: TelemetryCreate):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-@router.get("/", response_model=List[dict])
-async def list_telemetry():
+@router.post("/batch", response_model=TelemetryBatchResponse)
+async def post_telemetry_batch(telemetry: List[TelemetryCreate]):
+    """
+    Post a batch of buffered GPS fixes for one or more sessions.
+    Returns a per-item result so the client knows which fixes were rejected.
     """
-    List all telemetry records
+    try:
+        return await telemetry_crud.create_telemetry_batch([item.dict() for item in telemetry])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.get("/", response_model=List[dict])
+async def list_telemetry(
+    response: Response,
+    page: PageParams = Depends(),
+    session_id: Optional[str] = None,
+    vehicle_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """
+    List telemetry records, newest first, one page at a time (see X-Next-Cursor)
+    """
+    return await paged(response, page, telemetry_crud.list_telemetry(page, session_id, vehicle_id, since, until))
+
+@router.get("/export")
+async def export_telemetry(
+    format: ExportFormat = ExportFormat.ndjson,
+    gzip: bool = False,
+    session_id: Optional[str] = None,
+    vehicle_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """
+    Stream matching telemetry (oldest first) as NDJSON or CSV, optionally gzipped
+    """
+    cursor = telemetry_crud.export_telemetry_cursor(session_id, vehicle_id, since, until)
+    return export_response(
+        cursor, telemetry_crud.serialize, format.value, "telemetry",
+        columns=telemetry_crud.TELEMETRY_EXPORT_COLUMNS, compress=gzip,
+    )
+
+@router.get("/archive")
+async def get_archived_telemetry(
+    format: ExportFormat = ExportFormat.ndjson,
+    gzip: bool = False,
+    session_id: Optional[str] = None,
+    vehicle_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """
+    Stream the full archived history of a session or vehicle (oldest first)
     """
-    return await telemetry_crud.list_telemetry()
+    try:
+        fixes = telemetry_crud.archived_history(session_id, vehicle_id, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return export_response(
+        fixes, telemetry_crud.serialize_archived, format.value, "telemetry_archive",
+        columns=telemetry_crud.ARCHIVE_EXPORT_COLUMNS, compress=gzip,
+    )
 
 @router.get("/{session_id}")
 async def get_current_location(session_id: str):
@@ -44,6 +107,8 @@ async def get_current_location(session_id: str):
         if not position:
             raise HTTPException(status_code=404, detail="No GPS data found for session")
         return position
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Response
+from typing import List, Optional
 from app.schemas.vehicle import VehicleCreate, VehicleResponse, VehicleUpdate
 from app.crud import vehicle as vehicle_crud
+from app.utils.pagination import PageParams, paged
 
 router = APIRouter()
 
@@ -17,11 +18,11 @@ async def create_vehicle(vehicle: VehicleCreate):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("", response_model=List[VehicleResponse])
-async def list_vehicles():
+async def list_vehicles(response: Response, page: PageParams = Depends(), registration_number: Optional[str] = None):
     """
-    List all vehicles. Accessible to all authenticated users.
+    List vehicles, one page at a time (see X-Next-Cursor). Accessible to all authenticated users.
     """
-    return await vehicle_crud.list_vehicles()
+    return await paged(response, page, vehicle_crud.list_vehicles(page, registration_number), VehicleResponse)
 
 @router.get("/{vehicle_id}", response_model=VehicleResponse)
 async def get_vehicle(vehicle_id: str):
@@ -51,3 +51,85 @@ with open(ABI_PATH, "r", encoding="utf-8") as f:
     ABI = json.load(f)
 
 contract = w3.eth.contract(address=CONTRACT_ADDRESS_CHECKSUM, abi=ABI)
+
+# ---------------- Live State ----------------
+LIVE_STATE_HISTORY_SIZE = int(os.getenv("LIVE_STATE_HISTORY_SIZE", "5"))
+LIVE_STATE_FLUSH_SECONDS = float(os.getenv("LIVE_STATE_FLUSH_SECONDS", "2"))
+LIVE_STATE_MAX_SESSIONS = int(os.getenv("LIVE_STATE_MAX_SESSIONS", "10000"))
+LIVE_STATE_TTL_SECONDS = float(os.getenv("LIVE_STATE_TTL_SECONDS", "5"))  # reload cached tracks after this
+
+# ---------------- Retention ----------------
+RETENTION_INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS", "5"))
+TELEMETRY_RETENTION_POLICY = os.getenv("TELEMETRY_RETENTION_POLICY", "last_n")  # last_n | ttl | window
+TELEMETRY_RETENTION_KEEP = int(os.getenv("TELEMETRY_RETENTION_KEEP", "5"))
+TELEMETRY_RETENTION_SECONDS = int(os.getenv("TELEMETRY_RETENTION_SECONDS", "86400"))
+
+# ---------------- Id Allocation ----------------
+ID_BLOCK_SIZE = int(os.getenv("ID_BLOCK_SIZE", "20"))
+TELEMETRY_ID_BLOCK_SIZE = int(os.getenv("TELEMETRY_ID_BLOCK_SIZE", "1000"))
+
+# ---------------- Stop Index ----------------
+STOP_INDEX_REFRESH_SECONDS = float(os.getenv("STOP_INDEX_REFRESH_SECONDS", "60"))
+
+# ---------------- Map Matching ----------------
+MAP_MATCH_OFF_ROUTE_M = float(os.getenv("MAP_MATCH_OFF_ROUTE_M", "75"))
+MAP_MATCH_WINDOW_SEGMENTS = int(os.getenv("MAP_MATCH_WINDOW_SEGMENTS", "40"))
+MAP_MATCH_GRID_CELL_M = float(os.getenv("MAP_MATCH_GRID_CELL_M", "250"))
+MAP_MATCH_ROUTE_TTL_SECONDS = float(os.getenv("MAP_MATCH_ROUTE_TTL_SECONDS", "300"))
+
+# ---------------- Routing ----------------
+ROUTING_PROVIDER = os.getenv("ROUTING_PROVIDER", "osrm")  # osrm | straight | graph
+OSRM_BASE_URL = os.getenv("OSRM_BASE_URL", "https://router.project-osrm.org/route/v1/driving")
+OSRM_TIMEOUT_SECONDS = float(os.getenv("OSRM_TIMEOUT_SECONDS", "10"))
+OSRM_RETRIES = int(os.getenv("OSRM_RETRIES", "2"))
+ROUTING_CONCURRENCY = int(os.getenv("ROUTING_CONCURRENCY", "4"))
+ROAD_GRAPH_PATH = os.getenv("ROAD_GRAPH_PATH")  # GeoJSON LineStrings for the "graph" provider
+
+# ---------------- Schedule Index ----------------
+SCHEDULE_INDEX_REFRESH_SECONDS = float(os.getenv("SCHEDULE_INDEX_REFRESH_SECONDS", "300"))
+
+# ---------------- Route Metadata Cache ----------------
+ROUTE_CACHE_TTL_SECONDS = float(os.getenv("ROUTE_CACHE_TTL_SECONDS", "60"))
+ROUTE_CACHE_MAX_ROUTES = int(os.getenv("ROUTE_CACHE_MAX_ROUTES", "10000"))
+
+# ---------------- Pagination ----------------
+PAGE_DEFAULT_LIMIT = int(os.getenv("PAGE_DEFAULT_LIMIT", "500"))
+PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "1000"))
+
+# ---------------- Exports ----------------
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# ---------------- Telemetry Archive ----------------
+ARCHIVE_FLUSH_SECONDS = float(os.getenv("ARCHIVE_FLUSH_SECONDS", "5"))
+ARCHIVE_FLUSH_FIXES = int(os.getenv("ARCHIVE_FLUSH_FIXES", "5000"))
+ARCHIVE_MAX_PENDING = int(os.getenv("ARCHIVE_MAX_PENDING", "200000"))
+ARCHIVE_BUCKET_MAX_FIXES = int(os.getenv("ARCHIVE_BUCKET_MAX_FIXES", "1000"))
+
+# ---------------- Live Updates ----------------
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "256"))
+LIVE_MAX_TOPICS = int(os.getenv("LIVE_MAX_TOPICS", "100"))
+LIVE_KEEPALIVE_SECONDS = float(os.getenv("LIVE_KEEPALIVE_SECONDS", "15"))
+
+# ---------------- Notification Broadcast ----------------
+NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", "100"))
+NOTIFY_SEND_TIMEOUT_SECONDS = float(os.getenv("NOTIFY_SEND_TIMEOUT_SECONDS", "5"))
+NOTIFY_MAX_DROPS = int(os.getenv("NOTIFY_MAX_DROPS", "50"))
+
+# ---------------- Pub/Sub ----------------
+PUBSUB_BACKEND = os.getenv("PUBSUB_BACKEND", "local")  # local | mongo (needed with several workers)
+PUBSUB_COLLECTION_MB = int(os.getenv("PUBSUB_COLLECTION_MB", "64"))
+PUBSUB_FLUSH_SECONDS = float(os.getenv("PUBSUB_FLUSH_SECONDS", "0.05"))
+PUBSUB_MAX_PENDING = int(os.getenv("PUBSUB_MAX_PENDING", "50000"))  # unflushed events held per worker
+
+# ---------------- Audit Log ----------------
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "1"))
+AUDIT_FLUSH_RECORDS = int(os.getenv("AUDIT_FLUSH_RECORDS", "500"))
+AUDIT_MAX_PENDING = int(os.getenv("AUDIT_MAX_PENDING", "10000"))
+AUDIT_SPILL_PATH = os.getenv("AUDIT_SPILL_PATH", "audit_pending.jsonl")  # unwritten records kept across restarts
+
+# ---------------- Anchoring ----------------
+# contract: send each Merkle root through the configured contract; mock: record roots in memory
+ANCHOR_PROVIDER = os.getenv("ANCHOR_PROVIDER", "contract" if ACCOUNT_ADDRESS else "mock")
+ANCHOR_INTERVAL_SECONDS = float(os.getenv("ANCHOR_INTERVAL_SECONDS", "600"))
+ANCHOR_MAX_LEAVES = int(os.getenv("ANCHOR_MAX_LEAVES", "65536"))
+ANCHOR_RECEIPT_TIMEOUT_SECONDS = float(os.getenv("ANCHOR_RECEIPT_TIMEOUT_SECONDS", "120"))
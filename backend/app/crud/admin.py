@@ -1,7 +1,9 @@
 from app.config import db
+from app.utils.pagination import Page, PageParams, paginate
 from bson import ObjectId
 
 ADMIN_COLLECTION = db.admins
+ADMIN_ORDER = [("_id", 1)]
 
 def serialize(doc):
     if not doc:
@@ -25,12 +27,10 @@ async def create_admin(data: dict):
     return data
 
 # ---------------- List Admins ----------------
-async def list_admins():
-    cursor = ADMIN_COLLECTION.find({})
-    admins = []
-    async for doc in cursor:
-        admins.append(serialize(doc))
-    return admins
+async def list_admins(page: PageParams = None) -> Page:
+    result = await paginate(ADMIN_COLLECTION, {}, ADMIN_ORDER, page)
+    result.items = [serialize(doc) for doc in result.items]
+    return result
 
 # ---------------- Get Admin by ID ----------------
 async def get_admin_by_id(admin_id: str):
@@ -1,9 +1,12 @@
 from app.config import db
+from app.utils.pagination import Page, PageParams, paginate
 from bson import ObjectId
 from app.crud.device import assign_device_to_user, attest_device
+from app.services.anchoring import assignment_event_hash
 from datetime import datetime
 
 ASSIGNMENT_COLLECTION = db.assignments
+ASSIGNMENT_ORDER = [("_id", 1)]
 
 DEVICE_COLLECTION = db.devices
 VEHICLE_COLLECTION = db.vehicles
@@ -74,20 +77,20 @@ async def create_assignment(data: dict, send_to_chain=True):
     if existing:
         raise ValueError("Vehicle already has an assignment at this timestamp")
 
-    # Remove blockchain logic
+    # Anchored on chain in a batch by the anchoring service, which sets blockchain_tx_hash
+    data["_id"] = ObjectId()
     data["blockchain_tx_hash"] = None
+    if send_to_chain:
+        data["event_hash"] = assignment_event_hash(data)
 
-    result = await ASSIGNMENT_COLLECTION.insert_one(data)
-    data["id"] = str(result.inserted_id)
-    return data
+    await ASSIGNMENT_COLLECTION.insert_one(data)
+    return serialize(data)
 
 # ---------------- List Assignments ----------------
-async def list_assignments():
-    cursor = ASSIGNMENT_COLLECTION.find({})
-    assignments = []
-    async for doc in cursor:
-        assignments.append(serialize(doc))
-    return assignments
+async def list_assignments(page: PageParams = None) -> Page:
+    result = await paginate(ASSIGNMENT_COLLECTION, {}, ASSIGNMENT_ORDER, page)
+    result.items = [serialize(doc) for doc in result.items]
+    return result
 
 # ---------------- Get Assignment by ID ----------------
 async def get_assignment_by_id(assignment_id: str):
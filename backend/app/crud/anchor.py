@@ -0,0 +1,25 @@
+from app.services.anchoring import ANCHOR_COLLECTION, anchoring
+from app.utils.pagination import Page, PageParams, paginate
+
+ANCHOR_ORDER = [("_id", -1)]
+
+def serialize(doc):
+    if not doc:
+        return None
+    doc["id"] = doc.pop("_id")
+    return doc
+
+# ---------------- List Anchors ----------------
+async def list_anchors(page: PageParams = None, status: str = None) -> Page:
+    query = {"status": status} if status else {}
+    result = await paginate(ANCHOR_COLLECTION, query, ANCHOR_ORDER, page)
+    result.items = [serialize(doc) for doc in result.items]
+    return result
+
+# ---------------- Anchor Now ----------------
+async def anchor_now():
+    return serialize(await anchoring.anchor_once())
+
+# ---------------- Inclusion Proof ----------------
+async def get_inclusion_proof(kind: str, event_id: str):
+    return await anchoring.inclusion_proof(kind, event_id)
@@ -1,8 +1,11 @@
-from app.config import db
+from app.config import EXPORT_BATCH_SIZE
+from app.services.audit_log import AUDIT_COLLECTION, audit_log
+from app.utils.pagination import Page, PageParams, keyset_index, paginate
 from bson import ObjectId
 from datetime import datetime
 
-AUDIT_COLLECTION = db.audit_logs
+AUDIT_ORDER = [("timestamp", -1), ("_id", -1)]
+keyset_index(AUDIT_COLLECTION, AUDIT_ORDER)
 
 def serialize(doc):
     if not doc:
@@ -13,23 +16,47 @@ def serialize(doc):
 
 # ---------------- Create Audit Log ----------------
 async def create_audit_log(user_id: str, action: str, details: dict = None):
-    audit_doc = {
-        "user_id": user_id,
-        "action": action,
-        "details": details or {},
-        "timestamp": datetime.utcnow()
-    }
-    result = await AUDIT_COLLECTION.insert_one(audit_doc)
-    audit_doc["id"] = str(result.inserted_id)
-    return audit_doc
+    # Queued for the chained batch writer; seq and hash are set when it is written
+    return serialize(await audit_log.append(user_id, action, details))
+
+# ---------------- Verify Audit Chain ----------------
+async def verify_audit_chain(from_seq: int = 1, to_seq: int = None) -> dict:
+    if to_seq is not None and to_seq < from_seq:
+        raise ValueError("to_seq must not be less than from_seq")
+    return await audit_log.verify(from_seq, to_seq)
 
 # ---------------- List Audit Logs ----------------
-async def list_audit_logs():
-    cursor = AUDIT_COLLECTION.find({}).sort("timestamp", -1)
-    logs = []
-    async for doc in cursor:
-        logs.append(serialize(doc))
-    return logs
+def audit_query(user_id: str = None, action: str = None, session_id: str = None, vehicle_id: str = None,
+                since: datetime = None, until: datetime = None) -> dict:
+    query = {}
+    if user_id:
+        query["user_id"] = user_id
+    if action:
+        query["action"] = action
+    if session_id:
+        query["details.session_id"] = session_id
+    if vehicle_id:
+        query["details.vehicle_id"] = vehicle_id
+    if since or until:
+        query["timestamp"] = {**({"$gte": since} if since else {}), **({"$lt": until} if until else {})}
+    return query
+
+async def list_audit_logs(page: PageParams = None, user_id: str = None, action: str = None) -> Page:
+    query = audit_query(user_id, action)
+    result = await paginate(AUDIT_COLLECTION, query, AUDIT_ORDER, page)
+    result.items = [serialize(doc) for doc in result.items]
+    return result
+
+# ---------------- Export Audit Logs ----------------
+AUDIT_EXPORT_COLUMNS = ["id", "seq", "user_id", "action", "timestamp", "details", "prev_hash", "hash"]
+
+def export_audit_cursor(user_id: str = None, action: str = None, session_id: str = None, vehicle_id: str = None,
+                        since: datetime = None, until: datetime = None):
+    """
+    Cursor over matching audit logs, oldest first, fetched EXPORT_BATCH_SIZE rows per round trip
+    """
+    query = audit_query(user_id, action, session_id, vehicle_id, since, until)
+    return AUDIT_COLLECTION.find(query).sort([("timestamp", 1), ("_id", 1)]).batch_size(EXPORT_BATCH_SIZE)
 
 # ---------------- Get Audit Log by ID ----------------
 async def get_audit_log_by_id(audit_id: str):
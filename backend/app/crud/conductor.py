@@ -1,8 +1,10 @@
 from app.config import db
+from app.utils.pagination import Page, PageParams, paginate
+from app.services.ids import id_allocator
 from bson import ObjectId
 
 CONDUCTOR_COLLECTION = db.conductors
-COUNTERS_COLLECTION = db.counters  # For auto-increment
+CONDUCTOR_ORDER = [("id", 1), ("_id", 1)]
 
 def serialize(doc):
     if not doc:
@@ -14,13 +16,7 @@ def serialize(doc):
 
 # ---------------- Utility for auto-increment ----------------
 async def get_next_conductor_id():
-    counter = await COUNTERS_COLLECTION.find_one_and_update(
-        {"_id": "conductor_id"},
-        {"$inc": {"seq": 1}},
-        upsert=True,
-        return_document=True
-    )
-    return counter["seq"]
+    return await id_allocator.next_id("conductor_id")
 
 # ---------------- Create Conductor ----------------
 async def create_conductor(data: dict):
@@ -34,13 +30,12 @@ async def create_conductor(data: dict):
     return serialize(data)
 
 # ---------------- List Conductors ----------------
-async def list_conductors():
-    cursor = CONDUCTOR_COLLECTION.find({})
-    conductors = []
-    async for doc in cursor:
+async def list_conductors(page: PageParams = None) -> Page:
+    result = await paginate(CONDUCTOR_COLLECTION, {}, CONDUCTOR_ORDER, page)
+    for doc in result.items:
         doc.pop("assigned_vehicle_id", None)
-        conductors.append(serialize(doc))
-    return conductors
+    result.items = [serialize(doc) for doc in result.items]
+    return result
 
 # ---------------- Get Conductor by ID ----------------
 async def get_conductor_by_id(conductor_id: str):
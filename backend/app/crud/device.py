@@ -1,8 +1,10 @@
 from app.config import db
+from app.utils.pagination import Page, PageParams, paginate
 from bson import ObjectId
 from datetime import datetime
 
 DEVICE_COLLECTION = db.devices
+DEVICE_ORDER = [("_id", 1)]
 
 def serialize(doc):
     if not doc:
@@ -25,12 +27,11 @@ async def register_device(data: dict):
     return data
 
 # ---------------- List Devices ----------------
-async def list_devices():
-    cursor = DEVICE_COLLECTION.find({})
-    devices = []
-    async for doc in cursor:
-        devices.append(serialize(doc))
-    return devices
+async def list_devices(page: PageParams = None, user_id: str = None) -> Page:
+    query = {"user_id": user_id} if user_id else {}
+    result = await paginate(DEVICE_COLLECTION, query, DEVICE_ORDER, page)
+    result.items = [serialize(doc) for doc in result.items]
+    return result
 
 # ---------------- Get Device by ID ----------------
 async def get_device_by_id(device_id: str):
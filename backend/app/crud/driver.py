@@ -1,8 +1,10 @@
 from app.config import db
+from app.utils.pagination import Page, PageParams, paginate
+from app.services.ids import id_allocator
 from bson import ObjectId
 
 DRIVER_COLLECTION = db.drivers
-COUNTERS_COLLECTION = db.counters  # Add this for auto-increment
+DRIVER_ORDER = [("id", 1), ("_id", 1)]
 
 def serialize(doc):
     if not doc:
@@ -14,13 +16,7 @@ def serialize(doc):
 
 # ---------------- Utility for auto-increment ----------------
 async def get_next_driver_id():
-    counter = await COUNTERS_COLLECTION.find_one_and_update(
-        {"_id": "driver_id"},
-        {"$inc": {"seq": 1}},
-        upsert=True,
-        return_document=True
-    )
-    return counter["seq"]
+    return await id_allocator.next_id("driver_id")
 
 # ---------------- Create Driver ----------------
 async def create_driver(data: dict):
@@ -36,13 +32,12 @@ async def create_driver(data: dict):
     return serialize(data)
 
 # ---------------- List Drivers ----------------
-async def list_drivers():
-    cursor = DRIVER_COLLECTION.find({})
-    drivers = []
-    async for doc in cursor:
+async def list_drivers(page: PageParams = None) -> Page:
+    result = await paginate(DRIVER_COLLECTION, {}, DRIVER_ORDER, page)
+    for doc in result.items:
         doc.pop("assigned_vehicle_id", None)
-        drivers.append(serialize(doc))
-    return drivers
+    result.items = [serialize(doc) for doc in result.items]
+    return result
 
 # ---------------- Get Driver by ID ----------------
 async def get_driver_by_id(driver_id):
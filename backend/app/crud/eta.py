@@ -1,7 +1,14 @@
 from app.crud import session as session_crud
 from app.crud import route as route_crud
 from app.crud import telemetry as telemetry_crud
-from geopy.distance import geodesic
+from app.utils.eta import eta_minutes_on_route
+from app.utils.geo import route_arrays
+
+def eta_minutes_to_stop(route, stop_name, position):
+    """
+    ETA in minutes from a live position to a stop on an already loaded route
+    """
+    return eta_minutes_on_route(route_arrays(route), stop_name, position)
 
 async def compute_eta_to_stop(session_id, stop_name):
     """
@@ -13,19 +20,5 @@ async def compute_eta_to_stop(session_id, stop_name):
     route = await route_crud.get_route_by_id(str(session["route_id"]))
     if not route:
         return None
-    stop = next((s for s in route["route_points"] if s["name"] == stop_name), None)
-    if not stop:
-        return None
     telemetry = await telemetry_crud.get_latest_position(str(session_id))
-    if not telemetry:
-        return None
-    # Compute distance
-    curr = (telemetry["latitude"], telemetry["longitude"])
-    dest = (stop["latitude"], stop["longitude"])
-    distance_m = geodesic(curr, dest).meters
-    speed_kmh = telemetry.get("speed", 20) or 20  # fallback to 20 km/h
-    speed_ms = speed_kmh * 1000 / 3600
-    if speed_ms <= 0:
-        return None
-    eta_minutes = int(distance_m / speed_ms / 60)
-    return eta_minutes
+    return eta_minutes_to_stop(route, stop_name, telemetry)
@@ -1,41 +1,82 @@
 from app.config import db
+from app.utils.pagination import Page, PageParams, keyset_index, paginate
 from bson import ObjectId
+from pymongo import ReturnDocument
 
 NOTIF_COLLECTION = db.notifications
+NOTIFICATION_ORDER = [("id", 1), ("_id", 1)]
+CLOSED_STATUS = "completed"
+BULK_UPDATE_MAX_IDS = 1000
+
+# Open alerts are the hot list; the partial indexes only hold those rows
+OPEN_ONLY = {"partialFilterExpression": {"is_open": True}}
+keyset_index(NOTIF_COLLECTION, [("is_open", 1), *NOTIFICATION_ORDER], **OPEN_ONLY)
+keyset_index(NOTIF_COLLECTION, [("session_id", 1), ("is_open", 1), *NOTIFICATION_ORDER], **OPEN_ONLY)
+keyset_index(NOTIF_COLLECTION, [("driver_id", 1), ("is_open", 1), *NOTIFICATION_ORDER], **OPEN_ONLY)
+keyset_index(NOTIF_COLLECTION, [("status", 1), *NOTIFICATION_ORDER])
 
 
 def serialize(doc):
     doc["id"] = str(doc.get("id", str(doc["_id"])))
     doc.pop("_id", None)
+    doc.pop("is_open", None)
     return doc
 
 
-async def list_notifications():
-    cursor = NOTIF_COLLECTION.find({"status": {"$ne": "completed"}})  # only not completed
-    notifications = []
-    async for doc in cursor:
-        notifications.append(serialize(doc))
-    return notifications
+def _status_fields(status: str) -> dict:
+    return {"status": status, "is_open": status != CLOSED_STATUS}
+
+
+async def backfill_open_flags():
+    """
+    Set `is_open` on notifications stored before the flag existed
+    """
+    missing = {"is_open": {"$exists": False}}
+    await NOTIF_COLLECTION.update_many({**missing, "status": CLOSED_STATUS}, {"$set": {"is_open": False}})
+    await NOTIF_COLLECTION.update_many(missing, {"$set": {"is_open": True}})
+
+
+async def list_notifications(
+    page: PageParams = None, session_id: str = None, driver_id: str = None, status: str = None
+) -> Page:
+    """
+    Open notifications by default; `status` lists that status instead
+    """
+    query = {"status": status} if status else {"is_open": True}
+    if session_id:
+        query["session_id"] = session_id
+    if driver_id:
+        query["driver_id"] = driver_id
+    result = await paginate(NOTIF_COLLECTION, query, NOTIFICATION_ORDER, page)
+    result.items = [serialize(doc) for doc in result.items]
+    return result
 
 
 async def create_notification(data: dict):
-    if "status" not in data:
-        data["status"] = "new"
-    # Insert and get the inserted_id
-    result = await NOTIF_COLLECTION.insert_one(data)
-    # Set the 'id' field to the string of the inserted ObjectId
-    await NOTIF_COLLECTION.update_one(
-        {"_id": result.inserted_id},
-        {"$set": {"id": str(result.inserted_id)}}
-    )
-    doc = await NOTIF_COLLECTION.find_one({"_id": result.inserted_id})
+    # The id is generated here so the document is complete in one insert
+    oid = ObjectId()
+    doc = {**data, **_status_fields(data.get("status") or "new"), "_id": oid, "id": str(oid)}
+    await NOTIF_COLLECTION.insert_one(doc)
     return serialize(doc)
 
 
 async def update_notification_status(notification_id: str, status: str):
-    await NOTIF_COLLECTION.update_one(
+    doc = await NOTIF_COLLECTION.find_one_and_update(
         {"id": notification_id},
-        {"$set": {"status": status}},
+        {"$set": _status_fields(status)},
+        return_document=ReturnDocument.AFTER,
     )
-    doc = await NOTIF_COLLECTION.find_one({"id": notification_id})
     return serialize(doc) if doc else None
+
+
+async def update_notification_statuses(notification_ids: list, status: str) -> dict:
+    """
+    Set one status on many notifications in a single update
+    """
+    ids = list(dict.fromkeys(str(i) for i in notification_ids))
+    if not ids:
+        raise ValueError("No notification ids given")
+    if len(ids) > BULK_UPDATE_MAX_IDS:
+        raise ValueError(f"Too many notification ids: {len(ids)} (max {BULK_UPDATE_MAX_IDS})")
+    result = await NOTIF_COLLECTION.update_many({"id": {"$in": ids}}, {"$set": _status_fields(status)})
+    return {"requested": len(ids), "matched": result.matched_count, "modified": result.modified_count}
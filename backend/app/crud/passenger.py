@@ -1,8 +1,10 @@
 from app.config import db
+from app.utils.pagination import Page, PageParams, paginate
+from app.services.ids import id_allocator
 from bson import ObjectId
 
 PASSENGER_COLLECTION = db.passengers
-COUNTERS_COLLECTION = db.counters  # For auto-increment
+PASSENGER_ORDER = [("id", 1), ("_id", 1)]
 
 def serialize(doc):
     if not doc:
@@ -15,13 +17,7 @@ def serialize(doc):
 
 # ---------------- Utility for auto-increment ----------------
 async def get_next_passenger_id():
-    counter = await COUNTERS_COLLECTION.find_one_and_update(
-        {"_id": "passenger_id"},
-        {"$inc": {"seq": 1}},
-        upsert=True,
-        return_document=True
-    )
-    return counter["seq"]
+    return await id_allocator.next_id("passenger_id")
 
 # ---------------- Create Passenger (Self-registration) ----------------
 async def create_passenger(data: dict):
@@ -33,12 +29,10 @@ async def create_passenger(data: dict):
     return serialize(data)
 
 # ---------------- List Passengers (Admin only) ----------------
-async def list_passengers():
-    cursor = PASSENGER_COLLECTION.find({})
-    passengers = []
-    async for doc in cursor:
-        passengers.append(serialize(doc))
-    return passengers
+async def list_passengers(page: PageParams = None) -> Page:
+    result = await paginate(PASSENGER_COLLECTION, {}, PASSENGER_ORDER, page)
+    result.items = [serialize(doc) for doc in result.items]
+    return result
 
 # ---------------- Get Passenger by ID ----------------
 async def get_passenger_by_id(passenger_id: str):
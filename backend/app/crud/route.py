@@ -1,13 +1,42 @@
-import aiohttp
 from app.config import db
+from app.services.ids import id_allocator
 from bson import ObjectId
-from geopy.distance import geodesic
+from app.services.map_matcher import map_matcher
+from app.services.route_cache import route_cache
+from app.services.routing import routing
+from app.services.stop_index import stop_index
+from app.utils.geo import chainage_table
+from app.utils.pagination import Page, PageParams, paginate
+from app.utils.polyline import (
+    DEFAULT_SIMPLIFY_TOLERANCE_M,
+    SIMPLIFY_TOLERANCES_M,
+    encoded_level,
+    geometry_storage,
+    quantize,
+    route_geometry,
+)
 
 ROUTE_COLLECTION = db.routes
-COUNTERS_COLLECTION = db.counters  # For auto-increment
-OSRM_BASE = "https://router.project-osrm.org/route/v1/driving"
+ROUTE_ORDER = [("id", 1), ("_id", 1)]
 
-def serialize(doc):
+GEOMETRY_STORAGE_FIELDS = ["route_geometry", "route_geometry_polyline", "route_geometry_levels", "geometry_chainage"]
+
+def geometry_projection(geometry: str = "full", tolerance_m: float = None):
+    """
+    Mongo projection that leaves out the geometry fields a view does not read
+    """
+    if geometry == "none":
+        excluded = GEOMETRY_STORAGE_FIELDS
+    elif geometry == "simplified" or tolerance_m is not None:
+        tolerance_m = tolerance_m or DEFAULT_SIMPLIFY_TOLERANCE_M
+        excluded = ["geometry_chainage"]
+        if tolerance_m >= min(SIMPLIFY_TOLERANCES_M):
+            excluded.append("route_geometry_polyline")
+    else:
+        excluded = ["route_geometry_levels", "geometry_chainage"]
+    return {field: 0 for field in excluded}
+
+def serialize(doc, geometry: str = "full", tolerance_m: float = None):
     if not doc:
         return None
     doc["id"] = str(doc.get("id", str(doc["_id"])))
@@ -22,34 +51,45 @@ def serialize(doc):
             }
         else:
             doc[loc_key] = {"name": "", "latitude": 0.0, "longitude": 0.0}
-    # ensure route_geometry list exists
-    doc["route_geometry"] = doc.get("route_geometry", [])
+    # route_geometry as requested: full, simplified, encoded string or left out
+    if geometry == "encoded":
+        doc["route_geometry_encoded"] = encoded_level(doc, tolerance_m)
+        doc["route_geometry"] = []
+    elif geometry == "simplified":
+        doc["route_geometry"] = route_geometry(doc, tolerance_m or DEFAULT_SIMPLIFY_TOLERANCE_M)
+    elif geometry == "none":
+        doc["route_geometry"] = []
+    else:
+        doc["route_geometry"] = route_geometry(doc, tolerance_m)
+    for field in GEOMETRY_STORAGE_FIELDS[1:]:
+        doc.pop(field, None)
     return doc
 
 # ---------------- Utility for auto-increment ----------------
 async def get_next_route_id():
-    counter = await COUNTERS_COLLECTION.find_one_and_update(
-        {"_id": "route_id"},
-        {"$inc": {"seq": 1}},
-        upsert=True,
-        return_document=True,
-    )
-    return counter["seq"]
-
-# ---------------- Fetch road geometry from OSRM ----------------
-async def fetch_osrm_geometry(stops: list):
-    # OSRM expects: lon,lat;lon,lat;...
-    coords = ";".join([f"{s['longitude']},{s['latitude']}" for s in stops])
-    url = f"{OSRM_BASE}/{coords}?overview=full&geometries=geojson"
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as resp:
-            if resp.status != 200:
-                raise ValueError("OSRM routing failed")
-            data = await resp.json()
-            if not data.get("routes"):
-                raise ValueError("No route found by OSRM")
-            return data["routes"][0]["geometry"]["coordinates"]
-            # returns [[lon,lat], ...]
+    return await id_allocator.next_id("route_id")
+
+# ---------------- Fetch road geometry ----------------
+def stops_for(data: dict) -> list:
+    # source + intermediate + destination
+    return [data["source"]] + data.get("route_points", []) + [data["destination"]]
+
+def geometry_fields(route_points: list, geometry: list) -> dict:
+    # [lon,lat] → encoded polyline (+ simplified levels) and stop distance tables;
+    # vertex chainage is cheap to rebuild from the decoded line so it is not stored
+    points = quantize([{"latitude": lat, "longitude": lon} for lon, lat in geometry])
+    table = chainage_table(route_points, points)
+    return {
+        **geometry_storage(points),
+        "stop_chainage": table["stop_chainage"],
+        "route_length_m": table["route_length_m"],
+    }
+
+async def fetch_route_geometry(stops: list):
+    """
+    Road geometry as [[lon,lat], ...] from the configured routing provider (cached per leg)
+    """
+    return await routing.geometry(stops)
 
 # ---------------- Create Route ----------------
 async def create_route(data: dict):
@@ -58,36 +98,80 @@ async def create_route(data: dict):
         raise ValueError("Vehicle ID is already assigned to another route")
 
     data["id"] = await get_next_route_id()
+    data["stops_version"] = 1
 
-    # Prepare stops for OSRM (source + intermediate + destination)
-    stops = [data["source"]] + data.get("route_points", []) + [data["destination"]]
-    geometry = await fetch_osrm_geometry(stops)
-
-    # convert [lon,lat] → {"latitude":..,"longitude":..}
-    data["route_geometry"] = [
-        {"latitude": lat, "longitude": lon} for lon, lat in geometry
-    ]
+    # Road geometry plus distance tables so ETAs are a projection plus a subtraction
+    geometry = await fetch_route_geometry(stops_for(data))
+    data.update(geometry_fields(data.get("route_points", []), geometry))
 
     await ROUTE_COLLECTION.insert_one(data)
+    stop_index.index_route(data)
     return serialize(data)
 
+# ---------------- Bulk Create Routes ----------------
+async def create_routes_bulk(items: list):
+    """
+    Import many routes at once: one vehicle check, geometry for all routes
+    resolved together (shared legs are fetched once), one id block and one insert_many.
+    """
+    errors = []
+    vehicle_ids = [item["vehicle_id"] for item in items]
+    taken = {doc["vehicle_id"] async for doc in ROUTE_COLLECTION.find({"vehicle_id": {"$in": vehicle_ids}}, {"vehicle_id": 1})}
+    seen = set()
+    accepted = []
+    for index, item in enumerate(items):
+        if item["vehicle_id"] in taken or item["vehicle_id"] in seen:
+            errors.append({"index": index, "error": "Vehicle ID is already assigned to another route"})
+            continue
+        seen.add(item["vehicle_id"])
+        accepted.append((index, item))
+    if not accepted:
+        return {"created": [], "errors": errors}
+
+    try:
+        geometries = await routing.geometries([stops_for(item) for _, item in accepted])
+    except ValueError as e:
+        return {"created": [], "errors": errors + [{"index": index, "error": str(e)} for index, _ in accepted]}
+
+    ids = await id_allocator.next_ids("route_id", len(accepted))
+    docs = []
+    for route_id, (_, item), geometry in zip(ids, accepted, geometries):
+        item["id"] = route_id
+        item["stops_version"] = 1
+        item.update(geometry_fields(item.get("route_points", []), geometry))
+        docs.append(item)
+    await ROUTE_COLLECTION.insert_many(docs)
+    for doc in docs:
+        stop_index.index_route(doc)
+    return {"created": [serialize(doc) for doc in docs], "errors": errors}
+
 # ---------------- List Routes ----------------
-async def list_routes():
-    cursor = ROUTE_COLLECTION.find({})
-    routes = []
-    async for doc in cursor:
-        routes.append(serialize(doc))
-    return routes
+async def list_routes(page: PageParams = None, geometry: str = "full", tolerance_m: float = None,
+                      vehicle_id: str = None, destination: str = None) -> Page:
+    query = {}
+    if vehicle_id:
+        query["vehicle_id"] = vehicle_id
+    if destination:
+        query["destination.name"] = destination
+    geometry_sources = [field for field in GEOMETRY_STORAGE_FIELDS if field != "geometry_chainage"]
+    result = await paginate(
+        ROUTE_COLLECTION, query, ROUTE_ORDER, page,
+        projection=geometry_projection(geometry, tolerance_m),
+        field_sources={"route_geometry": geometry_sources, "route_geometry_encoded": geometry_sources},
+    )
+    result.items = [serialize(doc, geometry, tolerance_m) for doc in result.items]
+    return result
 
 # ---------------- Get Route by ID ----------------
-async def get_route_by_id(route_id: str):
-    doc = await ROUTE_COLLECTION.find_one({"id": int(route_id)}) if route_id.isdigit() else None
+async def get_route_by_id(route_id: str, geometry: str = "full", tolerance_m: float = None):
+    projection = geometry_projection(geometry, tolerance_m)
+    doc = await ROUTE_COLLECTION.find_one({"id": int(route_id)}, projection) if route_id.isdigit() else None
     if not doc:
         try:
-            doc = await ROUTE_COLLECTION.find_one({"_id": ObjectId(route_id)})
+            doc = await ROUTE_COLLECTION.find_one({"_id": ObjectId(route_id)}, projection)
         except Exception:
             doc = None
-    return serialize(doc)
+    return serialize(doc, geometry, tolerance_m)
 
 # ---------------- Update Route ----------------
 async def update_route(route_id: str, data: dict):
@@ -99,24 +183,33 @@ async def update_route(route_id: str, data: dict):
         if existing_vehicle:
             raise ValueError("Vehicle ID is already assigned to another route")
 
+    update = {"$set": data}
     # If stops changed, recompute geometry
     if any(k in data for k in ["source", "destination", "route_points"]):
-        existing = await get_route_by_id(route_id)
+        existing = await get_route_by_id(route_id, geometry="none")
         if not existing:
             return None
         merged = {**existing, **data}
-        stops = [merged["source"]] + merged.get("route_points", []) + [merged["destination"]]
-        geometry = await fetch_osrm_geometry(stops)
-        data["route_geometry"] = [
-            {"latitude": lat, "longitude": lon} for lon, lat in geometry
-        ]
-
-    await ROUTE_COLLECTION.update_one({"id": int(route_id)}, {"$set": data})
-    return await get_route_by_id(route_id)
+        geometry = await fetch_route_geometry(stops_for(merged))
+        data.update(geometry_fields(merged.get("route_points", []), geometry))
+        # Drop the pre-encoding list fields if this document still has them
+        update["$unset"] = {"route_geometry": "", "geometry_chainage": ""}
+        update["$inc"] = {"stops_version": 1}
+
+    await ROUTE_COLLECTION.update_one({"id": int(route_id)}, update)
+    map_matcher.invalidate_route(route_id)
+    route_cache.invalidate(route_id)
+    updated = await get_route_by_id(route_id)
+    if updated and "route_points" in data:
+        stop_index.index_route(updated)
+    return updated
 
 # ---------------- Delete Route ----------------
 async def delete_route(route_id: str):
     result = await ROUTE_COLLECTION.delete_one({"id": int(route_id)})
+    stop_index.remove_route(route_id)
+    map_matcher.invalidate_route(route_id)
+    route_cache.invalidate(route_id)
     return result.deleted_count > 0
 
 # ---------------- Find Routes by Destination ----------------
@@ -133,17 +226,22 @@ async def find_nearest_stop_and_routes(routes, lat, lng):
     Given a list of routes and a coordinate, find the nearest stop among all route_points.
     Returns (nearest_stop_name, [routes_that_include_stop])
     """
-    min_dist = float("inf")
-    nearest_stop = None
-    nearest_routes = []
     for route in routes:
-        for stop in route.get("route_points", []):
-            dist = geodesic((lat, lng), (stop["latitude"], stop["longitude"])).meters
-            if dist < min_dist:
-                min_dist = dist
-                nearest_stop = stop["name"]
+        if not stop_index.has_route(route["id"]):
+            stop_index.index_route(route)
+    found = stop_index.nearest(lat, lng, k=1, route_ids=[route["id"] for route in routes])
+    if not found:
+        return None, []
+    nearest_stop = found[0][1].name
     # Find all routes that include this stop
-    for route in routes:
-        if any(s["name"] == nearest_stop for s in route.get("route_points", [])):
-            nearest_routes.append(route)
+    route_ids = stop_index.routes_for_stop(nearest_stop)
+    nearest_routes = [route for route in routes if str(route["id"]) in route_ids]
     return nearest_stop, nearest_routes
+
+
+# ---------------- Find Nearest Stops ----------------
+def find_nearest_stops(lat, lng, k=1):
+    """
+    k nearest stops across every route, closest first
+    """
+    return [entry.to_dict(distance) for distance, entry in stop_index.nearest(lat, lng, k=k)]
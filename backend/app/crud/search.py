@@ -0,0 +1,60 @@
+import asyncio
+from app.crud import route as route_crud
+from app.crud import session as session_crud
+from app.crud.eta import eta_minutes_to_stop
+from app.services.live_state import live_state
+
+
+# ---------------- Passenger Bus Search ----------------
+async def search_buses(destination: str, bus_stop: str = None, current_lat: float = None, current_lng: float = None):
+    """
+    Find upcoming buses towards a destination in a fixed number of queries:
+    routes by destination, one $in for active sessions, then drivers and live
+    positions fetched concurrently. ETAs are computed from the loaded routes.
+    """
+    # Find all routes with this destination
+    routes = await route_crud.find_routes_by_destination(destination)
+    if not routes:
+        return {"nearest_stop": None, "buses": []}
+
+    # If bus_stop is provided, filter routes that pass through it
+    if bus_stop:
+        candidate_routes = [r for r in routes if any(s["name"] == bus_stop for s in r.get("route_points", []))]
+        nearest_stop = bus_stop
+    else:
+        # Find nearest stop among all route_points in all routes
+        if current_lat is None or current_lng is None:
+            raise ValueError("current_lat and current_lng required if bus_stop not provided")
+        nearest_stop, candidate_routes = await route_crud.find_nearest_stop_and_routes(routes, current_lat, current_lng)
+        if not nearest_stop:
+            return {"nearest_stop": None, "buses": []}
+    if not candidate_routes:
+        return {"nearest_stop": nearest_stop, "buses": []}
+
+    routes_by_id = {str(r["id"]): r for r in candidate_routes}
+    sessions = await session_crud.find_active_sessions_by_routes(routes_by_id.keys())
+    if not sessions:
+        return {"nearest_stop": nearest_stop, "buses": []}
+
+    session_ids = [str(s.get("id", s["_id"])) for s in sessions]
+    positions, drivers = await asyncio.gather(
+        live_state.get_latest_many(session_ids),
+        session_crud.get_drivers_info({s.get("driver_id") for s in sessions}),
+    )
+
+    buses = []
+    for session_id, sess in zip(session_ids, sessions):
+        position = positions.get(session_id)
+        if not position:
+            continue
+        route = routes_by_id[str(sess["route_id"])]
+        driver_info = drivers.get(str(sess.get("driver_id")))
+        buses.append({
+            "vehicle_id": str(sess["vehicle_id"]),
+            "route_name": route["route_name"],
+            "driver": driver_info.get("name") if driver_info else None,
+            "eta_minutes": eta_minutes_to_stop(route, nearest_stop, position),
+            "current_lat": position.get("lat"),
+            "current_lng": position.get("lng"),
+        })
+    return {"nearest_stop": nearest_stop, "buses": buses}
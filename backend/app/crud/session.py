@@ -1,15 +1,26 @@
 from app.config import db
+from app.services.ids import id_allocator
+from app.services.map_matcher import map_matcher
+from app.services.route_cache import route_cache
+from app.services.schedule import ScheduleIndex, interval_end_for, naive_utc, schedule_index
+from app.utils.pagination import Page, PageParams, keyset_index, paginate
+from app.schemas.session import SessionCreate
 from bson import ObjectId
 from datetime import datetime, timedelta
+from pydantic import ValidationError
+import csv
+import io
+import json
 
 SESSION_COLLECTION = db.sessions
-COUNTERS_COLLECTION = db.counters
-ROUTE_COLLECTION = db.routes
+SESSION_ORDER = [("start_time", 1), ("_id", 1)]
+keyset_index(SESSION_COLLECTION, SESSION_ORDER)
 DRIVER_COLLECTION = db.drivers
+MAX_BATCH_SIZE = 2000
 
 
 # ---------------- Serialize Document ----------------
-async def serialize(doc):
+def serialize_with_routes(doc, routes: dict):
     if not doc:
         return None
     doc["id"] = str(doc.get("id", str(doc.get("_id"))))
@@ -17,72 +28,72 @@ async def serialize(doc):
     # Attach route_name if route_id exists
     doc["route_name"] = None
     if "route_id" in doc:
-        try:
-            route_doc = await ROUTE_COLLECTION.find_one({"id": int(doc["route_id"])})
-            if route_doc:
-                doc["route_name"] = route_doc.get("route_name")
-        except Exception:
-            pass
+        route = routes.get(str(doc["route_id"]))
+        if route:
+            doc["route_name"] = route.get("route_name")
 
     doc.pop("_id", None)
     return doc
 
 
-# ---------------- Utility for auto-increment ----------------
-async def get_next_session_id():
-    counter = await COUNTERS_COLLECTION.find_one_and_update(
-        {"_id": "session_id"},
-        {"$inc": {"seq": 1}},
-        upsert=True,
-        return_document=True
-    )
-    return counter["seq"]
-
-
-# ---------------- Route Lookup ----------------
-async def get_route_by_id(route_id: int):
-    return await ROUTE_COLLECTION.find_one({"id": route_id})
-
-
-# ---------------- Last Session for Entity ----------------
-async def get_last_session(entity_field: str, entity_id: int):
-    doc = await SESSION_COLLECTION.find_one(
-        {entity_field: entity_id},
-        sort=[("start_time", -1)]
-    )
-    return doc
-
+async def serialize(doc):
+    if not doc:
+        return None
+    return serialize_with_routes(doc, await route_cache.get_many([doc.get("route_id")]))
 
-# ---------------- Overlap Check ----------------
-async def is_overlapping(entity_field: str, entity_id: int, new_start_time: datetime):
-    last_session = await get_last_session(entity_field, entity_id)
-    if not last_session:
-        return False, None
 
-    route_id = last_session.get("route_id")
-    if not route_id:
-        return False, None
+async def serialize_many(docs: list):
+    """
+    Serialize a page of sessions with one route lookup for all of them
+    """
+    routes = await route_cache.get_many(doc.get("route_id") for doc in docs)
+    return [serialize_with_routes(doc, routes) for doc in docs]
 
-    route = await get_route_by_id(int(route_id))
-    est_minutes = int(route["estimated_time"]) if route and "estimated_time" in route else 0
-    last_start = last_session["start_time"]
 
-    if isinstance(last_start, str):
-        last_start = datetime.fromisoformat(last_start)
+# ---------------- Utility for auto-increment ----------------
+async def get_next_session_id():
+    return await id_allocator.next_id("session_id")
 
-    last_end = last_start + timedelta(minutes=est_minutes)
-    if last_end > new_start_time:
-        return True, {**last_session, "calculated_end_time": last_end}
 
-    return False, None
+# ---------------- Route Lookup ----------------
+async def get_route_by_id(route_id: int):
+    # Sessions only need the route's name and duration, never its geometry
+    return await route_cache.get(route_id)
+
+
+# ---------------- Schedule Conflict Check ----------------
+ENTITY_LABELS = {"driver_id": "Driver", "vehicle_id": "Vehicle", "conductor_id": "Conductor"}
+
+async def check_schedule(entities: dict, start: datetime, end: datetime, exclude_session_id: str = None):
+    """
+    Raise ValueError for a session that collides with [start, end) for any of
+    the given driver/vehicle/conductor ids. Every earlier and later session is
+    considered, not just the most recent one.
+    """
+    found = await schedule_index.check(entities, start, end, exclude_session_id)
+    if found:
+        raise ValueError(conflict_message(entities, start, found))
+
+
+def conflict_message(entities: dict, start: datetime, found: list) -> str:
+    # Same start time first (vehicle, driver, conductor), then overlaps (driver, conductor, vehicle)
+    same_start = [pair for pair in found if pair[1].start == start]
+    if same_start:
+        field, _ = min(same_start, key=lambda pair: ("vehicle_id", "driver_id", "conductor_id").index(pair[0]))
+        return f"{ENTITY_LABELS[field]} {entities[field]} already has a session at {start}"
+    field, other = min(found, key=lambda pair: ("driver_id", "conductor_id", "vehicle_id").index(pair[0]))
+    if field == "vehicle_id":
+        busy_with = f"driver {other.entities.get('driver_id')}"
+    else:
+        busy_with = f"vehicle {other.entities.get('vehicle_id')}"
+    return f"{ENTITY_LABELS[field]} {entities[field]} busy with {busy_with} until {other.end}"
 
 
-# ---------------- Hard Conflict Check ----------------
-async def has_hard_conflict(field: str, entity_id: int, new_start_time: datetime, exclude_session_id: str = None):
-    query = {field: entity_id, "start_time": new_start_time}
-    if exclude_session_id:
-        query["id"] = {"$ne": int(exclude_session_id)}
-    return await SESSION_COLLECTION.find_one(query)
+def schedule_entities(driver_id, vehicle_id, conductor_id=None) -> dict:
+    entities = {"driver_id": str(driver_id), "vehicle_id": str(vehicle_id)}
+    if conductor_id:
+        entities["conductor_id"] = str(conductor_id)
+    return entities
 
 
 # ---------------- Create Session ----------------
@@ -92,38 +103,10 @@ async def create_session(data: dict):
 
     # Parse start_time
     if isinstance(data["start_time"], str):
-        new_start_time = datetime.fromisoformat(data["start_time"])
-    else:
-        new_start_time = data["start_time"]
-
-    # Hard conflict checks
-    if await has_hard_conflict("vehicle_id", int(data["vehicle_id"]), new_start_time):
-        raise ValueError(f"Vehicle {data['vehicle_id']} already has a session at {new_start_time}")
-    if await has_hard_conflict("driver_id", int(data["driver_id"]), new_start_time):
-        raise ValueError(f"Driver {data['driver_id']} already has a session at {new_start_time}")
-    if data.get("conductor_id"):
-        if await has_hard_conflict("conductor_id", int(data["conductor_id"]), new_start_time):
-            raise ValueError(f"Conductor {data['conductor_id']} already has a session at {new_start_time}")
-
-    # Overlap checks
-    overlap, last = await is_overlapping("driver_id", int(data["driver_id"]), new_start_time)
-    if overlap:
-        raise ValueError(
-            f"Driver {data['driver_id']} busy with vehicle {last['vehicle_id']} until {last['calculated_end_time']}"
-        )
-    if data.get("conductor_id"):
-        overlap, last = await is_overlapping("conductor_id", int(data["conductor_id"]), new_start_time)
-        if overlap:
-            raise ValueError(
-                f"Conductor {data['conductor_id']} busy with vehicle {last['vehicle_id']} until {last['calculated_end_time']}"
-            )
-    overlap, last = await is_overlapping("vehicle_id", int(data["vehicle_id"]), new_start_time)
-    if overlap:
-        raise ValueError(
-            f"Vehicle {data['vehicle_id']} busy with driver {last['driver_id']} until {last['calculated_end_time']}"
-        )
+        data["start_time"] = datetime.fromisoformat(data["start_time"])
+    new_start_time = naive_utc(data["start_time"])
 
-    # Fetch route info by route_id
+    # Fetch route info by route_id; its duration sets the session's interval
     route = await get_route_by_id(int(data["route_id"]))
     if not route:
         raise ValueError(f"Route {data['route_id']} not found")
@@ -131,21 +114,137 @@ async def create_session(data: dict):
     data["route_name"] = route.get("route_name")
 
     # Calculate end_time
-    est_minutes = int(route["estimated_time"]) if "estimated_time" in route else 0
+    est_minutes = int(route["estimated_time"] or 0)
     data["end_time"] = new_start_time + timedelta(minutes=est_minutes) if est_minutes else None
+    data["interval_end"] = interval_end_for(new_start_time, est_minutes)
 
-    data["id"] = await get_next_session_id()
-    await SESSION_COLLECTION.insert_one(data)
+    async with schedule_index.lock:
+        entities = schedule_entities(data["driver_id"], data["vehicle_id"], data.get("conductor_id"))
+        await check_schedule(entities, new_start_time, data["interval_end"])
+
+        data["id"] = await get_next_session_id()
+        await SESSION_COLLECTION.insert_one(data)
+        schedule_index.add(data)
     return await serialize(data)
 
 
+# ---------------- Bulk Create Sessions ----------------
+async def create_sessions_bulk(items: list, dry_run: bool = False):
+    """
+    Import a timetable in one pass: routes resolved with one $in, stored
+    sessions of every driver/vehicle/conductor in the batch loaded with one
+    query, then each row checked in memory against them and against the rows
+    accepted before it. Accepted rows get one id block and one insert_many;
+    with dry_run nothing is written.
+    """
+    if len(items) > MAX_BATCH_SIZE:
+        raise ValueError(f"Batch too large: {len(items)} items (max {MAX_BATCH_SIZE})")
+
+    results = [{"index": index, "accepted": False, "id": None, "error": item.get("error")} for index, item in enumerate(items)]
+    rows = []
+    for index, item in enumerate(items):
+        if results[index]["error"]:
+            continue
+        if not item.get("driver_id") or not item.get("vehicle_id") or not item.get("route_id"):
+            results[index]["error"] = "Driver ID, Vehicle ID and Route ID are required."
+            continue
+        if isinstance(item["start_time"], str):
+            item["start_time"] = datetime.fromisoformat(item["start_time"])
+        rows.append((index, item))
+
+    routes = await route_cache.get_many(item["route_id"] for _, item in rows)
+
+    planned = []
+    for index, item in rows:
+        route = routes.get(str(item["route_id"]))
+        if not route:
+            results[index]["error"] = f"Route {item['route_id']} not found"
+            continue
+        start = naive_utc(item["start_time"])
+        est_minutes = int(route["estimated_time"] or 0)
+        item["route_name"] = route.get("route_name")
+        item["end_time"] = start + timedelta(minutes=est_minutes) if est_minutes else None
+        item["interval_end"] = interval_end_for(start, est_minutes)
+        entities = schedule_entities(item["driver_id"], item["vehicle_id"], item.get("conductor_id"))
+        planned.append((index, item, start, entities))
+
+    async with schedule_index.lock:
+        if planned:
+            await schedule_index.preload(
+                [entities for _, _, _, entities in planned],
+                min(start for _, _, start, _ in planned),
+                max(item["interval_end"] for _, item, _, _ in planned),
+            )
+
+        batch = ScheduleIndex(None, 0)  # rows accepted so far, for conflicts within the file
+        accepted = []
+        for index, item, start, entities in planned:
+            found = schedule_index.conflicts(entities, start, item["interval_end"])
+            found += batch.conflicts(entities, start, item["interval_end"])
+            if found:
+                results[index]["error"] = conflict_message(entities, start, found)
+                continue
+            batch.add({**item, "id": f"row {index}"})
+            accepted.append((index, item))
+
+        if accepted and not dry_run:
+            ids = await id_allocator.next_ids("session_id", len(accepted))
+            for session_id, (_, item) in zip(ids, accepted):
+                item["id"] = session_id
+            await SESSION_COLLECTION.insert_many([item for _, item in accepted])
+            for _, item in accepted:
+                schedule_index.add(item)
+
+    for index, item in accepted:
+        results[index]["accepted"] = True
+        results[index]["id"] = str(item["id"]) if not dry_run else None
+    return {
+        "dry_run": dry_run,
+        "accepted": len(accepted),
+        "rejected": len(items) - len(accepted),
+        "results": results,
+    }
+
+
+# ---------------- Parse Timetable Upload ----------------
+def parse_timetable(text: str, filename: str = ""):
+    """
+    Rows of a CSV (header row) or JSON-lines timetable as session dicts;
+    rows that do not parse become {"error": ...} so they show up in the report
+    """
+    if filename.lower().endswith(".csv"):
+        raw_rows = [{k: (v if v != "" else None) for k, v in row.items()} for row in csv.DictReader(io.StringIO(text))]
+    else:
+        raw_rows = []
+        for line_no, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                raw_rows.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raw_rows.append({"error": f"Line {line_no}: invalid JSON ({e.msg})"})
+
+    items = []
+    for row in raw_rows:
+        if "error" in row:
+            items.append(row)
+            continue
+        try:
+            items.append(SessionCreate(**row).dict())
+        except ValidationError as e:
+            problems = "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+            items.append({"error": problems})
+    return items
+
+
 # ---------------- List Sessions ----------------
-async def list_sessions():
-    cursor = SESSION_COLLECTION.find({}).sort("start_time", 1)
-    result = []
-    async for doc in cursor:
-        serialized_doc = await serialize(doc)
-        result.append(serialized_doc)
+async def list_sessions(page: PageParams = None, driver_id: str = None, vehicle_id: str = None, route_id: str = None) -> Page:
+    query = {}
+    for field, value in (("driver_id", driver_id), ("vehicle_id", vehicle_id), ("route_id", route_id)):
+        if value:
+            query[field] = value
+    result = await paginate(SESSION_COLLECTION, query, SESSION_ORDER, page, field_sources={"route_name": ["route_id"]})
+    result.items = await serialize_many(result.items)
     return result
 
 
@@ -170,65 +269,52 @@ async def update_session(session_id: str, data: dict):
     if isinstance(new_start_time, str):
         new_start_time = datetime.fromisoformat(new_start_time)
 
-    vehicle_id = int(data.get("vehicle_id", existing["vehicle_id"]))
-    driver_id = int(data.get("driver_id", existing["driver_id"]))
+    new_start_time = naive_utc(new_start_time)
+    vehicle_id = data.get("vehicle_id", existing["vehicle_id"])
+    driver_id = data.get("driver_id", existing["driver_id"])
     conductor_id = data.get("conductor_id", existing.get("conductor_id"))
-    conductor_id = int(conductor_id) if conductor_id else None
     route_id = int(data.get("route_id", existing["route_id"]))
 
-    # Hard conflict checks
-    if await has_hard_conflict("vehicle_id", vehicle_id, new_start_time, session_id):
-        raise ValueError(f"Vehicle {vehicle_id} already has a session at {new_start_time}")
-    if await has_hard_conflict("driver_id", driver_id, new_start_time, session_id):
-        raise ValueError(f"Driver {driver_id} already has a session at {new_start_time}")
-    if conductor_id:
-        if await has_hard_conflict("conductor_id", conductor_id, new_start_time, session_id):
-            raise ValueError(f"Conductor {conductor_id} already has a session at {new_start_time}")
-
-    # Overlap checks
-    overlap, last = await is_overlapping("driver_id", driver_id, new_start_time)
-    if overlap and str(last["id"]) != session_id:
-        raise ValueError(
-            f"Driver {driver_id} busy with vehicle {last['vehicle_id']} until {last['calculated_end_time']}"
-        )
-    if conductor_id:
-        overlap, last = await is_overlapping("conductor_id", conductor_id, new_start_time)
-        if overlap and str(last["id"]) != session_id:
-            raise ValueError(
-                f"Conductor {conductor_id} busy with vehicle {last['vehicle_id']} until {last['calculated_end_time']}"
-            )
-    overlap, last = await is_overlapping("vehicle_id", vehicle_id, new_start_time)
-    if overlap and str(last["id"]) != session_id:
-        raise ValueError(
-            f"Vehicle {vehicle_id} busy with driver {last['driver_id']} until {last['calculated_end_time']}"
-        )
-
     # Fetch route info
     route = await get_route_by_id(route_id)
     if not route:
         raise ValueError(f"Route {route_id} not found")
 
     data["route_name"] = route.get("route_name")
-    est_minutes = int(route["estimated_time"]) if "estimated_time" in route else 0
+    est_minutes = int(route["estimated_time"] or 0)
     data["end_time"] = new_start_time + timedelta(minutes=est_minutes) if est_minutes else None
+    data["interval_end"] = interval_end_for(new_start_time, est_minutes)
+
+    async with schedule_index.lock:
+        entities = schedule_entities(driver_id, vehicle_id, conductor_id)
+        await check_schedule(entities, new_start_time, data["interval_end"], session_id)
 
-    await SESSION_COLLECTION.update_one({"id": int(session_id)}, {"$set": data})
+        await SESSION_COLLECTION.update_one({"id": int(session_id)}, {"$set": data})
+        schedule_index.add({**existing, **data, "start_time": new_start_time})
     return await get_session_by_id(session_id)
 
 
 # ---------------- Delete Session ----------------
 async def delete_session(session_id: str):
     result = await SESSION_COLLECTION.delete_one({"id": int(session_id)})
+    map_matcher.forget_session(session_id)
+    schedule_index.remove(session_id)
     return result.deleted_count > 0
 
 
 # ---------------- Find Active Sessions by Route ----------------
 async def find_active_sessions_by_route(route_id):
     cursor = SESSION_COLLECTION.find({"route_id": str(route_id), "end_time": None})
-    sessions = []
-    async for doc in cursor:
-        sessions.append(await serialize(doc))
-    return sessions
+    return await serialize_many([doc async for doc in cursor])
+
+
+# ---------------- Find Active Sessions for Many Routes ----------------
+async def find_active_sessions_by_routes(route_ids):
+    """
+    Raw active session documents for a set of routes in one $in query
+    """
+    cursor = SESSION_COLLECTION.find({"route_id": {"$in": [str(r) for r in route_ids]}, "end_time": None})
+    return [doc async for doc in cursor]
 
 
 # ---------------- Get Driver Info ----------------
@@ -237,3 +323,12 @@ async def get_driver_info(driver_id):
     if not doc:
         return {}
     return {"name": doc.get("name")}
+
+
+# ---------------- Get Driver Info for Many Drivers ----------------
+async def get_drivers_info(driver_ids):
+    ids = {int(d) for d in driver_ids if str(d).isdigit()}
+    if not ids:
+        return {}
+    cursor = DRIVER_COLLECTION.find({"id": {"$in": list(ids)}}, {"id": 1, "name": 1})
+    return {str(doc["id"]): {"name": doc.get("name")} async for doc in cursor}
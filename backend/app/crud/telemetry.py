@@ -1,12 +1,25 @@
 from typing import List, Optional
-from app.config import db
+from app.config import db, EXPORT_BATCH_SIZE
+from app.utils.pagination import Page, PageParams, keyset_index, paginate
+from app.services.ids import id_allocator
 from app.schemas.telemetry import TelemetryCreate, TelemetryResponse
+from app.services.archive import telemetry_archive
+from app.services.live_hub import live_event
+from app.services.pubsub import pubsub, TELEMETRY_CHANNEL
+from app.services.live_state import live_state, session_query_for
+from app.services.map_matcher import map_matcher
+from app.services.retention import retention
+from app.utils.gps import is_valid_gps
 from datetime import datetime
 from bson import ObjectId
+from pymongo.errors import BulkWriteError
 
 SESSION_COLLECTION = db.sessions
 TELEMETRY_COLLECTION = db.telemetry
-COUNTERS_COLLECTION = db.counters
+TELEMETRY_ORDER = [("received_at", -1), ("_id", -1)]
+keyset_index(TELEMETRY_COLLECTION, TELEMETRY_ORDER)
+
+MAX_BATCH_SIZE = 1000
 
 def serialize(doc):
     if not doc:
@@ -16,21 +29,67 @@ def serialize(doc):
     return doc
 
 async def get_next_telemetry_id():
-    counter = await COUNTERS_COLLECTION.find_one_and_update(
-        {"_id": "telemetry_id"},
-        {"$inc": {"seq": 1}},
-        upsert=True,
-        return_document=True,
-    )
-    return counter["seq"]
+    return await id_allocator.next_id("telemetry_id")
+
+async def get_next_telemetry_ids(count: int) -> List[int]:
+    """
+    Reserve `count` telemetry ids from the allocator in one call
+    """
+    return await id_allocator.next_ids("telemetry_id", count)
+
+def build_telemetry_record(telemetry_id: int, telemetry_data: dict, session: dict, match: Optional[dict] = None) -> dict:
+    record = {
+        "id": telemetry_id,
+        "session_id": telemetry_data["session_id"],
+        "vehicle_id": str(session.get("vehicle_id", "")),
+        "driver_id": str(telemetry_data["driver_id"]),
+        "latitude": float(telemetry_data["latitude"]),
+        "longitude": float(telemetry_data["longitude"]),
+        "speed": float(telemetry_data.get("speed") or 0),
+        "timestamp": telemetry_data.get("timestamp") or datetime.utcnow().isoformat(),
+        "created_at": datetime.utcnow().isoformat(),
+        "received_at": datetime.utcnow()
+    }
+    if match:
+        record.update(match)
+    return record
+
+async def match_fix(session: dict, telemetry_data: dict) -> Optional[dict]:
+    """
+    Map-match a fix onto the session's route; failures never block ingest
+    """
+    if not session.get("route_id"):
+        return None
+    try:
+        return await map_matcher.match(
+            telemetry_data["session_id"],
+            session["route_id"],
+            float(telemetry_data["latitude"]),
+            float(telemetry_data["longitude"]),
+        )
+    except Exception as e:
+        print(f"Error map matching fix for session {telemetry_data['session_id']}: {e}")
+        return None
+
+def gps_point_for(record: dict) -> dict:
+    point = {
+        "lat": record["latitude"],
+        "lng": record["longitude"],
+        "speed": record["speed"],
+        "timestamp": record["timestamp"],
+    }
+    if "chainage_m" in record:
+        point["chainage_m"] = record["chainage_m"]
+        point["off_route_m"] = record["off_route_m"]
+    return point
 
 async def create_telemetry_transmission(telemetry_data: dict) -> TelemetryResponse:
     """
-    Add GPS transmission to session and store in telemetry collection (keep only last 5 per session)
+    Add GPS transmission to session and store in telemetry collection (retention keeps the last few per session)
     """
     try:
         # Validate session exists and is active
-        session_query = {"id": int(telemetry_data["session_id"])} if telemetry_data["session_id"].isdigit() else {"_id": telemetry_data["session_id"]}
+        session_query = session_query_for(telemetry_data["session_id"])
         session = await SESSION_COLLECTION.find_one(session_query)
         if not session:
             raise ValueError(f"Session not found: {telemetry_data['session_id']}")
@@ -40,85 +99,157 @@ async def create_telemetry_transmission(telemetry_data: dict) -> TelemetryRespon
         request_driver_id = str(telemetry_data["driver_id"])
         if session_driver_id != request_driver_id:
             raise ValueError(f"Driver ID {request_driver_id} does not match session driver {session_driver_id}")
-        
-        # Create GPS point
-        gps_point = {
-            "lat": float(telemetry_data["latitude"]),
-            "lng": float(telemetry_data["longitude"]),
-            "timestamp": telemetry_data.get("timestamp", datetime.utcnow().isoformat())
-        }
+        if not is_valid_gps(telemetry_data.get("latitude"), telemetry_data.get("longitude")):
+            raise ValueError("Invalid GPS coordinates")
         
         # Store in telemetry collection
-        telemetry_record = {
-            "id": await get_next_telemetry_id(),
-            "session_id": telemetry_data["session_id"],
-            "vehicle_id": str(session.get("vehicle_id", "")),
-            "driver_id": request_driver_id,
-            "latitude": gps_point["lat"],
-            "longitude": gps_point["lng"],
-            "speed": float(telemetry_data.get("speed", 0)),
-            "timestamp": gps_point["timestamp"],
-            "created_at": datetime.utcnow().isoformat()
-        }
+        match = await match_fix(session, telemetry_data)
+        telemetry_record = build_telemetry_record(await get_next_telemetry_id(), telemetry_data, session, match)
         await TELEMETRY_COLLECTION.insert_one(telemetry_record)
+        telemetry_archive.record(telemetry_record)
         
-        # Keep only last 5 telemetry records for this session
-        await maintain_last_5_telemetry_records(telemetry_data["session_id"])
+        # Older records for this session are trimmed by the retention service
+        retention.mark("telemetry", telemetry_data["session_id"])
         
-        # Update session with GPS history (keep only last 5)
-        current_history = session.get("gps_history", [])
-        current_history.append(gps_point)
-        if len(current_history) > 5:
-            current_history = current_history[-5:]
-        
-        await SESSION_COLLECTION.update_one(
-            session_query,
-            {"$set": {"gps_history": current_history}}
-        )
+        # Update live GPS history; persisted to the session by the live state flush
+        live_state.record(telemetry_data["session_id"], gps_point_for(telemetry_record), session.get("gps_history"))
+        pubsub.publish(TELEMETRY_CHANNEL, live_event(telemetry_record, session.get("route_id")))
         
         return TelemetryResponse(
             id=str(telemetry_record["id"]),
-            vehicle_id=str(session.get("vehicle_id", "")),
-            timestamp=gps_point["timestamp"],
-            latitude=gps_point["lat"],
-            longitude=gps_point["lng"],
-            speed=float(telemetry_data.get("speed", 0))
+            vehicle_id=telemetry_record["vehicle_id"],
+            timestamp=telemetry_record["timestamp"],
+            latitude=telemetry_record["latitude"],
+            longitude=telemetry_record["longitude"],
+            speed=telemetry_record["speed"]
         )
     except ValueError:
         raise
     except Exception as e:
         raise ValueError(f"Error processing telemetry data: {str(e)}")
 
-async def maintain_last_5_telemetry_records(session_id: str):
+async def create_telemetry_batch(items: List[dict]) -> dict:
     """
-    Keep only the last 5 telemetry records for a session, delete older ones
+    Ingest a batch of GPS transmissions for one or more sessions.
+    Each session is looked up once, ids are reserved in one block and accepted
+    fixes are written with a single insert_many. Only fixes that were stored
+    reach live state, subscribers and the archive. Returns a per-item report.
     """
+    if len(items) > MAX_BATCH_SIZE:
+        raise ValueError(f"Batch too large: {len(items)} items (max {MAX_BATCH_SIZE})")
+
+    results = [{"index": index, "accepted": False, "id": None, "error": None} for index in range(len(items))]
+
+    # Load every referenced session in one query
+    session_ids = {str(item["session_id"]) for item in items}
+    numeric_ids = [int(sid) for sid in session_ids if sid.isdigit()]
+    other_ids = [sid for sid in session_ids if not sid.isdigit()]
+    clauses = []
+    if numeric_ids:
+        clauses.append({"id": {"$in": numeric_ids}})
+    if other_ids:
+        clauses.append({"_id": {"$in": other_ids}})
+    sessions = {}
+    if clauses:
+        async for doc in SESSION_COLLECTION.find({"$or": clauses}):
+            key = str(doc["id"]) if "id" in doc else str(doc["_id"])
+            sessions[key] = doc
+
+    # Validate every item against its session
+    accepted = []
+    for index, item in enumerate(items):
+        session_id = str(item["session_id"])
+        session = sessions.get(session_id)
+        if not session:
+            results[index]["error"] = f"Session not found: {session_id}"
+            continue
+        session_driver_id = str(session.get("driver_id"))
+        if session_driver_id != str(item["driver_id"]):
+            results[index]["error"] = f"Driver ID {item['driver_id']} does not match session driver {session_driver_id}"
+            continue
+        if not is_valid_gps(item.get("latitude"), item.get("longitude")):
+            results[index]["error"] = "Invalid GPS coordinates"
+            continue
+        accepted.append((index, {**item, "session_id": session_id}, session))
+
+    if not accepted:
+        return {"accepted": 0, "rejected": len(items), "results": results}
+
+    # Allocate ids in one block and write all records at once
+    ids = await get_next_telemetry_ids(len(accepted))
+    records = [
+        build_telemetry_record(telemetry_id, item, session, await match_fix(session, item))
+        for telemetry_id, (_, item, session) in zip(ids, accepted)
+    ]
+    failed = {}
     try:
-        # Get all telemetry records for this session, sorted by timestamp (newest first)
-        cursor = TELEMETRY_COLLECTION.find({"session_id": session_id}).sort("timestamp", -1)
-        records = []
-        async for doc in cursor:
-            records.append(doc)
-        
-        # If more than 5 records, delete the excess (oldest ones)
-        if len(records) > 5:
-            records_to_keep = records[:5]  # Keep first 5 (newest)
-            records_to_delete = records[5:]  # Delete rest (oldest)
-            
-            # Delete the oldest records
-            for record in records_to_delete:
-                await TELEMETRY_COLLECTION.delete_one({"_id": record["_id"]})
-                
-    except Exception as e:
-        # Log error but don't fail the main operation
-        print(f"Error maintaining telemetry records for session {session_id}: {e}")
+        await TELEMETRY_COLLECTION.insert_many(records, ordered=False)
+    except BulkWriteError as e:
+        failed = {error["index"]: error.get("errmsg", "Write failed") for error in e.details.get("writeErrors", [])}
 
-async def list_telemetry():
-    cursor = TELEMETRY_COLLECTION.find({}).sort("timestamp", -1)
-    telemetry_list = []
-    async for doc in cursor:
-        telemetry_list.append(serialize(doc))
-    return telemetry_list
+    stored = []
+    for position, (record, (index, item, session)) in enumerate(zip(records, accepted)):
+        if position in failed:
+            results[index]["error"] = f"Error storing telemetry: {failed[position]}"
+            continue
+        stored.append(record)
+        live_state.record(item["session_id"], gps_point_for(record), session.get("gps_history"))
+        pubsub.publish(TELEMETRY_CHANNEL, live_event(record, session.get("route_id")))
+        results[index]["accepted"] = True
+        results[index]["id"] = str(record["id"])
+    telemetry_archive.record_many(stored)
+
+    for session_id in {record["session_id"] for record in stored}:
+        retention.mark("telemetry", session_id)
+
+    return {"accepted": len(stored), "rejected": len(items) - len(stored), "results": results}
+
+def telemetry_query(session_id: str = None, vehicle_id: str = None, since: datetime = None, until: datetime = None) -> dict:
+    query = {}
+    if session_id:
+        query["session_id"] = session_id
+    if vehicle_id:
+        query["vehicle_id"] = vehicle_id
+    if since or until:
+        query["received_at"] = {**({"$gte": since} if since else {}), **({"$lt": until} if until else {})}
+    return query
+
+async def list_telemetry(page: PageParams = None, session_id: str = None, vehicle_id: str = None,
+                         since: datetime = None, until: datetime = None) -> Page:
+    query = telemetry_query(session_id, vehicle_id, since, until)
+    result = await paginate(TELEMETRY_COLLECTION, query, TELEMETRY_ORDER, page)
+    result.items = [serialize(doc) for doc in result.items]
+    return result
+
+# ---------------- Export Telemetry ----------------
+TELEMETRY_EXPORT_COLUMNS = [
+    "id", "session_id", "vehicle_id", "driver_id", "latitude", "longitude", "speed",
+    "timestamp", "received_at", "chainage_m", "off_route_m", "off_route",
+]
+
+def export_telemetry_cursor(session_id: str = None, vehicle_id: str = None, since: datetime = None, until: datetime = None):
+    """
+    Cursor over matching telemetry, oldest first, fetched EXPORT_BATCH_SIZE rows per round trip
+    """
+    query = telemetry_query(session_id, vehicle_id, since, until)
+    return TELEMETRY_COLLECTION.find(query).sort([("received_at", 1), ("_id", 1)]).batch_size(EXPORT_BATCH_SIZE)
+
+# ---------------- Archived History ----------------
+ARCHIVE_EXPORT_COLUMNS = [
+    "session_id", "vehicle_id", "driver_id", "latitude", "longitude", "speed",
+    "timestamp", "chainage_m", "off_route_m",
+]
+
+def archived_history(session_id: str = None, vehicle_id: str = None, since: datetime = None, until: datetime = None):
+    """
+    Full archived trace for a session or vehicle, optionally within a time window
+    """
+    if not session_id and not vehicle_id:
+        raise ValueError("session_id or vehicle_id is required")
+    return telemetry_archive.query(session_id, vehicle_id, since, until)
+
+def serialize_archived(fix: dict) -> dict:
+    return fix
 
 async def get_telemetry_by_session(session_id: str):
     cursor = TELEMETRY_COLLECTION.find({"session_id": session_id}).sort("timestamp", -1)
@@ -138,21 +269,12 @@ async def get_telemetry_by_id(telemetry_id: str):
 
 async def get_session_gps_history(session_id: str) -> List[dict]:
     """
-    Get GPS history for a session from session document
+    Get GPS history for a session from the live state store
     """
-    try:
-        session_query = {"id": int(session_id)} if session_id.isdigit() else {"_id": session_id}
-        session = await SESSION_COLLECTION.find_one(session_query)
-        if not session:
-            return []
-        
-        return session.get("gps_history", [])
-    except Exception:
-        return []
+    return await live_state.get_history(session_id)
 
 async def get_latest_position(session_id: str) -> Optional[dict]:
     """
-    Get the latest GPS position for a session from session document
+    Get the latest GPS position for a session from the live state store
     """
-    history = await get_session_gps_history(session_id)
-    return history[-1] if history else None
+    return await live_state.get_latest(session_id)
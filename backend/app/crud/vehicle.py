@@ -1,8 +1,10 @@
 from app.config import db
+from app.utils.pagination import Page, PageParams, paginate
+from app.services.ids import id_allocator
 from bson import ObjectId
 
 VEHICLE_COLLECTION = db.vehicles
-COUNTERS_COLLECTION = db.counters  # For auto-increment
+VEHICLE_ORDER = [("id", 1), ("_id", 1)]
 
 def serialize(doc):
     if not doc:
@@ -14,13 +16,7 @@ def serialize(doc):
 
 # ---------------- Utility for auto-increment ----------------
 async def get_next_vehicle_id():
-    counter = await COUNTERS_COLLECTION.find_one_and_update(
-        {"_id": "vehicle_id"},
-        {"$inc": {"seq": 1}},
-        upsert=True,
-        return_document=True
-    )
-    return counter["seq"]
+    return await id_allocator.next_id("vehicle_id")
 
 # ---------------- Create Vehicle ----------------
 async def create_vehicle(data: dict):
@@ -30,12 +26,11 @@ async def create_vehicle(data: dict):
     return serialize(data)
 
 # ---------------- List Vehicles ----------------
-async def list_vehicles():
-    cursor = VEHICLE_COLLECTION.find({})
-    vehicles = []
-    async for doc in cursor:
-        vehicles.append(serialize(doc))
-    return vehicles
+async def list_vehicles(page: PageParams = None, registration_number: str = None) -> Page:
+    query = {"registration_number": registration_number} if registration_number else {}
+    result = await paginate(VEHICLE_COLLECTION, query, VEHICLE_ORDER, page)
+    result.items = [serialize(doc) for doc in result.items]
+    return result
 
 # ---------------- Get Vehicle by ID ----------------
 async def get_vehicle_by_id(vehicle_id: str):
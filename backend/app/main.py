@@ -1,4 +1,4 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 # Import Routers
@@ -16,7 +16,22 @@ from app.api import (
     route,
     drive_status,
     notification,
+    live,
+    anchor,
 )
+from app.crud import notification as notification_crud
+from app.services.anchoring import anchoring
+from app.services.archive import telemetry_archive
+from app.services.audit_log import audit_log
+from app.services.connections import notification_connections
+from app.services.live_hub import live_hub
+from app.services.live_state import live_state
+from app.services.pubsub import pubsub, NOTIFICATIONS_CHANNEL, TELEMETRY_CHANNEL
+from app.services.retention import retention
+from app.services.routing import routing
+from app.services.schedule import schedule_index
+from app.services.stop_index import stop_index
+from app.utils.pagination import NEXT_CURSOR_HEADER, PageParams, ensure_keyset_indexes, paged
 
 app = FastAPI(title="Punjab Bus Tracking API")
 
@@ -27,6 +42,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # ---------------- Routers ----------------
@@ -43,6 +59,41 @@ app.include_router(audit.router, prefix="/audit", tags=["Audit"])
 app.include_router(route.router, prefix="/routes", tags=["Route"])
 app.include_router(drive_status.router, prefix="/drive-status", tags=["drive-status"])
 app.include_router(notification.router)
+app.include_router(live.router, prefix="/live", tags=["Live"])
+app.include_router(anchor.router, prefix="/anchors", tags=["Anchoring"])
+
+# ---------------- Event Fan-out ----------------
+pubsub.subscribe(TELEMETRY_CHANNEL, live_hub.handle_event)
+pubsub.subscribe(NOTIFICATIONS_CHANNEL, notification.deliver_notification)
+
+
+# ---------------- Lifecycle ----------------
+@app.on_event("startup")
+async def start_services():
+    await live_state.start()
+    await pubsub.start()
+    await audit_log.start()
+    await anchoring.start()
+    await telemetry_archive.start()
+    await retention.start()
+    await stop_index.start()
+    await schedule_index.start()
+    await ensure_keyset_indexes()
+    await notification_crud.backfill_open_flags()
+
+
+@app.on_event("shutdown")
+async def stop_services():
+    await pubsub.stop()
+    await notification_connections.close_all()
+    await schedule_index.stop()
+    await stop_index.stop()
+    await routing.close()
+    await retention.stop()
+    await telemetry_archive.stop()
+    await anchoring.stop()
+    await audit_log.stop()
+    await live_state.stop()
 
 
 # ---------------- Health Check ----------------
@@ -54,26 +105,61 @@ async def health_check():
     }
 
 
+@app.get("/health/retention")
+async def retention_health():
+    return retention.metrics()
+
+
+@app.get("/health/archive")
+async def archive_health():
+    return telemetry_archive.metrics()
+
+
+@app.get("/health/audit")
+async def audit_health():
+    return audit_log.metrics()
+
+
+@app.get("/health/anchoring")
+async def anchoring_health():
+    return anchoring.metrics()
+
+
+@app.get("/health/live")
+async def live_health():
+    return live_hub.metrics()
+
+
+@app.get("/health/notifications")
+async def notifications_health():
+    return notification_connections.metrics()
+
+
+@app.get("/health/pubsub")
+async def pubsub_health():
+    return pubsub.metrics()
+
+
 # ---------------- Admin Shortcuts ----------------
 @app.get("/admin/devices")
-async def admin_list_devices():
+async def admin_list_devices(response: Response, page: PageParams = Depends()):
     from app.crud.device import list_devices
 
-    return await list_devices()
+    return await paged(response, page, list_devices(page))
 
 
 @app.get("/admin/vehicles")
-async def admin_list_vehicles():
+async def admin_list_vehicles(response: Response, page: PageParams = Depends()):
     from app.crud.vehicle import list_vehicles
 
-    return await list_vehicles()
+    return await paged(response, page, list_vehicles(page))
 
 
 @app.get("/admin/sessions")
-async def admin_list_sessions():
+async def admin_list_sessions(response: Response, page: PageParams = Depends()):
     from app.crud.session import list_sessions
 
-    return await list_sessions()
+    return await paged(response, page, list_sessions(page))
 
 
 # ---------------- Run with Uvicorn ----------------
@@ -31,4 +31,5 @@ class AssignmentResponse(BaseModel):
     driver_id: str
     route_id: str
     timestamp: int
-    blockchain_tx_hash: Optional[str]
\ No newline at end of file
+    blockchain_tx_hash: Optional[str]
+    event_hash: Optional[str] = None  # Merkle leaf; its inclusion proof is at /anchors/proof/assignment/{id}
\ No newline at end of file
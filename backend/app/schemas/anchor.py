@@ -0,0 +1,37 @@
+from datetime import datetime
+from enum import Enum
+from pydantic import BaseModel
+from typing import List, Optional, Tuple
+
+class AnchoredEventKind(str, Enum):
+    audit = "audit"
+    assignment = "assignment"
+
+class AnchorResponse(BaseModel):
+    id: int
+    root: Optional[str] = None  # unset while building
+    leaf_count: int = 0
+    audit_from_seq: int
+    audit_to_seq: int
+    assignment_count: int = 0
+    provider: str
+    status: str  # building | pending | anchored
+    attempts: int
+    tx_hash: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime
+    anchored_at: Optional[datetime] = None
+
+class InclusionProofResponse(BaseModel):
+    kind: AnchoredEventKind
+    event_id: str
+    anchor_id: int
+    root: Optional[str] = None
+    status: Optional[str] = None
+    tx_hash: Optional[str] = None
+    leaf: str
+    index: int
+    proof: List[Tuple[str, str]]  # (side, sibling hash) from the leaf up
+    included: bool  # the proof leads from the leaf to the anchored root
+    event_unchanged: bool  # the stored event still hashes to the leaf
+    valid: bool
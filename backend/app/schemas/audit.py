@@ -1,3 +1,4 @@
+from datetime import datetime
 from pydantic import BaseModel
 from typing import Optional, Dict
 
@@ -11,4 +12,19 @@ class AuditLogResponse(BaseModel):
     user_id: str
     action: str
     details: Optional[Dict] = None
-    timestamp: str
+    timestamp: datetime
+    seq: Optional[int] = None  # set once the record is written to the chain
+    prev_hash: Optional[str] = None
+    hash: Optional[str] = None
+
+class AuditChainError(BaseModel):
+    seq: int
+    reason: str  # missing | broken link | altered
+
+class AuditChainReport(BaseModel):
+    from_seq: int
+    to_seq: int
+    checked: int
+    valid: bool
+    error: Optional[AuditChainError] = None
+    last_hash: Optional[str] = None
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 class NotificationCreate(BaseModel):
     type: str
@@ -17,3 +17,12 @@ class NotificationResponse(NotificationCreate):
 
     class Config:
         orm_mode = True
+
+class NotificationBulkUpdate(BaseModel):
+    ids: List[str]
+    status: str
+
+class NotificationBulkResult(BaseModel):
+    requested: int
+    matched: int
+    modified: int
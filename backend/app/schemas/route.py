@@ -1,3 +1,4 @@
+from enum import Enum
 from pydantic import BaseModel
 from typing import List, Optional
 
@@ -15,6 +16,12 @@ class GeometryPoint(BaseModel):
     latitude: float
     longitude: float
 
+class GeometryView(str, Enum):
+    none = "none"
+    simplified = "simplified"
+    full = "full"
+    encoded = "encoded"
+
 class RouteCreate(BaseModel):
     route_name: str
     source: Location
@@ -40,3 +47,12 @@ class RouteResponse(BaseModel):
     route_points: List[BusStop]
     estimated_time: int
     route_geometry: List[GeometryPoint]
+    route_geometry_encoded: Optional[str] = None  # polyline (precision 5) when ?geometry=encoded
+
+class RouteBulkError(BaseModel):
+    index: int
+    error: str
+
+class RouteBulkResponse(BaseModel):
+    created: List[RouteResponse]
+    errors: List[RouteBulkError]
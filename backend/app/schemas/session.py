@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -31,4 +31,18 @@ class SessionResponse(BaseModel):
     route_id: str
     route_name: Optional[str] = None
     start_time: datetime
-    end_time: Optional[datetime] = None
\ No newline at end of file
+    end_time: Optional[datetime] = None
+
+# -------- Bulk Import --------
+class SessionBulkItemResult(BaseModel):
+    index: int
+    accepted: bool
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class SessionBulkResponse(BaseModel):
+    dry_run: bool
+    accepted: int
+    rejected: int
+    results: List[SessionBulkItemResult]
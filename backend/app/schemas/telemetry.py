@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 class TelemetryCreate(BaseModel):
     session_id: str
@@ -17,3 +17,14 @@ class TelemetryResponse(BaseModel):
     longitude: float
     speed: float
     eta_to_next_stop: Optional[int] = None
+
+class TelemetryBatchItemResult(BaseModel):
+    index: int
+    accepted: bool
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+class TelemetryBatchResponse(BaseModel):
+    accepted: int
+    rejected: int
+    results: List[TelemetryBatchItemResult]
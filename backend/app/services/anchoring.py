@@ -0,0 +1,372 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app.config import (
+    db,
+    w3,
+    contract,
+    ACCOUNT_ADDRESS_CHECKSUM,
+    PRIVATE_KEY,
+    ANCHOR_PROVIDER,
+    ANCHOR_INTERVAL_SECONDS,
+    ANCHOR_MAX_LEAVES,
+    ANCHOR_RECEIPT_TIMEOUT_SECONDS,
+)
+from app.services.audit_log import AUDIT_COLLECTION, record_hash
+from app.utils.blockchain import generate_event_hash
+from app.utils.merkle import build_tree, verify_proof
+
+ANCHOR_COLLECTION = db.anchors
+PROOF_COLLECTION = db.anchor_proofs
+ASSIGNMENT_COLLECTION = db.assignments
+ASSIGNMENT_HASH_FIELDS = ("vehicle_id", "driver_id", "route_id", "timestamp")
+ANCHOR_RECORD_ID = "merkle-root"  # busId under which roots are recorded on chain
+EVENT_KINDS = ("audit", "assignment")
+UNANCHORED = {"event_hash": {"$exists": True}, "anchor_id": None}
+
+
+def assignment_event_hash(doc: dict) -> str:
+    """
+    Hash of an assignment as anchored: its id and the assignment fields
+    """
+    fields = {field: doc.get(field) for field in ASSIGNMENT_HASH_FIELDS}
+    fields["id"] = str(doc["_id"])
+    return generate_event_hash(fields)
+
+
+# ---------------- Providers ----------------
+class AnchorProvider(ABC):
+    """
+    Publishes a Merkle root somewhere tamper-evident; returns a transaction hash
+    """
+
+    kind = "none"
+
+    @abstractmethod
+    async def submit(self, root: str, anchor: dict) -> str:
+        """
+        Record `root` for `anchor`; raises when it was not recorded
+        """
+
+
+class MockAnchorProvider(AnchorProvider):
+    """
+    Keeps roots in memory, for tests and deployments without a chain
+    """
+
+    kind = "mock"
+
+    def __init__(self):
+        self.roots = {}  # tx hash -> root
+
+    async def submit(self, root: str, anchor: dict) -> str:
+        tx_hash = "0x" + generate_event_hash({"anchor": anchor["_id"], "root": root})
+        self.roots[tx_hash] = root
+        return tx_hash
+
+
+class ContractAnchorProvider(AnchorProvider):
+    """
+    Records each root through the configured contract's recordAssignment,
+    under busId ANCHOR_RECORD_ID with the anchor number as driverId, so a
+    root can be read back with getAssignmentsByBusDriver. Transactions are
+    signed with PRIVATE_KEY when set; otherwise the node must hold the
+    account unlocked (local dev chains).
+    """
+
+    kind = "contract"
+
+    def __init__(self, web3, contract_, account: Optional[str], private_key: Optional[str], receipt_timeout: float):
+        if not account:
+            raise RuntimeError("ACCOUNT_ADDRESS must be set to anchor through the contract")
+        self.web3 = web3
+        self.contract = contract_
+        self.account = account
+        self.private_key = private_key
+        self.receipt_timeout = receipt_timeout
+
+    def _send(self, root: str, anchor: dict) -> str:
+        call = self.contract.functions.recordAssignment(
+            ANCHOR_RECORD_ID,
+            f"audit:{anchor['audit_from_seq']}-{anchor['audit_to_seq']}",
+            "0x" + root,
+            str(anchor["_id"]),
+            int(anchor["created_at"].replace(tzinfo=timezone.utc).timestamp()),
+        )
+        if self.private_key:
+            transaction = call.build_transaction({
+                "from": self.account,
+                "nonce": self.web3.eth.get_transaction_count(self.account),
+            })
+            signed = self.web3.eth.account.sign_transaction(transaction, self.private_key)
+            raw = getattr(signed, "raw_transaction", None) or signed.rawTransaction
+            tx_hash = self.web3.eth.send_raw_transaction(raw)
+        else:
+            tx_hash = call.transact({"from": self.account})
+        receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash, timeout=self.receipt_timeout)
+        if receipt["status"] != 1:
+            raise RuntimeError(f"Anchor transaction {tx_hash.hex()} reverted")
+        text = tx_hash.hex()
+        return text if text.startswith("0x") else "0x" + text
+
+    async def submit(self, root: str, anchor: dict) -> str:
+        # web3's HTTP provider blocks; keep it off the event loop
+        return await asyncio.to_thread(self._send, root, anchor)
+
+
+def build_anchor_provider() -> AnchorProvider:
+    if ANCHOR_PROVIDER == "contract":
+        return ContractAnchorProvider(w3, contract, ACCOUNT_ADDRESS_CHECKSUM, PRIVATE_KEY, ANCHOR_RECEIPT_TIMEOUT_SECONDS)
+    return MockAnchorProvider()
+
+
+# ---------------- Anchoring Service ----------------
+class AnchoringService:
+    """
+    Every `interval` seconds, takes the audit records and assignments not
+    yet anchored (up to `max_leaves`), builds a Merkle tree over their
+    hashes, stores each event's inclusion proof and submits only the root.
+
+    Anchors are numbered; a window is claimed by inserting its anchor
+    document (status "building"), so with several workers each window is
+    built once. Audit records are taken by seq range after the previous
+    anchor. Assignments are claimed by the anchor's owner, which sets their
+    anchor_id while it is still unset, before the tree is built from what
+    it actually claimed, so no assignment is anchored twice; they get the
+    root's transaction hash as blockchain_tx_hash. A root that fails to
+    submit stays pending and is retried on the next cycle, and a window
+    left "building" by a stopped worker is built from its claims. Every
+    claim and submit stamps attempted_at; an anchor is only retried once
+    that is older than the receipt timeout, and a retry is claimed by
+    moving attempted_at forward, so one worker takes it.
+    """
+
+    def __init__(self, provider: AnchorProvider, interval: float, max_leaves: int, receipt_timeout: float):
+        self.provider = provider
+        self.interval = interval
+        self.max_leaves = max_leaves
+        self.receipt_timeout = receipt_timeout
+        self.anchored_total = 0
+        self.leaves_total = 0
+        self.failures = 0
+        self.last_anchor_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _claim(self, anchor_id: int, limit: int):
+        """
+        Mark up to `limit` unanchored assignments as this anchor's; the
+        filter re-checks anchor_id, so one taken meanwhile is skipped
+        """
+        if limit <= 0:
+            return
+        candidates = ASSIGNMENT_COLLECTION.find(UNANCHORED, {"_id": 1}).sort("_id", 1).limit(limit)
+        ids = [doc["_id"] async for doc in candidates]
+        if ids:
+            await ASSIGNMENT_COLLECTION.update_many({**UNANCHORED, "_id": {"$in": ids}}, {"$set": {"anchor_id": anchor_id}})
+
+    async def _events(self, anchor: dict) -> List[tuple]:
+        """
+        (kind, event id, leaf hash) of the events an anchor covers: its audit
+        seq range and the assignments it claimed
+        """
+        events = []
+        audit_range = {"$gte": anchor["audit_from_seq"], "$lte": anchor["audit_to_seq"]}
+        async for doc in AUDIT_COLLECTION.find({"seq": audit_range}, {"hash": 1}).sort("seq", 1):
+            events.append(("audit", str(doc["_id"]), doc["hash"]))
+        async for doc in ASSIGNMENT_COLLECTION.find({"anchor_id": anchor["_id"]}, {"event_hash": 1}).sort("_id", 1):
+            events.append(("assignment", str(doc["_id"]), doc["event_hash"]))
+        return events
+
+    async def _build(self, anchor: dict) -> Optional[dict]:
+        """
+        Build a claimed window's tree and store its proofs; None (and the
+        anchor removed) when it ended up with nothing to anchor
+        """
+        events = await self._events(anchor)
+        if not events:
+            await ANCHOR_COLLECTION.delete_one({"_id": anchor["_id"], "status": "building"})
+            return None
+        root, proofs = build_tree([leaf for _, _, leaf in events])
+        proof_docs = [
+            {"_id": f"{kind}:{ref}", "anchor_id": anchor["_id"], "kind": kind, "ref": ref, "index": index,
+             "leaf": leaf, "proof": [list(step) for step in proof]}
+            for index, ((kind, ref, leaf), proof) in enumerate(zip(events, proofs))
+        ]
+        try:
+            await PROOF_COLLECTION.insert_many(proof_docs, ordered=False)
+        except BulkWriteError as e:
+            print(f"Error storing inclusion proofs for anchor {anchor['_id']}: {len(e.details.get('writeErrors', []))} failed")
+        built = {
+            "root": root,
+            "leaf_count": len(events),
+            "assignment_count": sum(kind == "assignment" for kind, _, _ in events),
+            "status": "pending",
+        }
+        await ANCHOR_COLLECTION.update_one({"_id": anchor["_id"]}, {"$set": built})
+        self.leaves_total += len(events)
+        return {**anchor, **built}
+
+    async def anchor_once(self) -> Optional[dict]:
+        """
+        Claim, build, store and submit the next anchor; None when there is
+        nothing to anchor or another worker claimed the window
+        """
+        await self._retry_pending()
+        last = await ANCHOR_COLLECTION.find_one({}, sort=[("_id", -1)])
+        from_seq = last["audit_to_seq"] + 1 if last else 1
+        audit = AUDIT_COLLECTION.find({"seq": {"$gte": from_seq}}, {"seq": 1}).sort("seq", 1).limit(self.max_leaves)
+        audit_seqs = [doc["seq"] async for doc in audit]
+        if not audit_seqs and not await ASSIGNMENT_COLLECTION.find_one(UNANCHORED, {"_id": 1}):
+            return None
+
+        anchor = {
+            "_id": last["_id"] + 1 if last else 1,
+            "audit_from_seq": from_seq,
+            "audit_to_seq": audit_seqs[-1] if audit_seqs else from_seq - 1,
+            "provider": self.provider.kind,
+            "status": "building",
+            "attempts": 0,
+            "created_at": datetime.utcnow(),
+        }
+        anchor["attempted_at"] = anchor["created_at"]
+        try:
+            await ANCHOR_COLLECTION.insert_one(anchor)
+        except DuplicateKeyError:
+            return None  # another worker is anchoring this window
+
+        await self._claim(anchor["_id"], self.max_leaves - len(audit_seqs))
+        anchor = await self._build(anchor)
+        return await self._submit(anchor) if anchor else None
+
+    async def _submit(self, anchor: dict) -> dict:
+        # A submit can wait up to receipt_timeout; keep retries off it meanwhile
+        await ANCHOR_COLLECTION.update_one({"_id": anchor["_id"]}, {"$set": {"attempted_at": datetime.utcnow()}})
+        try:
+            tx_hash = await self.provider.submit(anchor["root"], anchor)
+        except Exception as e:
+            self.failures += 1
+            print(f"Error anchoring root {anchor['_id']}: {e}")
+            await ANCHOR_COLLECTION.update_one({"_id": anchor["_id"]}, {"$inc": {"attempts": 1}, "$set": {"error": str(e)}})
+            return {**anchor, "attempts": anchor["attempts"] + 1, "error": str(e)}
+        anchored = {"status": "anchored", "tx_hash": tx_hash, "anchored_at": datetime.utcnow()}
+        await ANCHOR_COLLECTION.update_one(
+            {"_id": anchor["_id"]}, {"$set": anchored, "$inc": {"attempts": 1}, "$unset": {"error": ""}}
+        )
+        await ASSIGNMENT_COLLECTION.update_many({"anchor_id": anchor["_id"]}, {"$set": {"blockchain_tx_hash": tx_hash}})
+        self.anchored_total += 1
+        self.last_anchor_at = time.time()
+        return {**anchor, **anchored, "attempts": anchor["attempts"] + 1}
+
+    async def _retry_pending(self):
+        # Left pending by a failed submit, or building by a worker that stopped mid-cycle
+        cutoff = datetime.utcnow() - timedelta(seconds=self.receipt_timeout)
+        query = {
+            "status": {"$in": ["building", "pending"]},
+            "$or": [
+                {"attempted_at": {"$lt": cutoff}},
+                {"attempted_at": None, "created_at": {"$lt": cutoff}},  # written before attempted_at existed
+            ],
+        }
+        while True:
+            anchor = await ANCHOR_COLLECTION.find_one_and_update(
+                query,
+                {"$set": {"attempted_at": datetime.utcnow()}},
+                sort=[("_id", 1)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if anchor is None:
+                return
+            if anchor["status"] == "building":
+                anchor = await self._build(anchor)
+            if anchor:
+                await self._submit(anchor)
+
+    # ---------------- Inclusion Proofs ----------------
+    async def inclusion_proof(self, kind: str, event_id: str) -> Optional[dict]:
+        """
+        An event's proof, checked against its anchor's root and against the
+        event as currently stored
+        """
+        proof = await PROOF_COLLECTION.find_one({"_id": f"{kind}:{event_id}"})
+        if not proof:
+            return None
+        anchor = await ANCHOR_COLLECTION.find_one({"_id": proof["anchor_id"]}) or {}
+        collection = AUDIT_COLLECTION if kind == "audit" else ASSIGNMENT_COLLECTION
+        event = await collection.find_one({"_id": ObjectId(event_id)})
+        if event is None:
+            current = None
+        elif kind == "audit":
+            current = record_hash(event) if "prev_hash" in event else None
+        else:
+            current = assignment_event_hash(event)
+        included = bool(anchor) and verify_proof(proof["leaf"], proof["proof"], anchor["root"])
+        return {
+            "kind": kind,
+            "event_id": event_id,
+            "anchor_id": proof["anchor_id"],
+            "root": anchor.get("root"),
+            "status": anchor.get("status"),
+            "tx_hash": anchor.get("tx_hash"),
+            "leaf": proof["leaf"],
+            "index": proof["index"],
+            "proof": proof["proof"],
+            "included": included,
+            "event_unchanged": current == proof["leaf"],
+            "valid": included and current == proof["leaf"],
+        }
+
+    # ---------------- Lifecycle ----------------
+    async def ensure_indexes(self):
+        await ANCHOR_COLLECTION.create_index([("status", 1), ("attempted_at", 1)])
+        await PROOF_COLLECTION.create_index("anchor_id")
+        await ASSIGNMENT_COLLECTION.create_index("anchor_id")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.anchor_once()
+            except Exception as e:
+                print(f"Error running anchoring cycle: {e}")
+
+    async def start(self):
+        try:
+            await self.ensure_indexes()
+        except Exception as e:
+            print(f"Error creating anchoring indexes: {e}")
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def metrics(self) -> dict:
+        return {
+            "provider": self.provider.kind,
+            "interval_seconds": self.interval,
+            "anchored_total": self.anchored_total,
+            "leaves_total": self.leaves_total,
+            "failures": self.failures,
+            "last_anchor_at": self.last_anchor_at,
+        }
+
+
+anchoring = AnchoringService(
+    build_anchor_provider(),
+    interval=ANCHOR_INTERVAL_SECONDS,
+    max_leaves=ANCHOR_MAX_LEAVES,
+    receipt_timeout=ANCHOR_RECEIPT_TIMEOUT_SECONDS,
+)
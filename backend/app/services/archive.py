@@ -0,0 +1,235 @@
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from operator import itemgetter
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.config import (
+    db,
+    ARCHIVE_FLUSH_SECONDS,
+    ARCHIVE_FLUSH_FIXES,
+    ARCHIVE_MAX_PENDING,
+    ARCHIVE_BUCKET_MAX_FIXES,
+)
+from app.utils.trace_codec import decode_block, encode_block, fix_time
+
+ARCHIVE_COLLECTION = db.telemetry_archive
+COORD_SCALE = 1_000_000
+LEGACY_COLUMNS = ("t", "lat", "lng", "speed", "chainage", "off")
+
+
+def bucket_key(record: dict) -> Tuple[str, str, str]:
+    """
+    (vehicle_id, day, session_id) of the bucket a telemetry record belongs to;
+    the day is the device's, so late uploads land beside their neighbours
+    """
+    return (str(record.get("vehicle_id", "")), fix_time(record).strftime("%Y-%m-%d"), str(record["session_id"]))
+
+
+# ---------------- Bucket Decoding ----------------
+def _decode_columns(doc: dict) -> List[dict]:
+    # Buckets written before trace blocks: parallel columns, t in ms of the day
+    start = datetime.strptime(doc["day"], "%Y-%m-%d")
+    fixes = []
+    for t, lat, lng, speed, chainage, off in zip(*(doc.get(column, []) for column in LEGACY_COLUMNS)):
+        fix = {"latitude": lat / COORD_SCALE, "longitude": lng / COORD_SCALE, "speed": speed,
+               "timestamp": start + timedelta(milliseconds=t)}
+        if chainage is not None:
+            fix["chainage_m"] = chainage
+            fix["off_route_m"] = off
+        fixes.append(fix)
+    return fixes
+
+
+def decode_bucket(doc: dict) -> List[dict]:
+    """
+    Fixes of one bucket document, in stored order
+    """
+    ids = {"session_id": doc["session_id"], "vehicle_id": doc["vehicle_id"], "driver_id": doc.get("driver_id")}
+    fixes = [fix for block in doc.get("blocks", []) for fix in decode_block(bytes(block))]
+    fixes.extend(_decode_columns(doc))
+    return [{**ids, **fix} for fix in fixes]
+
+
+# ---------------- Telemetry Archive ----------------
+class TelemetryArchive:
+    """
+    Full-history archive tier behind the trimmed telemetry collection.
+    Ingest only appends records to an in-memory queue; a background task
+    groups them into per-(vehicle, day, session) buckets and appends each
+    group as one trace block (app.utils.trace_codec) with one upsert, all in
+    one bulk_write.
+    Buckets are keyed, ordered and queried by the device's fix time;
+    `received_at` is kept only as the bucket's latest ingest time. A bucket
+    only takes a block that still fits under `bucket_max_fixes`.
+    """
+
+    def __init__(self, collection, flush_interval: float, flush_fixes: int, max_pending: int, bucket_max_fixes: int):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.flush_fixes = flush_fixes
+        self.max_pending = max_pending
+        self.bucket_max_fixes = bucket_max_fixes
+        self.pending: deque = deque()
+        self.archived_total = 0
+        self.dropped_total = 0
+        self.last_flush_at: Optional[float] = None
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, record: dict):
+        """
+        Queue a stored telemetry record for archiving; never blocks ingest
+        """
+        if len(self.pending) >= self.max_pending:
+            # Archive is falling behind: shed the oldest fix rather than grow unbounded
+            self.pending.popleft()
+            self.dropped_total += 1
+        self.pending.append(record)
+        if len(self.pending) >= self.flush_fixes:
+            self._wake.set()
+
+    def record_many(self, records: List[dict]):
+        for record in records:
+            self.record(record)
+
+    def _operations(self, records: List[dict]) -> List[Tuple[UpdateOne, List[dict]]]:
+        """
+        One bucket upsert per (vehicle, day, session) group, paired with the
+        records it writes; groups are sorted by fix time and those larger than
+        a bucket are split
+        """
+        groups: Dict[Tuple[str, str, str], List[dict]] = {}
+        for record in records:
+            groups.setdefault(bucket_key(record), []).append(record)
+
+        operations = []
+        for (vehicle_id, day, session_id), group in groups.items():
+            group.sort(key=fix_time)
+            for offset in range(0, len(group), self.bucket_max_fixes):
+                chunk = group[offset:offset + self.bucket_max_fixes]
+                # A bucket with no room for the whole chunk is skipped and a new one opened
+                room = {"$lte": self.bucket_max_fixes - len(chunk)}
+                received = [record["received_at"] for record in chunk if record.get("received_at")]
+                update = UpdateOne(
+                    {"vehicle_id": vehicle_id, "day": day, "session_id": session_id, "count": room},
+                    {
+                        "$setOnInsert": {"driver_id": str(chunk[0].get("driver_id", ""))},
+                        "$min": {"start": fix_time(chunk[0])},
+                        "$max": {"end": fix_time(chunk[-1]), **({"received_at": max(received)} if received else {})},
+                        "$inc": {"count": len(chunk)},
+                        "$push": {"blocks": encode_block(chunk)},
+                    },
+                    upsert=True,
+                )
+                operations.append((update, chunk))
+        return operations
+
+    async def flush(self) -> int:
+        """
+        Write every queued fix; unwritten ones are re-queued for the next flush
+        """
+        if not self.pending:
+            return 0
+        batch = list(self.pending)
+        self.pending.clear()
+        operations = self._operations(batch)
+        try:
+            # Ordered, so a group split across buckets fills one before opening the next
+            await self.collection.bulk_write([update for update, _ in operations], ordered=True)
+        except BulkWriteError as e:
+            done = e.details.get("nMatched", 0) + e.details.get("nUpserted", 0)
+            self._requeue([record for _, records in operations[done:] for record in records])
+            self.archived_total += sum(len(records) for _, records in operations[:done])
+            print(f"Error archiving telemetry: {len(operations) - done} of {len(operations)} buckets not written")
+            return 0
+        except Exception as e:
+            self._requeue(batch)
+            print(f"Error archiving {len(batch)} telemetry fixes: {e}")
+            return 0
+        self.archived_total += len(batch)
+        self.last_flush_at = time.time()
+        return len(batch)
+
+    def _requeue(self, records: List[dict]):
+        self.pending.extendleft(reversed(records))
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("vehicle_id", 1), ("day", 1), ("session_id", 1), ("count", 1)])
+        await self.collection.create_index([("session_id", 1), ("start", 1)])
+        await self.collection.create_index([("vehicle_id", 1), ("start", 1)])
+        await self.collection.create_index([("start", 1), ("end", 1)])
+
+    async def query(
+        self,
+        session_id: str = None,
+        vehicle_id: str = None,
+        since: datetime = None,
+        until: datetime = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Archived fixes matching the filters, bucket by bucket in start order
+        and by fix time within a bucket; buckets are pruned on their
+        [start, end] range, fixes on timestamp
+        """
+        query = {}
+        if session_id:
+            query["session_id"] = str(session_id)
+        if vehicle_id:
+            query["vehicle_id"] = str(vehicle_id)
+        if since:
+            query["end"] = {"$gte": since}
+        if until:
+            query["start"] = {"$lt": until}
+        async for doc in self.collection.find(query).sort([("start", 1), ("_id", 1)]):
+            for fix in sorted(decode_bucket(doc), key=itemgetter("timestamp")):
+                if (since is None or fix["timestamp"] >= since) and (until is None or fix["timestamp"] < until):
+                    yield fix
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def start(self):
+        try:
+            await self.ensure_indexes()
+        except Exception as e:
+            print(f"Error creating archive indexes: {e}")
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def metrics(self) -> dict:
+        return {
+            "pending": len(self.pending),
+            "archived_total": self.archived_total,
+            "dropped_total": self.dropped_total,
+            "last_flush_at": self.last_flush_at,
+        }
+
+
+telemetry_archive = TelemetryArchive(
+    ARCHIVE_COLLECTION,
+    flush_interval=ARCHIVE_FLUSH_SECONDS,
+    flush_fixes=ARCHIVE_FLUSH_FIXES,
+    max_pending=ARCHIVE_MAX_PENDING,
+    bucket_max_fixes=ARCHIVE_BUCKET_MAX_FIXES,
+)
@@ -0,0 +1,327 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import bson
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from app.config import (
+    db,
+    AUDIT_FLUSH_SECONDS,
+    AUDIT_FLUSH_RECORDS,
+    AUDIT_MAX_PENDING,
+    AUDIT_SPILL_PATH,
+    EXPORT_BATCH_SIZE,
+)
+from app.utils.blockchain import GENESIS_HASH, canonical_json, generate_event_hash
+
+AUDIT_COLLECTION = db.audit_logs
+DEAD_LETTER_COLLECTION = db.audit_dead_letters
+CHAIN_FIELDS = ("seq", "user_id", "action", "details", "timestamp")
+SHUTDOWN_FLUSH_ATTEMPTS = 3
+
+
+def chain_fields(doc: dict) -> dict:
+    """
+    The part of an audit record its hash covers
+    """
+    fields = {field: doc.get(field) for field in CHAIN_FIELDS}
+    fields["id"] = str(doc["_id"])
+    return fields
+
+
+def record_hash(doc: dict) -> str:
+    return generate_event_hash(chain_fields(doc), doc["prev_hash"])
+
+
+def storage_error(entry: dict) -> Optional[str]:
+    """
+    Why a record can neither be stored nor hashed (e.g. an integer past
+    64 bits or a value JSON cannot encode), or None when it can
+    """
+    try:
+        bson.encode({**entry, "seq": 0, "prev_hash": GENESIS_HASH, "hash": GENESIS_HASH})
+        canonical_json(chain_fields(entry))
+    except (bson.errors.InvalidDocument, OverflowError, TypeError, ValueError) as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+def _now() -> datetime:
+    # Millisecond precision, as stored, so the hash survives the round trip
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+# ---------------- Audit Log Writer ----------------
+class AuditLogWriter:
+    """
+    Append-only, hash-chained audit log. Requests only queue a record; a
+    background task numbers queued records (`seq`), chains each to the hash
+    of the one before it and writes them with insert_many, every
+    `flush_interval` seconds or once `flush_records` are queued.
+
+    `seq` is unique, so when several workers append at once the loser of a
+    race reloads the chain head and re-chains what it had not written.
+    When `max_pending` records are queued, appends wait for a flush instead
+    of dropping records. On shutdown the queue is flushed, and anything that
+    still cannot be written is spilled to `spill_path` and re-queued on the
+    next start.
+
+    Records that cannot be stored are rejected by `append`; one that still
+    makes a batch fail is moved to `dead_letters` so the rest of the queue
+    keeps flowing.
+    """
+
+    def __init__(
+        self, collection, flush_interval: float, flush_records: int, max_pending: int, spill_path: Optional[str],
+        dead_letters=None,
+    ):
+        self.collection = collection
+        self.dead_letters = dead_letters
+        self.flush_interval = flush_interval
+        self.flush_records = flush_records
+        self.max_pending = max_pending
+        self.spill_path = spill_path
+        self.pending: deque = deque()
+        self.head: Optional[Tuple[int, str]] = None  # (seq, hash) of the last stored record
+        self.written_total = 0
+        self.conflicts = 0
+        self.backpressure_waits = 0
+        self.spilled = 0
+        self.dead_lettered = 0
+        self.last_flush_at: Optional[float] = None
+        self._wake = asyncio.Event()
+        self._space = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def append(self, user_id: str, action: str, details: dict = None) -> dict:
+        """
+        Queue an audit record and return it (with its id, without seq/hash
+        yet); raises ValueError when the record could not be stored
+        """
+        entry = {"_id": ObjectId(), "user_id": user_id, "action": action, "details": details or {}, "timestamp": _now()}
+        error = storage_error(entry)
+        if error:
+            raise ValueError(f"Audit record cannot be stored: {error}")
+        while len(self.pending) >= self.max_pending:
+            self.backpressure_waits += 1
+            self._space.clear()
+            self._wake.set()
+            await self._space.wait()
+        self.pending.append(entry)
+        if len(self.pending) >= self.flush_records:
+            self._wake.set()
+        return dict(entry)
+
+    async def _load_head(self) -> Tuple[int, str]:
+        doc = await self.collection.find_one({"seq": {"$exists": True}}, {"seq": 1, "hash": 1}, sort=[("seq", -1)])
+        return (doc["seq"], doc["hash"]) if doc else (0, GENESIS_HASH)
+
+    def _chain(self, batch: List[dict]) -> List[dict]:
+        seq, previous = self.head
+        docs = []
+        for entry in batch:
+            seq += 1
+            doc = {**entry, "seq": seq, "prev_hash": previous}
+            doc["hash"] = previous = record_hash(doc)
+            docs.append(doc)
+        return docs
+
+    async def _write(self, batch: List[dict]) -> int:
+        """
+        Chain and insert one batch; returns how many records are now stored,
+        re-queueing the rest
+        """
+        try:
+            if self.head is None:
+                self.head = await self._load_head()
+            docs = self._chain(batch)
+            await self.collection.insert_many(docs, ordered=True)
+        except BulkWriteError as e:
+            written = e.details.get("nInserted", 0)
+            error = (e.details.get("writeErrors") or [{}])[0]
+            if "_id" in (error.get("keyValue") or error.get("keyPattern") or {}):
+                written += 1  # stored by an earlier attempt whose reply was lost
+            else:
+                self.conflicts += 1  # another worker took these seq numbers
+            self.head = None
+            self.pending.extendleft(reversed(batch[written:]))
+            return written
+        except Exception as e:
+            self.head = None
+            errors = [storage_error(entry) for entry in batch]
+            poisoned = [(entry, error) for entry, error in zip(batch, errors) if error]
+            if poisoned:
+                # Re-queueing a record that can never be written would block the log for good
+                await self._dead_letter(poisoned)
+            self.pending.extendleft(reversed([entry for entry, error in zip(batch, errors) if not error]))
+            print(f"Error writing {len(batch)} audit records: {e}")
+            return 0
+        self.head = (docs[-1]["seq"], docs[-1]["hash"])
+        return len(docs)
+
+    async def _dead_letter(self, poisoned: List[Tuple[dict, str]]):
+        self.dead_lettered += len(poisoned)
+        for entry, error in poisoned:
+            print(f"Dead-lettering audit record {entry['_id']}: {error}")
+        if self.dead_letters is None:
+            return
+        try:
+            await self.dead_letters.insert_many([
+                {
+                    "_id": entry["_id"],
+                    "user_id": str(entry.get("user_id")),
+                    "action": str(entry.get("action")),
+                    "details": repr(entry.get("details")),
+                    "timestamp": entry.get("timestamp"),
+                    "error": error,
+                }
+                for entry, error in poisoned
+            ], ordered=False)
+        except Exception as e:
+            print(f"Error writing {len(poisoned)} audit dead letters: {e}")
+
+    async def flush(self) -> int:
+        """
+        Write every queued record, in batches of `flush_records`; stops at
+        the first batch that is not fully written
+        """
+        written = 0
+        while self.pending:
+            batch = [self.pending.popleft() for _ in range(min(len(self.pending), self.flush_records))]
+            count = await self._write(batch)
+            written += count
+            if count < len(batch):
+                break
+        self.written_total += written
+        if written:
+            self.last_flush_at = time.time()
+        if len(self.pending) < self.max_pending:
+            self._space.set()
+        return written
+
+    # ---------------- Verification ----------------
+    async def verify(self, from_seq: int = 1, to_seq: int = None) -> dict:
+        """
+        Re-hash records `from_seq`..`to_seq` in seq order, reading them in
+        EXPORT_BATCH_SIZE batches; stops at the first record that is missing,
+        altered or not linked to the one before it
+        """
+        from_seq = max(1, from_seq)
+        report = {"from_seq": from_seq, "to_seq": from_seq - 1, "checked": 0, "valid": True, "error": None}
+        previous = GENESIS_HASH
+        if from_seq > 1:
+            anchor = await self.collection.find_one({"seq": from_seq - 1}, {"hash": 1})
+            if not anchor:
+                return {**report, "valid": False, "error": {"seq": from_seq - 1, "reason": "missing"}}
+            previous = anchor["hash"]
+
+        query = {"seq": {"$gte": from_seq, **({"$lte": to_seq} if to_seq is not None else {})}}
+        expected = from_seq
+        cursor = self.collection.find(query).sort("seq", 1).batch_size(EXPORT_BATCH_SIZE)
+        async for doc in cursor:
+            seq, reason = doc["seq"], None
+            if seq != expected:
+                seq, reason = expected, "missing"
+            elif doc.get("prev_hash") != previous:
+                reason = "broken link"
+            elif record_hash(doc) != doc.get("hash"):
+                reason = "altered"
+            if reason:
+                return {**report, "valid": False, "error": {"seq": seq, "reason": reason}}
+            previous = doc["hash"]
+            report["to_seq"] = expected
+            report["checked"] += 1
+            expected += 1
+        report["last_hash"] = previous
+        return report
+
+    # ---------------- Spill File ----------------
+    def _spill(self):
+        with open(self.spill_path, "a", encoding="utf-8") as spill:
+            for entry in self.pending:
+                spill.write(canonical_json({**entry, "_id": str(entry["_id"])}) + "\n")
+        self.spilled += len(self.pending)
+        print(f"Spilled {len(self.pending)} unwritten audit records to {self.spill_path}")
+        self.pending.clear()
+
+    def _load_spill(self):
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+        with open(self.spill_path, encoding="utf-8") as spill:
+            entries = [json.loads(line) for line in spill if line.strip()]
+        for entry in entries:
+            entry["_id"] = ObjectId(entry["_id"])
+            entry["timestamp"] = datetime.fromisoformat(entry["timestamp"])
+        self.pending.extendleft(reversed(entries))
+        os.remove(self.spill_path)
+
+    # ---------------- Lifecycle ----------------
+    async def ensure_indexes(self):
+        await self.collection.create_index(
+            "seq", unique=True, partialFilterExpression={"seq": {"$exists": True}}
+        )
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def start(self):
+        try:
+            self._load_spill()
+        except Exception as e:
+            print(f"Error reading audit spill file: {e}")
+        try:
+            await self.ensure_indexes()
+        except Exception as e:
+            print(f"Error creating audit indexes: {e}")
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for _ in range(SHUTDOWN_FLUSH_ATTEMPTS):
+            if not self.pending:
+                break
+            await self.flush()
+        if self.pending and self.spill_path:
+            self._spill()
+
+    def metrics(self) -> dict:
+        return {
+            "pending": len(self.pending),
+            "written_total": self.written_total,
+            "head_seq": self.head[0] if self.head else None,
+            "conflicts": self.conflicts,
+            "backpressure_waits": self.backpressure_waits,
+            "spilled": self.spilled,
+            "dead_lettered": self.dead_lettered,
+            "last_flush_at": self.last_flush_at,
+        }
+
+
+audit_log = AuditLogWriter(
+    AUDIT_COLLECTION,
+    flush_interval=AUDIT_FLUSH_SECONDS,
+    flush_records=AUDIT_FLUSH_RECORDS,
+    max_pending=AUDIT_MAX_PENDING,
+    spill_path=AUDIT_SPILL_PATH,
+    dead_letters=DEAD_LETTER_COLLECTION,
+)
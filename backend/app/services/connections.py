@@ -0,0 +1,153 @@
+import asyncio
+import json
+from typing import Dict, Iterable, Optional, Set
+
+from fastapi import WebSocket
+
+from app.config import NOTIFY_QUEUE_SIZE, NOTIFY_SEND_TIMEOUT_SECONDS, NOTIFY_MAX_DROPS
+
+CLOSE_TRY_AGAIN_LATER = 1013
+
+
+# ---------------- Connections ----------------
+class Connection:
+    """
+    One WebSocket with its own bounded send queue, drained by a writer task
+    """
+
+    __slots__ = ("websocket", "topics", "queue", "task", "sent", "dropped", "consecutive_drops", "closed")
+
+    def __init__(self, websocket: WebSocket, topics: Optional[Set[str]], queue_size: int):
+        self.websocket = websocket
+        self.topics = topics  # None receives everything
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.dropped = 0
+        self.consecutive_drops = 0
+        self.closed = False
+
+    def wants(self, topic: Optional[str]) -> bool:
+        return self.topics is None or topic is None or topic.lower() in self.topics
+
+
+# ---------------- Connection Manager ----------------
+class ConnectionManager:
+    """
+    Broadcasts to WebSocket clients without letting one client hold up the
+    others: a message is JSON-encoded once and queued for every interested
+    connection, and each connection's writer task sends on its own. A client
+    whose queue stays full for `max_drops` messages in a row, whose send
+    takes longer than `send_timeout`, or whose socket fails is evicted.
+    """
+
+    def __init__(self, queue_size: int, send_timeout: float, max_drops: int):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.max_drops = max_drops
+        self.connections: Set[Connection] = set()
+        self.broadcasts = 0
+        self.evicted: Dict[str, int] = {"slow": 0, "timeout": 0, "error": 0}
+        self.dropped_total = 0
+
+    @staticmethod
+    def _topics(topics: Optional[Iterable[str]]) -> Optional[Set[str]]:
+        normalized = {str(topic).strip().lower() for topic in topics or () if str(topic).strip()}
+        return normalized or None
+
+    async def connect(self, websocket: WebSocket, topics: Optional[Iterable[str]] = None) -> Connection:
+        await websocket.accept()
+        connection = Connection(websocket, self._topics(topics), self.queue_size)
+        connection.task = asyncio.create_task(self._writer(connection))
+        self.connections.add(connection)
+        return connection
+
+    def set_topics(self, connection: Connection, topics: Optional[Iterable[str]]):
+        connection.topics = self._topics(topics)
+
+    async def disconnect(self, connection: Connection):
+        self.connections.discard(connection)
+        connection.closed = True
+        if connection.task is not None and connection.task is not asyncio.current_task():
+            connection.task.cancel()
+            try:
+                await connection.task
+            except asyncio.CancelledError:
+                pass
+
+    def broadcast(self, message: dict, topic: Optional[str] = None) -> int:
+        """
+        Queue a message for every connection subscribed to `topic`; returns
+        how many connections it was queued for
+        """
+        text = json.dumps(message, default=str, separators=(",", ":"))
+        self.broadcasts += 1
+        queued = 0
+        for connection in list(self.connections):
+            if connection.closed or not connection.wants(topic):
+                continue
+            try:
+                connection.queue.put_nowait(text)
+            except asyncio.QueueFull:
+                connection.dropped += 1
+                connection.consecutive_drops += 1
+                self.dropped_total += 1
+                if connection.consecutive_drops >= self.max_drops:
+                    self._evict(connection, "slow")
+                continue
+            connection.consecutive_drops = 0
+            queued += 1
+        return queued
+
+    def _evict(self, connection: Connection, reason: str):
+        if connection.closed:
+            return
+        self.evicted[reason] += 1
+        connection.closed = True
+        self.connections.discard(connection)
+        if connection.task is not None and connection.task is not asyncio.current_task():
+            connection.task.cancel()
+        asyncio.create_task(self._close(connection.websocket))
+
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        try:
+            await websocket.close(code=CLOSE_TRY_AGAIN_LATER)
+        except Exception:
+            pass  # already gone
+
+    async def _writer(self, connection: Connection):
+        while True:
+            text = await connection.queue.get()
+            try:
+                await asyncio.wait_for(connection.websocket.send_text(text), self.send_timeout)
+            except asyncio.TimeoutError:
+                self._evict(connection, "timeout")
+                return
+            except Exception:
+                self._evict(connection, "error")
+                return
+            connection.sent += 1
+
+    async def close_all(self):
+        for connection in list(self.connections):
+            await self.disconnect(connection)
+            await self._close(connection.websocket)
+
+    def metrics(self) -> dict:
+        depths = [connection.queue.qsize() for connection in self.connections]
+        return {
+            "connections": len(depths),
+            "broadcasts": self.broadcasts,
+            "queue_depth_total": sum(depths),
+            "queue_depth_max": max(depths, default=0),
+            "dropped_total": self.dropped_total,
+            "evicted": dict(self.evicted),
+        }
+
+
+notification_connections = ConnectionManager(
+    queue_size=NOTIFY_QUEUE_SIZE,
+    send_timeout=NOTIFY_SEND_TIMEOUT_SECONDS,
+    max_drops=NOTIFY_MAX_DROPS,
+)
@@ -0,0 +1,66 @@
+import asyncio
+from typing import Dict, List, Tuple
+
+from pymongo import ReturnDocument
+
+from app.config import db, ID_BLOCK_SIZE, TELEMETRY_ID_BLOCK_SIZE
+
+COUNTERS_COLLECTION = db.counters
+
+
+class IdAllocator:
+    """
+    Hands out auto-increment ids from blocks reserved on the `counters`
+    collection. One $inc reserves a whole block, so ranges never overlap
+    across workers and ids stay monotonic within a process. Ids left in a
+    block when the process exits are simply skipped.
+    """
+
+    def __init__(self, collection, default_block: int, block_sizes: Dict[str, int] = None):
+        self.collection = collection
+        self.default_block = default_block
+        self.block_sizes = block_sizes or {}
+        self.ranges: Dict[str, List[int]] = {}  # counter -> [next, last]
+        self.locks: Dict[str, asyncio.Lock] = {}
+
+    def block_size(self, name: str) -> int:
+        return max(1, self.block_sizes.get(name, self.default_block))
+
+    async def reserve(self, name: str, size: int) -> Tuple[int, int]:
+        counter = await self.collection.find_one_and_update(
+            {"_id": name},
+            {"$inc": {"seq": size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        last = counter["seq"]
+        return last - size + 1, last
+
+    async def next_ids(self, name: str, count: int) -> List[int]:
+        ids: List[int] = []
+        while len(ids) < count:
+            current = self.ranges.get(name)
+            if current and current[0] <= current[1]:
+                take = min(count - len(ids), current[1] - current[0] + 1)
+                ids.extend(range(current[0], current[0] + take))
+                current[0] += take
+                continue
+            lock = self.locks.setdefault(name, asyncio.Lock())
+            async with lock:
+                current = self.ranges.get(name)
+                if current and current[0] <= current[1]:
+                    continue  # another task refilled while we waited
+                size = max(self.block_size(name), count - len(ids))
+                first, last = await self.reserve(name, size)
+                self.ranges[name] = [first, last]
+        return ids
+
+    async def next_id(self, name: str) -> int:
+        return (await self.next_ids(name, 1))[0]
+
+
+id_allocator = IdAllocator(
+    COUNTERS_COLLECTION,
+    default_block=ID_BLOCK_SIZE,
+    block_sizes={"telemetry_id": TELEMETRY_ID_BLOCK_SIZE},
+)
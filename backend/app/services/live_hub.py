@@ -0,0 +1,215 @@
+import asyncio
+import json
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import LIVE_QUEUE_SIZE, LIVE_MAX_TOPICS
+from app.services.map_matcher import map_matcher
+from app.utils.eta import eta_minutes_on_route
+
+Topic = Tuple[str, str]  # ("session" | "route" | "stop", id or stop name)
+EVENT_FIELDS = ("session_id", "vehicle_id", "latitude", "longitude", "speed", "timestamp", "chainage_m", "off_route")
+
+
+def live_event(record: dict, route_id=None) -> dict:
+    """
+    The part of a stored telemetry record the hub needs, as a pub/sub payload
+    """
+    event = {field: record[field] for field in EVENT_FIELDS if field in record}
+    event["route_id"] = str(route_id) if route_id is not None else None
+    return event
+
+
+# ---------------- Subscribers ----------------
+class Subscriber:
+    """
+    One connection's pending updates, keyed so a newer update for the same
+    session (and stop) replaces the one not yet sent: a slow client skips
+    intermediate positions instead of queueing them. At most `max_pending`
+    keys are held; past that the oldest is dropped.
+    """
+
+    __slots__ = ("topics", "pending", "max_pending", "delivered", "coalesced", "dropped", "wake")
+
+    def __init__(self, max_pending: int):
+        self.topics: Set[Topic] = set()
+        self.pending: "OrderedDict[tuple, str]" = OrderedDict()
+        self.max_pending = max_pending
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.wake = asyncio.Event()
+
+    def offer(self, key: tuple, message: str):
+        if key in self.pending:
+            self.coalesced += 1
+            del self.pending[key]
+        elif len(self.pending) >= self.max_pending:
+            self.pending.popitem(last=False)
+            self.dropped += 1
+        self.pending[key] = message
+        self.wake.set()
+
+    async def next_batch(self, timeout: Optional[float] = None) -> List[str]:
+        """
+        Every pending message, oldest first; empty when `timeout` passes first
+        """
+        if not self.pending:
+            self.wake.clear()
+            try:
+                await asyncio.wait_for(self.wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        batch = list(self.pending.values())
+        self.pending.clear()
+        self.wake.clear()
+        self.delivered += len(batch)
+        return batch
+
+
+# ---------------- Live Hub ----------------
+class LiveHub:
+    """
+    Pushes position and ETA updates from the ingest path to subscribed
+    connections. Each update is built and JSON-encoded once per topic, and
+    the same string is handed to every subscriber of that topic.
+    """
+
+    def __init__(self, queue_size: int, max_topics: int):
+        self.queue_size = queue_size
+        self.max_topics = max_topics
+        self.topics: Dict[Topic, Set[Subscriber]] = {}
+        self.subscribers: Set[Subscriber] = set()
+        self.stop_topics = 0
+        # route_id -> {session_id: latest update} waiting for the route to load
+        self.loading: Dict[str, Dict[str, dict]] = {}
+        self.load_tasks: Set[asyncio.Task] = set()
+        self.published = 0
+
+    def connect(self) -> Subscriber:
+        subscriber = Subscriber(self.queue_size)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def subscribe(self, subscriber: Subscriber, sessions: Iterable = (), routes: Iterable = (), stops: Iterable = ()):
+        """
+        Replace a connection's subscriptions
+        """
+        topics = {("session", str(s)) for s in sessions} | {("route", str(r)) for r in routes} | {("stop", str(s)) for s in stops}
+        if len(topics) > self.max_topics:
+            raise ValueError(f"Too many subscriptions: {len(topics)} (max {self.max_topics})")
+        self._unsubscribe(subscriber)
+        for topic in topics:
+            if topic not in self.topics:
+                self.topics[topic] = set()
+                self.stop_topics += topic[0] == "stop"
+            self.topics[topic].add(subscriber)
+        subscriber.topics = topics
+
+    def _unsubscribe(self, subscriber: Subscriber):
+        for topic in subscriber.topics:
+            members = self.topics.get(topic)
+            if members is not None:
+                members.discard(subscriber)
+                if not members:
+                    del self.topics[topic]
+                    self.stop_topics -= topic[0] == "stop"
+        subscriber.topics = set()
+
+    def disconnect(self, subscriber: Subscriber):
+        self._unsubscribe(subscriber)
+        self.subscribers.discard(subscriber)
+
+    def publish(self, record: dict, route_id=None):
+        """
+        Fan out one stored telemetry record; a no-op when nobody listens
+        """
+        if not self.topics:
+            return
+        session_id = str(record["session_id"])
+        route_id = str(route_id) if route_id is not None else None
+        update = {
+            "type": "position",
+            "session_id": session_id,
+            "vehicle_id": record.get("vehicle_id"),
+            "route_id": route_id,
+            "lat": record["latitude"],
+            "lng": record["longitude"],
+            "speed": record.get("speed"),
+            "timestamp": record.get("timestamp"),
+        }
+        if "chainage_m" in record:
+            update["chainage_m"] = record["chainage_m"]
+            update["off_route"] = record.get("off_route")
+
+        listeners: Set[Subscriber] = set(self.topics.get(("session", session_id), ()))
+        if route_id is not None:
+            listeners |= self.topics.get(("route", route_id), set())
+        if listeners:
+            message = json.dumps(update, separators=(",", ":"))
+            for subscriber in listeners:
+                subscriber.offer((session_id,), message)
+        if route_id is not None:
+            self._publish_etas(update, route_id)
+        self.published += 1
+
+    def handle_event(self, event: dict):
+        """
+        Pub/sub handler for live_event payloads, run in every worker
+        """
+        self.publish(event, event.get("route_id"))
+
+    def _publish_etas(self, update: dict, route_id: str):
+        if not self.stop_topics:
+            return
+        arrays = map_matcher.cached_arrays(route_id)
+        if arrays is not None:
+            self._offer_etas(arrays, update)
+            return
+        # Fix ingested by another worker: load the route here, then catch up
+        waiting = self.loading.get(route_id)
+        if waiting is None:
+            waiting = self.loading[route_id] = {}
+            task = asyncio.get_running_loop().create_task(self._load_route(route_id))
+            self.load_tasks.add(task)
+            task.add_done_callback(self.load_tasks.discard)
+        waiting[update["session_id"]] = update
+
+    async def _load_route(self, route_id: str):
+        try:
+            arrays = await map_matcher.arrays(route_id)
+        except Exception as e:
+            arrays = None
+            print(f"Error loading route {route_id} for ETAs: {e}")
+        waiting = self.loading.pop(route_id, {})
+        if arrays is not None:
+            for update in waiting.values():
+                self._offer_etas(arrays, update)
+
+    def _offer_etas(self, arrays, update: dict):
+        # ETA once per subscribed stop on this route, shared by its subscribers
+        position = {"lat": update["lat"], "lng": update["lng"], "speed": update["speed"]}
+        if "chainage_m" in update:
+            position["chainage_m"] = update["chainage_m"]
+        for stop_name in arrays.stop_names:
+            listeners = self.topics.get(("stop", stop_name))
+            if not listeners:
+                continue
+            eta = eta_minutes_on_route(arrays, stop_name, position)
+            message = json.dumps({**update, "type": "eta", "stop": stop_name, "eta_minutes": eta}, separators=(",", ":"))
+            for subscriber in listeners:
+                subscriber.offer((update["session_id"], stop_name), message)
+
+    def metrics(self) -> dict:
+        return {
+            "connections": len(self.subscribers),
+            "topics": len(self.topics),
+            "published": self.published,
+            "pending": sum(len(s.pending) for s in self.subscribers),
+            "delivered": sum(s.delivered for s in self.subscribers),
+            "coalesced": sum(s.coalesced for s in self.subscribers),
+            "dropped": sum(s.dropped for s in self.subscribers),
+        }
+
+
+live_hub = LiveHub(queue_size=LIVE_QUEUE_SIZE, max_topics=LIVE_MAX_TOPICS)
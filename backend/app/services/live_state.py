@@ -0,0 +1,282 @@
+import asyncio
+import math
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from app.config import (
+    db,
+    LIVE_STATE_HISTORY_SIZE,
+    LIVE_STATE_FLUSH_SECONDS,
+    LIVE_STATE_MAX_SESSIONS,
+    LIVE_STATE_TTL_SECONDS,
+)
+
+SESSION_COLLECTION = db.sessions
+NAN = float("nan")
+
+
+def session_query_for(session_id: str) -> dict:
+    return {"id": int(session_id)} if session_id.isdigit() else {"_id": session_id}
+
+
+# ---------------- Ring Buffer ----------------
+class SessionTrack:
+    """
+    Fixed-size ring buffer of the most recent GPS fixes of one session.
+    Coordinates, speed and map-matching results live in array('d') columns
+    (NaN when a fix was not matched); timestamps are kept as the strings the
+    device sent.
+    """
+
+    __slots__ = ("size", "lat", "lng", "speed", "chainage", "offset", "timestamps", "head", "count", "loaded_at")
+
+    def __init__(self, size: int):
+        self.size = size
+        self.lat = array("d", bytes(8 * size))
+        self.lng = array("d", bytes(8 * size))
+        self.speed = array("d", bytes(8 * size))
+        self.chainage = array("d", [NAN] * size)
+        self.offset = array("d", [NAN] * size)
+        self.timestamps: List[Optional[str]] = [None] * size
+        self.head = 0  # slot the next fix is written to
+        self.count = 0
+        self.loaded_at = time.monotonic()
+
+    def push(self, lat: float, lng: float, speed: float, timestamp: str, chainage: float = NAN, offset: float = NAN):
+        slot = self.head
+        self.lat[slot] = lat
+        self.lng[slot] = lng
+        self.speed[slot] = speed
+        self.chainage[slot] = chainage
+        self.offset[slot] = offset
+        self.timestamps[slot] = timestamp
+        self.head = (slot + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def point(self, slot: int) -> dict:
+        point = {
+            "lat": self.lat[slot],
+            "lng": self.lng[slot],
+            "speed": self.speed[slot],
+            "timestamp": self.timestamps[slot],
+        }
+        if not math.isnan(self.chainage[slot]):
+            point["chainage_m"] = self.chainage[slot]
+            point["off_route_m"] = self.offset[slot]
+        return point
+
+    def points(self) -> List[dict]:
+        """
+        Fixes ordered oldest to newest
+        """
+        start = (self.head - self.count) % self.size
+        return [self.point((start + offset) % self.size) for offset in range(self.count)]
+
+    def latest(self) -> Optional[dict]:
+        if not self.count:
+            return None
+        return self.point((self.head - 1) % self.size)
+
+
+# ---------------- Live State Store ----------------
+class LiveStateStore:
+    """
+    Process-local live position state keyed by session id.
+    Ingest writes go to the ring buffers, and the fixes added since the last
+    flush are appended to the session's gps_history with $push/$slice by a
+    background flush, so workers never overwrite each other's fixes.
+    A cached track is trusted for `ttl` seconds (or while it holds unflushed
+    fixes) and then reloaded, so fixes ingested by other workers show up.
+    Sessions with no stored history and failed loads are never cached.
+    """
+
+    def __init__(self, collection, history_size: int, flush_interval: float, max_sessions: int, ttl: float):
+        self.collection = collection
+        self.history_size = history_size
+        self.flush_interval = flush_interval
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.tracks: "OrderedDict[str, SessionTrack]" = OrderedDict()
+        self.dirty: Dict[str, List[dict]] = {}  # session id -> fixes not yet flushed
+        self._task: Optional[asyncio.Task] = None
+
+    def _touch(self, session_id: str) -> Optional[SessionTrack]:
+        track = self.tracks.get(session_id)
+        if track is not None:
+            self.tracks.move_to_end(session_id)
+        return track
+
+    def _evict(self):
+        # Drop least recently used sessions that have nothing left to flush
+        while len(self.tracks) > self.max_sessions:
+            victim = next((sid for sid in self.tracks if sid not in self.dirty), None)
+            if victim is None:
+                break
+            del self.tracks[victim]
+
+    def _fresh(self, session_id: str) -> Optional[SessionTrack]:
+        """
+        The cached track, unless it is older than `ttl` with nothing to flush
+        """
+        track = self._touch(session_id)
+        if track is None:
+            return None
+        if session_id in self.dirty or time.monotonic() - track.loaded_at < self.ttl:
+            return track
+        return None
+
+    def _build(self, history: Optional[List[dict]]) -> SessionTrack:
+        track = SessionTrack(self.history_size)
+        for point in (history or [])[-self.history_size:]:
+            track.push(
+                float(point.get("lat", 0)),
+                float(point.get("lng", 0)),
+                float(point.get("speed") or 0),
+                point.get("timestamp"),
+                float(point.get("chainage_m", NAN)),
+                float(point.get("off_route_m", NAN)),
+            )
+        return track
+
+    def _cache(self, session_id: str, track: SessionTrack) -> SessionTrack:
+        self.tracks[session_id] = track
+        self.tracks.move_to_end(session_id)
+        self._evict()
+        return track
+
+    def _loaded(self, session_id: str, history: Optional[List[dict]]) -> SessionTrack:
+        # An empty history is not cached: the first fix may arrive on another worker
+        if not history:
+            self.tracks.pop(session_id, None)
+            return SessionTrack(self.history_size)
+        return self._cache(session_id, self._build(history))
+
+    def seed(self, session_id: str, history: Optional[List[dict]]) -> SessionTrack:
+        """
+        Load a track from an already fetched gps_history, unless a fresh one is cached
+        """
+        track = self._fresh(session_id)
+        if track is not None:
+            return track
+        return self._cache(session_id, self._build(history))
+
+    async def _load(self, session_id: str) -> SessionTrack:
+        track = self._fresh(session_id)
+        if track is not None:
+            return track
+        try:
+            doc = await self.collection.find_one(session_query_for(session_id), {"gps_history": 1})
+        except Exception as e:
+            print(f"Error loading live state for session {session_id}: {e}")
+            # Serve what is cached, however old, without caching a failed load
+            return self._touch(session_id) or SessionTrack(self.history_size)
+        return self._loaded(session_id, (doc or {}).get("gps_history"))
+
+    def record(self, session_id: str, point: dict, history: Optional[List[dict]] = None):
+        """
+        Append a fix to a session. `history` is the gps_history the caller
+        just read; it replaces the cached track unless that has unflushed fixes.
+        """
+        if history is not None and session_id not in self.dirty:
+            track = self._cache(session_id, self._build(history))
+        else:
+            track = self.seed(session_id, history)
+        track.push(
+            point["lat"],
+            point["lng"],
+            float(point.get("speed") or 0),
+            point["timestamp"],
+            float(point.get("chainage_m", NAN)),
+            float(point.get("off_route_m", NAN)),
+        )
+        unflushed = self.dirty.setdefault(session_id, [])
+        unflushed.append({**point, "speed": float(point.get("speed") or 0)})
+        del unflushed[:-self.history_size]
+
+    async def get_history(self, session_id: str) -> List[dict]:
+        return (await self._load(session_id)).points()
+
+    async def get_latest(self, session_id: str) -> Optional[dict]:
+        return (await self._load(session_id)).latest()
+
+    async def get_latest_many(self, session_ids: List[str]) -> Dict[str, Optional[dict]]:
+        """
+        Latest fix per session; sessions not cached (or stale) are loaded with one $in
+        """
+        tracks = {sid: self._fresh(sid) for sid in session_ids}
+        missing = [sid for sid, track in tracks.items() if track is None]
+        if missing:
+            numeric_ids = [int(sid) for sid in missing if sid.isdigit()]
+            other_ids = [sid for sid in missing if not sid.isdigit()]
+            clauses = []
+            if numeric_ids:
+                clauses.append({"id": {"$in": numeric_ids}})
+            if other_ids:
+                clauses.append({"_id": {"$in": other_ids}})
+            histories = {}
+            try:
+                async for doc in self.collection.find({"$or": clauses}, {"id": 1, "gps_history": 1}):
+                    key = str(doc["id"]) if "id" in doc else str(doc["_id"])
+                    histories[key] = doc.get("gps_history")
+            except Exception as e:
+                print(f"Error loading live state for {len(missing)} sessions: {e}")
+                for sid in missing:
+                    tracks[sid] = self._touch(sid)
+            else:
+                for sid in missing:
+                    tracks[sid] = self._loaded(sid, histories.get(sid))
+        return {sid: track.latest() if track is not None else None for sid, track in tracks.items()}
+
+    async def flush(self):
+        """
+        Append the fixes of every session written since the last flush
+        """
+        if not self.dirty:
+            return
+        pending, self.dirty = self.dirty, {}
+        operations = [
+            UpdateOne(
+                session_query_for(session_id),
+                {"$push": {"gps_history": {"$each": points, "$slice": -self.history_size}}},
+            )
+            for session_id, points in pending.items()
+        ]
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            # Keep the fixes so the next flush retries them, ahead of newer ones
+            for session_id, points in pending.items():
+                self.dirty[session_id] = (points + self.dirty.get(session_id, []))[-self.history_size:]
+            print(f"Error flushing live state for {len(pending)} sessions: {e}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+live_state = LiveStateStore(
+    SESSION_COLLECTION,
+    history_size=LIVE_STATE_HISTORY_SIZE,
+    flush_interval=LIVE_STATE_FLUSH_SECONDS,
+    max_sessions=LIVE_STATE_MAX_SESSIONS,
+    ttl=LIVE_STATE_TTL_SECONDS,
+)
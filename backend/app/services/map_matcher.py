@@ -0,0 +1,194 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.config import (
+    db,
+    MAP_MATCH_OFF_ROUTE_M,
+    MAP_MATCH_WINDOW_SEGMENTS,
+    MAP_MATCH_GRID_CELL_M,
+    MAP_MATCH_ROUTE_TTL_SECONDS,
+)
+from app.utils.geo import EARTH_RADIUS_M, RouteArrays, project_onto_segments
+from app.utils.polyline import route_geometry
+
+ROUTE_COLLECTION = db.routes
+METERS_PER_DEGREE = np.pi * EARTH_RADIUS_M / 180
+
+
+# ---------------- Segment Grid ----------------
+class SegmentGrid:
+    """
+    Uniform lat/lng grid over a route's segments: every cell lists the
+    segments that pass through it. Each segment is walked in quarter-cell
+    steps, so building costs time in proportion to route length rather than
+    to the area of each segment's bounding box; a corner a step cuts is
+    still covered by the neighbouring cells `candidates` searches.
+    """
+
+    STEPS_PER_CELL = 4
+
+    def __init__(self, arrays: RouteArrays, cell_m: float):
+        lats, lngs = arrays.geom_lat, arrays.geom_lng
+        self.cell_lat = cell_m / METERS_PER_DEGREE
+        self.cell_lng = self.cell_lat / max(np.cos(np.radians(float(lats.mean()))), 1e-6)
+        start_i, start_j = lats[:-1] / self.cell_lat, lngs[:-1] / self.cell_lng
+        span_i, span_j = lats[1:] / self.cell_lat - start_i, lngs[1:] / self.cell_lng - start_j
+        steps = np.ceil(np.maximum(np.abs(span_i), np.abs(span_j)) * self.STEPS_PER_CELL).astype(int) + 1
+        segment = np.repeat(np.arange(steps.size), steps)
+        position = np.arange(segment.size) - np.repeat(np.cumsum(steps) - steps, steps)
+        fraction = position / np.maximum(steps - 1, 1)[segment]
+        i = np.floor(start_i[segment] + fraction * span_i[segment]).astype(int)
+        j = np.floor(start_j[segment] + fraction * span_j[segment]).astype(int)
+        # Consecutive steps mostly stay in one cell; keep only the changes
+        changed = np.ones(segment.size, dtype=bool)
+        changed[1:] = (i[1:] != i[:-1]) | (j[1:] != j[:-1]) | (segment[1:] != segment[:-1])
+        cells: Dict[Tuple[int, int], list] = {}
+        for ci, cj, s in zip(i[changed].tolist(), j[changed].tolist(), segment[changed].tolist()):
+            members = cells.setdefault((ci, cj), [])
+            if not members or members[-1] != s:
+                members.append(s)
+        self.cells = {key: np.asarray(value, dtype=np.intp) for key, value in cells.items()}
+
+    def candidates(self, lat: float, lng: float) -> np.ndarray:
+        """
+        Segments in the point's cell and its eight neighbours
+        """
+        i = int(np.floor(lat / self.cell_lat))
+        j = int(np.floor(lng / self.cell_lng))
+        found = [self.cells[key] for key in ((i + di, j + dj) for di in (-1, 0, 1) for dj in (-1, 0, 1)) if key in self.cells]
+        if not found:
+            return np.zeros(0, dtype=np.intp)
+        return np.unique(np.concatenate(found))
+
+
+class MatchedRoute:
+    __slots__ = ("arrays", "grid", "loaded_at")
+
+    def __init__(self, arrays: RouteArrays, grid: SegmentGrid):
+        self.arrays = arrays
+        self.grid = grid
+        self.loaded_at = time.monotonic()
+
+
+# ---------------- Map Matcher ----------------
+class MapMatcher:
+    """
+    Streaming projection of GPS fixes onto the session's route geometry.
+    Each session remembers its last matched segment, so a fix is first tried
+    against a short window of segments ahead of it; the segment grid is the
+    fallback when the bus jumps (first fix, GPS gap, detour). A session's
+    last segment expires after `route_ttl` without a matched fix, so
+    sessions that are never deleted do not pile up.
+    """
+
+    def __init__(self, collection, off_route_m: float, window: int, cell_m: float, route_ttl: float):
+        self.collection = collection
+        self.off_route_m = off_route_m
+        self.window = window
+        self.cell_m = cell_m
+        self.route_ttl = route_ttl
+        self.routes: Dict[str, MatchedRoute] = {}
+        self.last_segment: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()  # session -> (segment, matched at)
+
+    def invalidate_route(self, route_id):
+        self.routes.pop(str(route_id), None)
+
+    def forget_session(self, session_id: str):
+        self.last_segment.pop(str(session_id), None)
+
+    def _recent_segment(self, session_id: str) -> Optional[int]:
+        entry = self.last_segment.get(session_id)
+        if entry is None or time.monotonic() - entry[1] >= self.route_ttl:
+            return None
+        return entry[0]
+
+    def _remember_segment(self, session_id: str, segment: int):
+        now = time.monotonic()
+        self.last_segment[session_id] = (segment, now)
+        self.last_segment.move_to_end(session_id)
+        # Oldest first, so expired entries are all at the front
+        while self.last_segment and now - next(iter(self.last_segment.values()))[1] >= self.route_ttl:
+            self.last_segment.popitem(last=False)
+
+    def cached_arrays(self, route_id) -> Optional[RouteArrays]:
+        """
+        Arrays of a route this matcher loaded within `route_ttl`, without any I/O
+        """
+        matched = self.routes.get(str(route_id))
+        if matched is None or time.monotonic() - matched.loaded_at >= self.route_ttl:
+            return None
+        return matched.arrays
+
+    async def arrays(self, route_id) -> Optional[RouteArrays]:
+        """
+        Arrays of a route, loaded through the route cache when missing or stale
+        """
+        matched = await self._route(route_id)
+        return matched.arrays if matched is not None else None
+
+    async def _route(self, route_id) -> Optional[MatchedRoute]:
+        key = str(route_id)
+        matched = self.routes.get(key)
+        if matched is not None and time.monotonic() - matched.loaded_at < self.route_ttl:
+            return matched
+        if not key.isdigit():
+            return None
+        doc = await self.collection.find_one(
+            {"id": int(key)},
+            {"id": 1, "route_points": 1, "route_geometry": 1, "route_geometry_polyline": 1, "geometry_chainage": 1, "stop_chainage": 1},
+        )
+        if not doc:
+            self.routes.pop(key, None)
+            return None
+        doc["route_geometry"] = route_geometry(doc)
+        arrays = RouteArrays.from_route(doc)
+        matched = MatchedRoute(arrays, SegmentGrid(arrays, self.cell_m) if arrays.has_geometry else None)
+        self.routes[key] = matched
+        return matched
+
+    async def match(self, session_id: str, route_id, lat: float, lng: float) -> Optional[dict]:
+        """
+        Chainage along the route and distance off it for one fix, or None
+        when the session's route has no geometry
+        """
+        matched = await self._route(route_id)
+        if matched is None or matched.grid is None:
+            return None
+        arrays = matched.arrays
+        last_segment_index = arrays.geom_lat.size - 2
+        session_id = str(session_id)
+
+        result = None
+        last = self._recent_segment(session_id)
+        if last is not None:
+            window = np.arange(max(last - 2, 0), min(last + self.window, last_segment_index) + 1)
+            result = project_onto_segments(lat, lng, arrays.geom_lat, arrays.geom_lng, arrays.geom_chainage, window)
+            if result[1] > self.off_route_m:
+                result = None
+        if result is None:
+            candidates = matched.grid.candidates(lat, lng)
+            if candidates.size == 0:
+                candidates = np.arange(last_segment_index + 1)
+            result = project_onto_segments(lat, lng, arrays.geom_lat, arrays.geom_lng, arrays.geom_chainage, candidates)
+
+        chainage, offset, segment = result
+        off_route = offset > self.off_route_m
+        if not off_route:
+            self._remember_segment(session_id, segment)
+        return {
+            "chainage_m": round(chainage, 1),
+            "off_route_m": round(offset, 1),
+            "off_route": off_route,
+        }
+
+
+map_matcher = MapMatcher(
+    ROUTE_COLLECTION,
+    off_route_m=MAP_MATCH_OFF_ROUTE_M,
+    window=MAP_MATCH_WINDOW_SEGMENTS,
+    cell_m=MAP_MATCH_GRID_CELL_M,
+    route_ttl=MAP_MATCH_ROUTE_TTL_SECONDS,
+)
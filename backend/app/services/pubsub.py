@@ -0,0 +1,226 @@
+import asyncio
+import os
+import socket
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List
+
+from pymongo import CursorType
+from pymongo.errors import BulkWriteError, CollectionInvalid
+
+from app.config import db, PUBSUB_BACKEND, PUBSUB_COLLECTION_MB, PUBSUB_FLUSH_SECONDS, PUBSUB_MAX_PENDING
+
+EVENT_COLLECTION_NAME = "events"
+NOTIFICATIONS_CHANNEL = "notifications"
+TELEMETRY_CHANNEL = "telemetry"
+
+Handler = Callable[[dict], None]
+
+
+# ---------------- Backends ----------------
+class PubSubBackend(ABC):
+    """
+    Delivers every published event to the handlers of its channel in every
+    worker exactly once. `publish` never blocks the caller.
+    """
+
+    kind = "none"
+
+    def __init__(self):
+        self.handlers: Dict[str, List[Handler]] = {}
+        self.published = 0
+        self.delivered = 0
+        self.handler_errors = 0
+
+    def subscribe(self, channel: str, handler: Handler):
+        self.handlers.setdefault(channel, []).append(handler)
+
+    @abstractmethod
+    def publish(self, channel: str, payload: dict):
+        """
+        Queue an event for every worker's handlers of `channel`
+        """
+
+    def dispatch(self, channel: str, payload: dict):
+        for handler in self.handlers.get(channel, ()):
+            try:
+                handler(payload)
+            except Exception as e:
+                self.handler_errors += 1
+                print(f"Error handling {channel} event: {e}")
+        self.delivered += 1
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def metrics(self) -> dict:
+        return {
+            "backend": self.kind,
+            "published": self.published,
+            "delivered": self.delivered,
+            "handler_errors": self.handler_errors,
+        }
+
+
+class LocalPubSub(PubSubBackend):
+    """
+    In-process delivery for a single worker (and tests)
+    """
+
+    kind = "local"
+
+    def publish(self, channel: str, payload: dict):
+        self.published += 1
+        self.dispatch(channel, payload)
+
+
+class MongoPubSub(PubSubBackend):
+    """
+    Cross-worker delivery through a capped collection. Publishes are
+    batched into insert_many calls; every worker (the publishing one
+    included) tails the collection with an awaitable cursor and dispatches
+    what it reads, so each event reaches each worker once and in insertion
+    order. Works on standalone servers as well as replica sets.
+
+    ObjectIds from different processes are not ordered, so a reopened
+    cursor cannot resume with `_id > last`. Instead every publisher numbers
+    its own events (`origin`, `seq`) and inserts them in that order; a
+    reopened cursor rereads the collection in natural order and skips each
+    origin's events up to the last `seq` already dispatched.
+
+    While Mongo is unreachable the outbox holds at most `max_pending`
+    events; past that the oldest telemetry events are dropped first, since
+    a newer position supersedes them.
+    """
+
+    kind = "mongo"
+
+    def __init__(self, database, collection_name: str, size_mb: int, flush_interval: float, max_pending: int):
+        super().__init__()
+        self.database = database
+        self.collection = database[collection_name]
+        self.collection_name = collection_name
+        self.size_mb = size_mb
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.dropped = 0
+        # Unique per process start, so a reused pid does not restart an old sequence
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{os.urandom(4).hex()}"
+        self.seq = 0
+        self.outbox: List[dict] = []
+        self.positions: Dict[str, int] = {}  # origin -> last seq dispatched
+        self.lag_seconds = 0.0
+        self._tasks: List[asyncio.Task] = []
+
+    def publish(self, channel: str, payload: dict):
+        self.published += 1
+        self.seq += 1
+        self.outbox.append({"channel": channel, "payload": payload, "origin": self.origin, "seq": self.seq, "at": time.time()})
+        self._cap()
+
+    def _cap(self):
+        if len(self.outbox) <= self.max_pending:
+            return
+        # Down to 90% of the cap, so a full outbox is not rescanned on every publish
+        excess = len(self.outbox) - self.max_pending * 9 // 10
+        self.dropped += excess
+        kept = []
+        for event in self.outbox:
+            if excess and event["channel"] == TELEMETRY_CHANNEL:
+                excess -= 1
+            else:
+                kept.append(event)
+        self.outbox = kept[excess:]  # still over: drop the oldest of the rest
+
+    async def flush(self):
+        if not self.outbox:
+            return
+        batch, self.outbox = self.outbox, []
+        try:
+            await self.collection.insert_many(batch, ordered=True)
+        except BulkWriteError as e:
+            written = e.details.get("nInserted", 0)
+            error = (e.details.get("writeErrors") or [{}])[0]
+            if error.get("code") == 11000:
+                written += 1  # stored by an earlier attempt whose reply was lost
+            self.outbox = batch[written:] + self.outbox
+            self._cap()
+            print(f"Error publishing {len(batch) - written} of {len(batch)} events: {error.get('errmsg')}")
+        except Exception as e:
+            self.outbox = batch + self.outbox
+            self._cap()
+            print(f"Error publishing {len(batch)} events: {e}")
+
+    async def _publisher(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def ensure_collection(self):
+        try:
+            await self.database.create_collection(self.collection_name, capped=True, size=self.size_mb * 1024 * 1024)
+        except CollectionInvalid:
+            pass  # already exists
+
+    async def _load_positions(self):
+        # Start after every event already stored, so a fresh worker does not replay history
+        pipeline = [{"$group": {"_id": "$origin", "seq": {"$max": "$seq"}}}]
+        async for position in self.collection.aggregate(pipeline):
+            if position["_id"] != self.origin:
+                self.positions[position["_id"]] = position["seq"]
+
+    async def _tail(self):
+        try:
+            await self._load_positions()
+        except Exception as e:
+            print(f"Error reading event positions: {e}")
+        while True:
+            cursor = self.collection.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+            try:
+                async for event in cursor:
+                    origin, seq = event.get("origin"), event.get("seq", 0)
+                    if seq <= self.positions.get(origin, 0):
+                        continue  # dispatched before the cursor was reopened
+                    self.positions[origin] = seq
+                    self.lag_seconds = max(0.0, time.time() - event.get("at", time.time()))
+                    self.dispatch(event["channel"], event["payload"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error tailing events: {e}")
+            # The cursor dies when the collection is empty or wraps; reopen it
+            await asyncio.sleep(self.flush_interval)
+
+    async def start(self):
+        try:
+            await self.ensure_collection()
+        except Exception as e:
+            print(f"Error creating event collection: {e}")
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._publisher()), asyncio.create_task(self._tail())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        await self.flush()
+
+    def metrics(self) -> dict:
+        return {**super().metrics(), "origin": self.origin, "outbox": len(self.outbox), "dropped": self.dropped, "lag_seconds": round(self.lag_seconds, 3)}
+
+
+def build_pubsub() -> PubSubBackend:
+    if PUBSUB_BACKEND == "mongo":
+        return MongoPubSub(db, EVENT_COLLECTION_NAME, PUBSUB_COLLECTION_MB, PUBSUB_FLUSH_SECONDS, PUBSUB_MAX_PENDING)
+    return LocalPubSub()
+
+
+pubsub = build_pubsub()
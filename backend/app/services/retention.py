@@ -0,0 +1,231 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from app.config import (
+    db,
+    RETENTION_INTERVAL_SECONDS,
+    TELEMETRY_RETENTION_POLICY,
+    TELEMETRY_RETENTION_KEEP,
+    TELEMETRY_RETENTION_SECONDS,
+)
+
+
+# ---------------- Policies ----------------
+class RetentionPolicy:
+    """
+    Base class: a policy owns one collection and knows how to trim it
+    """
+
+    kind = "none"
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.deleted_total = 0
+        self.last_run_at: Optional[float] = None
+
+    def mark(self, key: str):
+        """
+        Note that `key` received new documents; only last-N policies care
+        """
+
+    async def ensure_indexes(self):
+        pass
+
+    async def apply(self) -> int:
+        return 0
+
+    def metrics(self) -> dict:
+        return {
+            "policy": self.kind,
+            "deleted_total": self.deleted_total,
+            "last_run_at": self.last_run_at,
+        }
+
+
+class LastNPerKeyPolicy(RetentionPolicy):
+    """
+    Keep the newest `keep` documents per key (e.g. per session). Each dirty
+    key costs one indexed lookup for the cutoff document and one delete_many.
+    """
+
+    kind = "last_n"
+
+    def __init__(self, collection, key_field: str, order_field: str, keep: int):
+        super().__init__(collection)
+        self.key_field = key_field
+        self.order_field = order_field
+        self.keep = keep
+        self.pending: Dict[str, float] = {}  # key -> first time it was marked
+
+    def mark(self, key: str):
+        self.pending.setdefault(key, time.monotonic())
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([(self.key_field, 1), (self.order_field, -1), ("id", -1)])
+
+    async def trim(self, key: str) -> int:
+        cursor = (
+            self.collection.find({self.key_field: key}, {self.order_field: 1, "id": 1})
+            .sort([(self.order_field, -1), ("id", -1)])
+            .skip(self.keep)
+            .limit(1)
+        )
+        cutoff = None
+        async for doc in cursor:
+            cutoff = doc
+        if cutoff is None:
+            return 0
+        # Everything at or below the cutoff in (order_field, id) order goes
+        cutoff_value = cutoff.get(self.order_field)
+        result = await self.collection.delete_many({
+            self.key_field: key,
+            "$or": [
+                {self.order_field: {"$lt": cutoff_value}},
+                {self.order_field: cutoff_value, "id": {"$lte": cutoff.get("id")}},
+            ],
+        })
+        return result.deleted_count
+
+    async def apply(self) -> int:
+        pending, self.pending = self.pending, {}
+        deleted = 0
+        for key, marked_at in pending.items():
+            try:
+                deleted += await self.trim(key)
+            except Exception as e:
+                self.pending.setdefault(key, marked_at)
+                print(f"Error applying retention for {key}: {e}")
+        self.deleted_total += deleted
+        self.last_run_at = time.time()
+        return deleted
+
+    def metrics(self) -> dict:
+        oldest = min(self.pending.values(), default=None)
+        return {
+            **super().metrics(),
+            "keep": self.keep,
+            "pending_keys": len(self.pending),
+            "lag_seconds": round(time.monotonic() - oldest, 3) if oldest is not None else 0.0,
+        }
+
+
+class TTLPolicy(RetentionPolicy):
+    """
+    Let MongoDB expire documents through a TTL index on a date field
+    """
+
+    kind = "ttl"
+
+    def __init__(self, collection, field: str, seconds: int):
+        super().__init__(collection)
+        self.field = field
+        self.seconds = seconds
+
+    async def ensure_indexes(self):
+        await self.collection.create_index(self.field, expireAfterSeconds=self.seconds)
+
+    def metrics(self) -> dict:
+        return {**super().metrics(), "field": self.field, "seconds": self.seconds}
+
+
+class TimeWindowPolicy(RetentionPolicy):
+    """
+    Drop everything older than a sliding window with one range delete per run
+    """
+
+    kind = "window"
+
+    def __init__(self, collection, field: str, seconds: int):
+        super().__init__(collection)
+        self.field = field
+        self.seconds = seconds
+
+    async def ensure_indexes(self):
+        await self.collection.create_index(self.field)
+
+    async def apply(self) -> int:
+        cutoff = datetime.utcnow() - timedelta(seconds=self.seconds)
+        result = await self.collection.delete_many({self.field: {"$lt": cutoff}})
+        self.deleted_total += result.deleted_count
+        self.last_run_at = time.time()
+        return result.deleted_count
+
+    def metrics(self) -> dict:
+        lag = time.time() - self.last_run_at if self.last_run_at else None
+        return {**super().metrics(), "field": self.field, "seconds": self.seconds, "lag_seconds": lag}
+
+
+# ---------------- Retention Service ----------------
+class RetentionService:
+    """
+    Applies every registered policy off the request path on a fixed interval
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.policies: Dict[str, RetentionPolicy] = {}
+        self.last_cycle_seconds = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, policy: RetentionPolicy):
+        self.policies[name] = policy
+
+    def mark(self, name: str, key: str):
+        policy = self.policies.get(name)
+        if policy:
+            policy.mark(key)
+
+    async def run_once(self) -> int:
+        started = time.monotonic()
+        deleted = 0
+        for policy in self.policies.values():
+            deleted += await policy.apply()
+        self.last_cycle_seconds = time.monotonic() - started
+        return deleted
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"Error running retention cycle: {e}")
+
+    async def start(self):
+        for name, policy in self.policies.items():
+            try:
+                await policy.ensure_indexes()
+            except Exception as e:
+                print(f"Error creating retention indexes for {name}: {e}")
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def metrics(self) -> dict:
+        return {
+            "interval_seconds": self.interval,
+            "last_cycle_seconds": round(self.last_cycle_seconds, 4),
+            "policies": {name: policy.metrics() for name, policy in self.policies.items()},
+        }
+
+
+def build_telemetry_policy(collection) -> RetentionPolicy:
+    if TELEMETRY_RETENTION_POLICY == "ttl":
+        return TTLPolicy(collection, "received_at", TELEMETRY_RETENTION_SECONDS)
+    if TELEMETRY_RETENTION_POLICY == "window":
+        return TimeWindowPolicy(collection, "received_at", TELEMETRY_RETENTION_SECONDS)
+    return LastNPerKeyPolicy(collection, "session_id", "received_at", TELEMETRY_RETENTION_KEEP)
+
+
+retention = RetentionService(RETENTION_INTERVAL_SECONDS)
+retention.register("telemetry", build_telemetry_policy(db.telemetry))
@@ -0,0 +1,72 @@
+import time
+from typing import Dict, Iterable, Optional
+
+from app.config import db, ROUTE_CACHE_TTL_SECONDS, ROUTE_CACHE_MAX_ROUTES
+
+ROUTE_COLLECTION = db.routes
+META_PROJECTION = {"id": 1, "route_name": 1, "estimated_time": 1, "stops_version": 1}
+
+
+# ---------------- Route Metadata Cache ----------------
+class RouteMetaCache:
+    """
+    Read-through cache of the small per-route fields other documents join on
+    (name, estimated_time, stops_version), keyed by route id. Route writes in
+    this worker invalidate entries immediately; the TTL bounds staleness from
+    writes made by other workers.
+    """
+
+    def __init__(self, collection, ttl: float, max_routes: int):
+        self.collection = collection
+        self.ttl = ttl
+        self.max_routes = max_routes
+        self.entries: Dict[str, tuple] = {}  # route id -> (loaded_at, meta)
+
+    @staticmethod
+    def _meta(doc: dict) -> dict:
+        return {
+            "id": str(doc["id"]),
+            "route_name": doc.get("route_name"),
+            "estimated_time": doc.get("estimated_time"),
+            "stops_version": doc.get("stops_version", 0),
+        }
+
+    def _fresh(self, route_id: str) -> Optional[dict]:
+        entry = self.entries.get(route_id)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        return entry[1]
+
+    def put(self, doc: dict):
+        if len(self.entries) >= self.max_routes:
+            # Cheap bound: routes are few, so a full reset is rare and harmless
+            self.entries.clear()
+        meta = self._meta(doc)
+        self.entries[meta["id"]] = (time.monotonic(), meta)
+
+    def invalidate(self, route_id):
+        self.entries.pop(str(route_id), None)
+
+    async def get_many(self, route_ids: Iterable) -> Dict[str, dict]:
+        """
+        Metadata for every known route id; all misses are loaded with one $in
+        """
+        found = {}
+        missing = set()
+        for route_id in {str(r) for r in route_ids if r is not None}:
+            meta = self._fresh(route_id)
+            if meta is not None:
+                found[route_id] = meta
+            elif route_id.isdigit():
+                missing.add(int(route_id))
+        if missing:
+            async for doc in self.collection.find({"id": {"$in": list(missing)}}, META_PROJECTION):
+                self.put(doc)
+                found[str(doc["id"])] = self.entries[str(doc["id"])][1]
+        return found
+
+    async def get(self, route_id) -> Optional[dict]:
+        return (await self.get_many([route_id])).get(str(route_id))
+
+
+route_cache = RouteMetaCache(ROUTE_COLLECTION, ttl=ROUTE_CACHE_TTL_SECONDS, max_routes=ROUTE_CACHE_MAX_ROUTES)
@@ -0,0 +1,307 @@
+import asyncio
+import hashlib
+import heapq
+import json
+import math
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+
+from app.config import (
+    db,
+    ROUTING_PROVIDER,
+    OSRM_BASE_URL,
+    OSRM_TIMEOUT_SECONDS,
+    OSRM_RETRIES,
+    ROUTING_CONCURRENCY,
+    ROAD_GRAPH_PATH,
+)
+from app.utils.geo import distance_m
+
+GEOMETRY_CACHE_COLLECTION = db.route_geometry_cache
+COORD_PRECISION = 5  # ~1 m; stops closer than this share cache entries
+
+Coordinate = Tuple[float, float]  # (lon, lat), the OSRM/GeoJSON order
+
+
+# ---------------- Providers ----------------
+class RoutingProvider(ABC):
+    """
+    Turns one leg (two stops) into a road geometry as [[lon, lat], ...]
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def route_leg(self, start: Coordinate, end: Coordinate) -> List[List[float]]:
+        """
+        Road geometry of one leg; raises ValueError when no route is found
+        """
+
+    async def close(self):
+        pass
+
+
+class OSRMProvider(RoutingProvider):
+    """
+    OSRM HTTP API through one pooled aiohttp session, with a request timeout
+    and retries with backoff on network errors and 5xx responses
+    """
+
+    name = "osrm"
+
+    def __init__(self, base_url: str, timeout: float, retries: int):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retries = retries
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _client(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=self.timeout,
+                connector=aiohttp.TCPConnector(limit=ROUTING_CONCURRENCY * 2),
+            )
+        return self._session
+
+    async def route_leg(self, start: Coordinate, end: Coordinate) -> List[List[float]]:
+        url = f"{self.base_url}/{start[0]},{start[1]};{end[0]},{end[1]}?overview=full&geometries=geojson"
+        last_error = None
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._client().get(url) as resp:
+                    if resp.status >= 500:
+                        raise aiohttp.ClientResponseError(resp.request_info, resp.history, status=resp.status)
+                    if resp.status != 200:
+                        raise ValueError("OSRM routing failed")
+                    data = await resp.json()
+                    if not data.get("routes"):
+                        raise ValueError("No route found by OSRM")
+                    return data["routes"][0]["geometry"]["coordinates"]
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = e
+                if attempt < self.retries:
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+        raise ValueError(f"OSRM routing failed: {last_error}")
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+class StraightLineProvider(RoutingProvider):
+    """
+    Offline stand-in: every leg is a straight line between its stops
+    """
+
+    name = "straight"
+
+    async def route_leg(self, start: Coordinate, end: Coordinate) -> List[List[float]]:
+        return [list(start), list(end)]
+
+
+class RoadGraphProvider(RoutingProvider):
+    """
+    Offline router over a road graph loaded from a GeoJSON file of
+    LineString/MultiLineString features. Stops snap to the nearest graph
+    node and legs are shortest paths (Dijkstra on segment length).
+    """
+
+    name = "graph"
+
+    def __init__(self, path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            features = json.load(f).get("features", [])
+        self.nodes: List[Coordinate] = []
+        self.node_ids: Dict[Coordinate, int] = {}
+        self.edges: Dict[int, List[Tuple[int, float]]] = {}
+        for feature in features:
+            geometry = feature.get("geometry") or {}
+            lines = geometry.get("coordinates", [])
+            if geometry.get("type") == "LineString":
+                lines = [lines]
+            elif geometry.get("type") != "MultiLineString":
+                continue
+            for line in lines:
+                for a, b in zip(line, line[1:]):
+                    self._add_edge(self._node(a), self._node(b))
+
+    def _node(self, coordinate) -> int:
+        key = (round(coordinate[0], 6), round(coordinate[1], 6))
+        if key not in self.node_ids:
+            self.node_ids[key] = len(self.nodes)
+            self.nodes.append(key)
+        return self.node_ids[key]
+
+    def _add_edge(self, a: int, b: int):
+        (lon1, lat1), (lon2, lat2) = self.nodes[a], self.nodes[b]
+        length = distance_m(lat1, lon1, lat2, lon2)
+        self.edges.setdefault(a, []).append((b, length))
+        self.edges.setdefault(b, []).append((a, length))
+
+    def _nearest(self, coordinate: Coordinate) -> int:
+        lon, lat = coordinate
+        return min(range(len(self.nodes)), key=lambda n: (self.nodes[n][0] - lon) ** 2 + (self.nodes[n][1] - lat) ** 2)
+
+    async def route_leg(self, start: Coordinate, end: Coordinate) -> List[List[float]]:
+        if not self.nodes:
+            raise ValueError("Road graph is empty")
+        source, target = self._nearest(start), self._nearest(end)
+        best = {source: 0.0}
+        previous: Dict[int, int] = {}
+        queue = [(0.0, source)]
+        while queue:
+            cost, node = heapq.heappop(queue)
+            if node == target:
+                break
+            if cost > best.get(node, math.inf):
+                continue
+            for neighbour, length in self.edges.get(node, []):
+                candidate = cost + length
+                if candidate < best.get(neighbour, math.inf):
+                    best[neighbour] = candidate
+                    previous[neighbour] = node
+                    heapq.heappush(queue, (candidate, neighbour))
+        if target not in best:
+            raise ValueError("No route found in road graph")
+        path = [target]
+        while path[-1] != source:
+            path.append(previous[path[-1]])
+        coordinates = [list(start)] + [list(self.nodes[n]) for n in reversed(path)] + [list(end)]
+        return [c for i, c in enumerate(coordinates) if i == 0 or c != coordinates[i - 1]]
+
+
+# ---------------- Geometry Cache ----------------
+def leg_key(provider: str, start: Coordinate, end: Coordinate) -> str:
+    """
+    Content address of a leg: provider plus the rounded coordinate sequence
+    """
+    rounded = [[round(c, COORD_PRECISION) for c in point] for point in (start, end)]
+    payload = json.dumps([provider, rounded], separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GeometryCache:
+    """
+    Leg geometries cached in memory (LRU) in front of a Mongo collection
+    """
+
+    def __init__(self, collection, max_entries: int = 4096):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.memory: "OrderedDict[str, List[List[float]]]" = OrderedDict()
+
+    def _remember(self, key: str, coordinates: List[List[float]]):
+        self.memory[key] = coordinates
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    async def get_many(self, keys: Sequence[str]) -> Dict[str, List[List[float]]]:
+        found = {key: self.memory[key] for key in keys if key in self.memory}
+        missing = [key for key in keys if key not in found]
+        if missing:
+            try:
+                async for doc in self.collection.find({"_id": {"$in": missing}}):
+                    found[doc["_id"]] = doc["coordinates"]
+                    self._remember(doc["_id"], doc["coordinates"])
+            except Exception as e:
+                print(f"Error reading route geometry cache: {e}")
+        return found
+
+    async def put(self, key: str, provider: str, coordinates: List[List[float]]):
+        self._remember(key, coordinates)
+        try:
+            await self.collection.update_one(
+                {"_id": key},
+                {"$set": {"provider": provider, "coordinates": coordinates, "created_at": datetime.utcnow()}},
+                upsert=True,
+            )
+        except Exception as e:
+            print(f"Error writing route geometry cache: {e}")
+
+
+# ---------------- Routing Service ----------------
+class RoutingService:
+    """
+    Builds route geometries leg by leg through the cache. Identical legs in
+    one call, across concurrent calls and across a bulk import are fetched
+    from the provider once.
+    """
+
+    def __init__(self, provider: RoutingProvider, cache: GeometryCache, concurrency: int):
+        self.provider = provider
+        self.cache = cache
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.in_flight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def legs_for(stops: Sequence[dict]) -> List[Tuple[Coordinate, Coordinate]]:
+        coordinates = [(float(s["longitude"]), float(s["latitude"])) for s in stops]
+        return list(zip(coordinates, coordinates[1:]))
+
+    async def _fetch(self, key: str, start: Coordinate, end: Coordinate) -> List[List[float]]:
+        future = self.in_flight.get(key)
+        if future is not None:
+            return await future
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            async with self.semaphore:
+                coordinates = await self.provider.route_leg(start, end)
+            await self.cache.put(key, self.provider.name, coordinates)
+            future.set_result(coordinates)
+            return coordinates
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            self.in_flight.pop(key, None)
+
+    async def geometries(self, stop_lists: Sequence[Sequence[dict]]) -> List[List[List[float]]]:
+        """
+        Road geometry ([[lon, lat], ...]) for each stop list, in order
+        """
+        legs_per_route = [self.legs_for(stops) for stops in stop_lists]
+        unique: Dict[str, Tuple[Coordinate, Coordinate]] = {}
+        for legs in legs_per_route:
+            for start, end in legs:
+                unique.setdefault(leg_key(self.provider.name, start, end), (start, end))
+
+        resolved = await self.cache.get_many(list(unique))
+        missing = [key for key in unique if key not in resolved]
+        fetched = await asyncio.gather(*(self._fetch(key, *unique[key]) for key in missing))
+        resolved.update(zip(missing, fetched))
+
+        results = []
+        for legs in legs_per_route:
+            geometry: List[List[float]] = []
+            for start, end in legs:
+                coordinates = resolved[leg_key(self.provider.name, start, end)]
+                # Consecutive legs share their joining stop
+                geometry.extend(coordinates[1:] if geometry else coordinates)
+            results.append(geometry)
+        return results
+
+    async def geometry(self, stops: Sequence[dict]) -> List[List[float]]:
+        return (await self.geometries([stops]))[0]
+
+    async def close(self):
+        await self.provider.close()
+
+
+def build_provider() -> RoutingProvider:
+    if ROUTING_PROVIDER == "straight":
+        return StraightLineProvider()
+    if ROUTING_PROVIDER == "graph":
+        if not ROAD_GRAPH_PATH:
+            raise RuntimeError("ROAD_GRAPH_PATH must be set when ROUTING_PROVIDER=graph")
+        return RoadGraphProvider(ROAD_GRAPH_PATH)
+    return OSRMProvider(OSRM_BASE_URL, OSRM_TIMEOUT_SECONDS, OSRM_RETRIES)
+
+
+routing = RoutingService(build_provider(), GeometryCache(GEOMETRY_CACHE_COLLECTION), ROUTING_CONCURRENCY)
@@ -0,0 +1,288 @@
+import asyncio
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from app.config import db, SCHEDULE_INDEX_REFRESH_SECONDS
+
+SESSION_COLLECTION = db.sessions
+ENTITY_FIELDS = ("driver_id", "vehicle_id", "conductor_id")
+
+
+def naive_utc(value) -> Optional[datetime]:
+    """
+    Datetimes as Mongo returns them (naive UTC), whatever the client sent
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def interval_end_for(start: datetime, estimated_minutes: int) -> datetime:
+    return start + timedelta(minutes=estimated_minutes or 0)
+
+
+def overlaps(start: datetime, end: datetime, other_start: datetime, other_end: datetime) -> bool:
+    """
+    Half-open [start, end) intersection; two sessions starting at the same
+    instant always collide, even zero-length ones
+    """
+    return other_start == start or (other_start < end and start < other_end)
+
+
+# ---------------- Intervals ----------------
+class Interval:
+    __slots__ = ("session_id", "start", "end", "entities")
+
+    def __init__(self, session_id: str, start: datetime, end: datetime, entities: Dict[str, str]):
+        self.session_id = session_id
+        self.start = start
+        self.end = end
+        self.entities = entities  # field -> id, e.g. {"driver_id": "7", "vehicle_id": "3"}
+
+    def sort_key(self) -> Tuple[datetime, str]:
+        return (self.start, self.session_id)
+
+
+class IntervalIndex:
+    """
+    Intervals of one driver, vehicle or conductor, sorted by start. The
+    longest interval bounds how far back an overlap can begin, so a query is
+    two bisects plus a scan of the candidates in that window.
+    """
+
+    __slots__ = ("keys", "intervals", "max_length")
+
+    def __init__(self):
+        self.keys: List[Tuple[datetime, str]] = []
+        self.intervals: List[Interval] = []
+        self.max_length = timedelta(0)
+
+    def add(self, interval: Interval):
+        key = interval.sort_key()
+        position = bisect_left(self.keys, key)
+        self.keys.insert(position, key)
+        self.intervals.insert(position, interval)
+        self.max_length = max(self.max_length, interval.end - interval.start)
+
+    def remove(self, interval: Interval):
+        position = bisect_left(self.keys, interval.sort_key())
+        if position < len(self.keys) and self.intervals[position] is interval:
+            del self.keys[position]
+            del self.intervals[position]
+
+    def overlapping(self, start: datetime, end: datetime, exclude: str = None) -> List[Interval]:
+        low = bisect_left(self.keys, (start - self.max_length, ""))
+        high = bisect_right(self.keys, (max(start, end), "\uffff"))
+        return [
+            interval
+            for interval in self.intervals[low:high]
+            if interval.session_id != exclude and overlaps(start, end, interval.start, interval.end)
+        ]
+
+    def __len__(self):
+        return len(self.intervals)
+
+
+# ---------------- Schedule Index ----------------
+class ScheduleIndex:
+    """
+    The materialized [start_time, interval_end) interval of every session
+    that has not long ended, indexed per driver, vehicle and conductor.
+    Conflict checks for a new session are one in-memory pass; one indexed $or
+    query then covers older sessions and those written by other workers
+    since this one loaded.
+    """
+
+    def __init__(self, collection, refresh_interval: float):
+        self.collection = collection
+        self.refresh_interval = refresh_interval
+        self.by_entity: Dict[Tuple[str, str], IntervalIndex] = {}
+        self.sessions: Dict[str, Interval] = {}
+        self.max_length = timedelta(0)
+        self.lock = asyncio.Lock()  # serializes check-then-write within this worker
+        self._loading = asyncio.Lock()
+        self._journal: Optional[list] = None  # changes made while a load is reading
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _entities(doc: dict) -> Dict[str, str]:
+        return {field: str(doc[field]) for field in ENTITY_FIELDS if doc.get(field)}
+
+    def add(self, doc: dict):
+        """
+        Index (or re-index) a session document that has start_time and interval_end
+        """
+        if self._journal is not None:
+            self._journal.append(("add", doc))
+        session_id = str(doc["id"])
+        self._unindex(session_id)
+        start = naive_utc(doc["start_time"])
+        interval = Interval(session_id, start, naive_utc(doc.get("interval_end")) or start, self._entities(doc))
+        for field, entity_id in interval.entities.items():
+            self.by_entity.setdefault((field, entity_id), IntervalIndex()).add(interval)
+        self.sessions[session_id] = interval
+        self.max_length = max(self.max_length, interval.end - interval.start)
+
+    def remove(self, session_id: str):
+        if self._journal is not None:
+            self._journal.append(("remove", session_id))
+        self._unindex(session_id)
+
+    def _unindex(self, session_id: str):
+        interval = self.sessions.pop(str(session_id), None)
+        if interval is None:
+            return
+        for field, entity_id in interval.entities.items():
+            index = self.by_entity.get((field, entity_id))
+            if index is not None:
+                index.remove(interval)
+                if not len(index):
+                    del self.by_entity[(field, entity_id)]
+
+    def conflicts(self, entities: Dict[str, str], start: datetime, end: datetime, exclude: str = None) -> List[Tuple[str, Interval]]:
+        """
+        (field, interval) for every indexed session that collides with the
+        given entities over [start, end), earliest first
+        """
+        found = []
+        for field, entity_id in entities.items():
+            index = self.by_entity.get((field, str(entity_id)))
+            if index is not None:
+                found.extend((field, interval) for interval in index.overlapping(start, end, exclude))
+        return sorted(found, key=lambda pair: pair[1].start)
+
+    async def verify(self, entities: Dict[str, str], start: datetime, end: datetime, exclude: str = None) -> List[Tuple[str, Interval]]:
+        """
+        The same check against Mongo in one query; anything found is indexed
+        """
+        clauses = []
+        for field, entity_id in entities.items():
+            ids = self._id_forms([entity_id])
+            clauses.append({field: {"$in": ids}, "start_time": {"$lt": max(start, end)}, "interval_end": {"$gt": start}})
+            clauses.append({field: {"$in": ids}, "start_time": start})
+        query = {"$or": clauses}
+        if exclude is not None and str(exclude).isdigit():
+            query["id"] = {"$ne": int(exclude)}
+        await self._index_matching(query)
+        return self.conflicts(entities, start, end, exclude)
+
+    async def preload(self, entity_sets: List[Dict[str, str]], start: datetime, end: datetime):
+        """
+        Index every stored session of the given entities that touches
+        [start, end], in one query, ahead of checking a whole batch in memory
+        """
+        ids_by_field: Dict[str, set] = {}
+        for entities in entity_sets:
+            for field, entity_id in entities.items():
+                ids_by_field.setdefault(field, set()).add(entity_id)
+        if not ids_by_field:
+            return
+        await self._index_matching({
+            "$or": [{field: {"$in": self._id_forms(ids)}} for field, ids in ids_by_field.items()],
+            "start_time": {"$lte": end},
+            "interval_end": {"$gte": start},
+        })
+
+    @staticmethod
+    def _id_forms(entity_ids) -> list:
+        # ids have been written both as strings and as ints
+        forms = []
+        for entity_id in entity_ids:
+            forms.append(str(entity_id))
+            if str(entity_id).isdigit():
+                forms.append(int(entity_id))
+        return forms
+
+    async def _index_matching(self, query: dict):
+        projection = {"id": 1, "start_time": 1, "interval_end": 1, **{field: 1 for field in ENTITY_FIELDS}}
+        async for doc in self.collection.find(query, projection):
+            if "id" in doc:
+                self.add(doc)
+
+    async def check(self, entities: Dict[str, str], start: datetime, end: datetime, exclude: str = None) -> List[Tuple[str, Interval]]:
+        """
+        Conflicts for a proposed session: answered from memory when this
+        worker already knows one, otherwise confirmed with one query
+        """
+        found = self.conflicts(entities, start, end, exclude)
+        if found:
+            return found
+        return await self.verify(entities, start, end, exclude)
+
+    async def ensure_indexes(self):
+        for field in ENTITY_FIELDS:
+            await self.collection.create_index([(field, 1), ("start_time", 1), ("interval_end", 1)])
+        await self.collection.create_index([("interval_end", 1)])  # load() skips long-ended sessions
+
+    async def load(self):
+        """
+        Rebuild from Mongo, backfilling interval_end on sessions written before
+        it existed. Only sessions ending within the longest known interval of
+        now are read; older ones are left to verify(). Adds and removes made
+        while the load is reading are replayed onto the new index before it
+        replaces the current one.
+        """
+        async with self._loading:
+            fresh = ScheduleIndex(self.collection, self.refresh_interval)
+            self._journal = []
+            try:
+                cutoff = datetime.utcnow() - self.max_length
+                query = {"$or": [{"interval_end": {"$gte": cutoff}}, {"interval_end": None}]}
+                backfill = []
+                projection = {"id": 1, "start_time": 1, "end_time": 1, "interval_end": 1, **{field: 1 for field in ENTITY_FIELDS}}
+                async for doc in self.collection.find(query, projection):
+                    if "id" not in doc or not doc.get("start_time"):
+                        continue
+                    if doc.get("interval_end") is None:
+                        doc["interval_end"] = naive_utc(doc.get("end_time")) or naive_utc(doc["start_time"])
+                        backfill.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"interval_end": doc["interval_end"]}}))
+                    fresh.add(doc)
+                if backfill:
+                    await self.collection.bulk_write(backfill, ordered=False)
+                # No await from here to the swap, so nothing can slip in between
+                for action, value in self._journal:
+                    if action == "add":
+                        fresh.add(value)
+                    else:
+                        fresh.remove(value)
+            finally:
+                self._journal = None
+            self.by_entity, self.sessions = fresh.by_entity, fresh.sessions
+            self.max_length = max(self.max_length, fresh.max_length)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                # Drops sessions deleted or moved by other workers
+                await self.load()
+            except Exception as e:
+                print(f"Error refreshing schedule index: {e}")
+
+    async def start(self):
+        try:
+            await self.ensure_indexes()
+            await self.load()
+        except Exception as e:
+            print(f"Error loading schedule index: {e}")
+        if self._task is None and self.refresh_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+schedule_index = ScheduleIndex(SESSION_COLLECTION, refresh_interval=SCHEDULE_INDEX_REFRESH_SECONDS)
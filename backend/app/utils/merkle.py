@@ -0,0 +1,66 @@
+"""
+Binary Merkle trees over hex SHA-256 hashes.
+
+Leaves and inner nodes are hashed with different prefixes (0x00 / 0x01) so
+an inner node can never be passed off as a leaf. A node without a sibling
+is carried up a level unchanged. A proof lists the sibling hashes from the
+leaf to the root, each marked "l" or "r" for the side it sits on, so a
+tree of n leaves gives proofs of about log2(n) steps.
+"""
+import hashlib
+from typing import List, Tuple
+
+Proof = List[Tuple[str, str]]  # [(side, sibling hash hex), ...] from the leaf up
+
+
+def _leaf(value: str) -> bytes:
+    return hashlib.sha256(b"\x00" + bytes.fromhex(value)).digest()
+
+
+def _node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def build_tree(leaves: List[str]) -> Tuple[str, List[Proof]]:
+    """
+    Root of the tree over `leaves` and the inclusion proof of every leaf
+    """
+    if not leaves:
+        raise ValueError("A Merkle tree needs at least one leaf")
+    level = [_leaf(value) for value in leaves]
+    proofs: List[Proof] = [[] for _ in leaves]
+    members = [[index] for index in range(len(leaves))]  # leaves under each node of the level
+    while len(level) > 1:
+        next_level, next_members = [], []
+        for position in range(0, len(level) - 1, 2):
+            left, right = level[position], level[position + 1]
+            for index in members[position]:
+                proofs[index].append(("r", right.hex()))
+            for index in members[position + 1]:
+                proofs[index].append(("l", left.hex()))
+            next_level.append(_node(left, right))
+            next_members.append(members[position] + members[position + 1])
+        if len(level) % 2:
+            next_level.append(level[-1])
+            next_members.append(members[-1])
+        level, members = next_level, next_members
+    return level[0].hex(), proofs
+
+
+def merkle_root(leaves: List[str]) -> str:
+    return build_tree(leaves)[0]
+
+
+def verify_proof(leaf: str, proof: Proof, root: str) -> bool:
+    """
+    Whether `leaf` is in the tree with `root`; O(len(proof))
+    """
+    try:
+        node = _leaf(leaf)
+        for side, sibling in proof:
+            if side not in ("l", "r"):
+                return False
+            node = _node(bytes.fromhex(sibling), node) if side == "l" else _node(node, bytes.fromhex(sibling))
+    except (ValueError, TypeError):
+        return False
+    return node.hex() == root
@@ -0,0 +1,169 @@
+"""
+Keyset pagination shared by every list endpoint.
+
+A list is read in a fixed order whose last key is unique (`_id`), so the
+sort-key values of the last row of a page identify exactly where the next
+page starts. The values travel as an opaque `next_cursor` token in the
+`X-Next-Cursor` response header; the response body stays a plain JSON array.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Awaitable, List, Optional, Sequence, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.config import PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+Order = Sequence[Tuple[str, int]]
+
+_KEYSET_INDEXES: List[tuple] = []
+
+
+# ---------------- Cursor Tokens ----------------
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"$d": value.isoformat()}
+    if isinstance(value, ObjectId):
+        return {"$o": str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "$d" in value:
+            return datetime.fromisoformat(value["$d"])
+        if "$o" in value:
+            return ObjectId(value["$o"])
+    return value
+
+
+def encode_cursor(order: Order, doc: dict) -> str:
+    payload = {"k": [field for field, _ in order], "v": [_encode_value(doc.get(field)) for field, _ in order]}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(order: Order, token: str) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        values = [_decode_value(v) for v in payload["v"]]
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if payload.get("k") != [field for field, _ in order]:
+        raise ValueError("Cursor does not belong to this list")
+    return values
+
+
+def keyset_filter(order: Order, values: list) -> dict:
+    """
+    Rows strictly after `values` in `order`:
+    (k1 > v1) or (k1 = v1 and k2 > v2) or ...
+    """
+    clauses = []
+    for position, (field, direction) in enumerate(order):
+        clause = {f: v for (f, _), v in zip(order[:position], values[:position])}
+        clause[field] = {"$gt" if direction > 0 else "$lt": values[position]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+# ---------------- Page Parameters ----------------
+class PageParams:
+    """
+    Query parameters common to every list endpoint: ?limit=&cursor=&fields=a,b
+    """
+
+    def __init__(
+        self,
+        limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT),
+        cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.fields = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+
+class Page:
+    __slots__ = ("items", "next_cursor")
+
+    def __init__(self, items: list, next_cursor: Optional[str]):
+        self.items = items
+        self.next_cursor = next_cursor
+
+
+def keyset_index(collection, order: Order, **options):
+    """
+    Register the compound index an ordering needs; created at startup.
+    `options` go to create_index (e.g. partialFilterExpression).
+    """
+    _KEYSET_INDEXES.append((collection, list(order), options))
+
+
+async def ensure_keyset_indexes():
+    for collection, order, options in _KEYSET_INDEXES:
+        try:
+            await collection.create_index(order, **options)
+        except Exception as e:
+            print(f"Error creating list index {order}: {e}")
+
+
+async def paginate(
+    collection,
+    query: dict,
+    order: Order,
+    page: Optional[PageParams],
+    projection: dict = None,
+    field_sources: dict = None,
+) -> Page:
+    """
+    One page of raw documents plus the cursor of the next page (None at the end).
+    Without `page` the first PAGE_DEFAULT_LIMIT rows are returned.
+    `field_sources` maps output fields built by the serializer to the stored
+    fields they are built from, for the `fields` projection.
+    """
+    limit = page.limit if page else PAGE_DEFAULT_LIMIT
+    if page and page.cursor:
+        after = keyset_filter(order, decode_cursor(order, page.cursor))
+        query = {"$and": [query, after]} if query else after
+    if page and page.fields:
+        # Keep what serializers and the cursor need; the rest is trimmed after serialization
+        stored = ["id", *(field for field, _ in order)]
+        for field in page.fields:
+            stored.extend((field_sources or {}).get(field, [field]))
+        projection = {field: 1 for field in stored}
+    cursor = collection.find(query, projection).sort(list(order)).limit(limit + 1)
+    docs = [doc async for doc in cursor]
+    next_cursor = encode_cursor(order, docs[limit - 1]) if len(docs) > limit else None
+    return Page(docs[:limit], next_cursor)
+
+
+async def paged(response: Response, page: PageParams, fetch: Awaitable[Page], model=None):
+    """
+    Await a crud list call and shape the HTTP response: the cursor goes in a
+    header, and a `fields` projection is applied to the serialized rows
+    (limited to the response model's fields, so nothing hidden leaks)
+    """
+    if page.fields and model is not None:
+        known = getattr(model, "model_fields", None) or model.__fields__
+        unknown = set(page.fields) - set(known)
+        if unknown:
+            fetch.close()
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    try:
+        result = await fetch
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {NEXT_CURSOR_HEADER: result.next_cursor} if result.next_cursor else {}
+    if not page.fields:
+        response.headers.update(headers)
+        return result.items
+    keep = set(page.fields) | {"id"}
+    items = [{k: v for k, v in item.items() if k in keep} for item in result.items]
+    return JSONResponse(jsonable_encoder(items), headers=headers)
@@ -0,0 +1,167 @@
+"""
+Compact storage for route geometry.
+
+Geometry is stored as Google encoded polylines (precision 5, ~1.1 m
+quantisation): zig-zag varint deltas packed into ASCII, typically 4-6 bytes
+per vertex against ~60 bytes for a BSON {"latitude", "longitude"} subdocument.
+Simplified copies at a few Douglas-Peucker tolerances are stored next to the
+full line so light clients never pull the full-resolution path.
+"""
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from app.utils.geo import EARTH_RADIUS_M
+
+PRECISION = 5
+SIMPLIFY_TOLERANCES_M = (5.0, 25.0, 100.0)
+DEFAULT_SIMPLIFY_TOLERANCE_M = 25.0
+
+
+# ---------------- Encoding ----------------
+def _encode_value(value: int, out: List[str]):
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        out.append(chr((0x20 | (value & 0x1F)) + 63))
+        value >>= 5
+    out.append(chr(value + 63))
+
+
+def encode(points: Iterable[Sequence[float]], precision: int = PRECISION) -> str:
+    """
+    Encode (lat, lng) pairs as a polyline string
+    """
+    factor = 10 ** precision
+    out: List[str] = []
+    prev_lat = prev_lng = 0
+    for lat, lng in points:
+        lat_i, lng_i = int(round(lat * factor)), int(round(lng * factor))
+        _encode_value(lat_i - prev_lat, out)
+        _encode_value(lng_i - prev_lng, out)
+        prev_lat, prev_lng = lat_i, lng_i
+    return "".join(out)
+
+
+def decode(encoded: str, precision: int = PRECISION) -> List[List[float]]:
+    """
+    Decode a polyline string into [lat, lng] pairs
+    """
+    factor = 10 ** precision
+    points = []
+    index = lat = lng = 0
+    length = len(encoded)
+    while index < length:
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        points.append([lat / factor, lng / factor])
+    return points
+
+
+def to_geometry(points: Iterable[Sequence[float]]) -> List[dict]:
+    return [{"latitude": lat, "longitude": lng} for lat, lng in points]
+
+
+def from_geometry(geometry: Iterable[dict]) -> List[List[float]]:
+    return [[float(p["latitude"]), float(p["longitude"])] for p in geometry]
+
+
+# ---------------- Simplification ----------------
+def simplify(points: Sequence[Sequence[float]], tolerance_m: float) -> List[List[float]]:
+    """
+    Douglas-Peucker simplification of [lat, lng] pairs. Distances are taken
+    in a flat frame around the line's mean latitude, which is well inside the
+    tolerance for city and intercity routes. Endpoints are always kept.
+    """
+    count = len(points)
+    if count < 3 or tolerance_m <= 0:
+        return [list(p) for p in points]
+    coords = np.asarray(points, dtype=np.float64)
+    y = np.radians(coords[:, 0]) * EARTH_RADIUS_M
+    x = np.radians(coords[:, 1]) * EARTH_RADIUS_M * np.cos(np.radians(coords[:, 0].mean()))
+
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        px, py = x[first + 1:last] - x[first], y[first + 1:last] - y[first]
+        length2 = dx * dx + dy * dy
+        if length2 > 0:
+            t = np.clip((px * dx + py * dy) / length2, 0.0, 1.0)
+            distances = np.hypot(px - t * dx, py - t * dy)
+        else:
+            distances = np.hypot(px, py)
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance_m:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return coords[keep].tolist()
+
+
+# ---------------- Route Documents ----------------
+def geometry_storage(geometry: Sequence[dict], tolerances: Sequence[float] = SIMPLIFY_TOLERANCES_M) -> dict:
+    """
+    Fields stored on a route document for its geometry: the full encoded line
+    plus one encoded level per simplification tolerance
+    """
+    points = from_geometry(geometry)
+    levels = []
+    for tolerance in tolerances:
+        simplified = simplify(points, tolerance)
+        levels.append({"tolerance_m": tolerance, "points": len(simplified), "polyline": encode(simplified)})
+    return {
+        "route_geometry_polyline": encode(points),
+        "route_geometry_points": len(points),
+        "route_geometry_levels": levels,
+    }
+
+
+def quantize(geometry: Sequence[dict]) -> List[dict]:
+    """
+    Geometry rounded to the encoding precision, i.e. exactly what decodes back
+    """
+    return to_geometry([round(p["latitude"], PRECISION), round(p["longitude"], PRECISION)] for p in geometry)
+
+
+def encoded_level(doc: dict, tolerance_m: Optional[float] = None) -> Optional[str]:
+    """
+    Encoded polyline of a route: the full line, or the coarsest stored level
+    whose tolerance does not exceed `tolerance_m`
+    """
+    if tolerance_m is not None:
+        levels = [level for level in doc.get("route_geometry_levels") or [] if level["tolerance_m"] <= tolerance_m]
+        if levels:
+            return max(levels, key=lambda level: level["tolerance_m"])["polyline"]
+    if doc.get("route_geometry_polyline") is not None:
+        return doc["route_geometry_polyline"]
+    if doc.get("route_geometry"):
+        # Documents written before geometry was encoded
+        points = from_geometry(doc["route_geometry"])
+        return encode(simplify(points, tolerance_m) if tolerance_m else points)
+    return None
+
+
+def route_geometry(doc: dict, tolerance_m: Optional[float] = None) -> List[dict]:
+    """
+    Geometry of a route document as [{"latitude", "longitude"}, ...]
+    """
+    if tolerance_m is None and doc.get("route_geometry_polyline") is None:
+        return list(doc.get("route_geometry") or [])
+    encoded = encoded_level(doc, tolerance_m)
+    return to_geometry(decode(encoded)) if encoded else []
@@ -0,0 +1,50 @@
+"""
+Compare the vectorized kernels in app.utils.geo with geopy's geodesic loop.
+
+Run from backend/:  python -m benchmarks.bench_geo
+"""
+import time
+
+import numpy as np
+from geopy.distance import geodesic
+
+from app.utils.geo import haversine_m, segment_lengths_m
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    rng = np.random.default_rng(42)
+    origin = (31.3260, 75.5762)  # Jalandhar
+    print(f"{'points':>8} {'kernel':>22} {'geodesic s':>11} {'numpy s':>10} {'speedup':>9} {'max err %':>10}")
+    for n in (1_000, 10_000, 100_000):
+        lats = rng.uniform(29.5, 32.5, n)
+        lngs = rng.uniform(73.8, 77.0, n)
+        pairs = list(zip(lats.tolist(), lngs.tolist()))
+
+        reference = np.array([geodesic(origin, p).meters for p in pairs])
+        slow = timed(lambda: [geodesic(origin, p).meters for p in pairs], repeat=1)
+        fast = timed(lambda: haversine_m(origin[0], origin[1], lats, lngs))
+        error = np.max(np.abs(haversine_m(origin[0], origin[1], lats, lngs) - reference) / reference) * 100
+        print(f"{n:>8} {'point -> many':>22} {slow:>11.3f} {fast:>10.5f} {slow / fast:>8.0f}x {error:>10.3f}")
+
+        # Polyline with short, road-like steps
+        path_lat = origin[0] + np.cumsum(rng.normal(0, 0.0005, n))
+        path_lng = origin[1] + np.cumsum(rng.normal(0, 0.0005, n))
+        vertices = list(zip(path_lat.tolist(), path_lng.tolist()))
+        reference = np.array([geodesic(a, b).meters for a, b in zip(vertices, vertices[1:])])
+        slow = timed(lambda: [geodesic(a, b).meters for a, b in zip(vertices, vertices[1:])], repeat=1)
+        fast = timed(lambda: segment_lengths_m(path_lat, path_lng))
+        error = np.max(np.abs(segment_lengths_m(path_lat, path_lng) - reference) / reference) * 100
+        print(f"{n:>8} {'polyline segments':>22} {slow:>11.3f} {fast:>10.5f} {slow / fast:>8.0f}x {error:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Bytes per fix and throughput of app.utils.trace_codec against one BSON
+telemetry document per fix, with a round-trip check.
+
+Run from backend/:  python -m benchmarks.bench_trace_codec
+"""
+import time
+from datetime import datetime, timedelta
+
+import bson
+import numpy as np
+
+from app.utils.trace_codec import decode_block, encode_block
+
+
+def synthetic_trace(n: int, interval_s: float, matched: bool, seed: int = 7) -> list:
+    rng = np.random.default_rng(seed)
+    start = datetime(2026, 1, 5, 6, 30)
+    offsets = np.cumsum(np.maximum(0.2, rng.normal(interval_s, interval_s * 0.05, n)))
+    lats = 31.3260 + np.cumsum(rng.normal(0, 0.00008, n))
+    lngs = 75.5762 + np.cumsum(rng.normal(0.0001, 0.00008, n))
+    speeds = np.clip(rng.normal(32, 8, n), 0, None)
+    fixes = []
+    for index in range(n):
+        fix = {
+            "timestamp": start + timedelta(milliseconds=int(offsets[index] * 1000)),
+            "latitude": float(lats[index]),
+            "longitude": float(lngs[index]),
+            "speed": float(speeds[index]),
+        }
+        if matched and index % 10:
+            fix["chainage_m"] = float(index * 9.3)
+            fix["off_route_m"] = float(abs(rng.normal(0, 4)))
+        fixes.append(fix)
+    return fixes
+
+
+def bson_bytes(fixes: list) -> int:
+    # What the telemetry collection stores for the same fixes
+    total = 0
+    for index, fix in enumerate(fixes):
+        total += len(bson.encode({
+            "_id": bson.ObjectId(),
+            "id": 100000 + index,
+            "session_id": "1042",
+            "vehicle_id": "318",
+            "driver_id": "77",
+            "latitude": fix["latitude"],
+            "longitude": fix["longitude"],
+            "speed": fix["speed"],
+            "timestamp": fix["timestamp"].isoformat(),
+            "created_at": fix["timestamp"].isoformat(),
+            "received_at": fix["timestamp"],
+            **({"chainage_m": fix["chainage_m"], "off_route_m": fix["off_route_m"]} if "chainage_m" in fix else {}),
+        }))
+    return total
+
+
+def check_round_trip(fixes: list, decoded: list):
+    assert len(fixes) == len(decoded)
+    for original, fix in zip(fixes, decoded):
+        assert abs(fix["timestamp"] - original["timestamp"]) < timedelta(milliseconds=1)
+        assert abs(fix["latitude"] - original["latitude"]) <= 0.5e-6
+        assert abs(fix["longitude"] - original["longitude"]) <= 0.5e-6
+        assert abs(fix["speed"] - original["speed"]) <= 0.05 + 1e-9
+        assert ("chainage_m" in fix) == ("chainage_m" in original)
+        if "chainage_m" in fix:
+            assert abs(fix["chainage_m"] - original["chainage_m"]) <= 0.05 + 1e-9
+
+
+def main():
+    print(f"{'fixes':>7} {'interval':>9} {'matched':>8} {'bson B/fix':>11} {'trace B/fix':>12} {'ratio':>7} {'enc fix/s':>11} {'dec fix/s':>11}")
+    for n in (1, 5, 100, 1_000, 10_000):
+        for interval_s in (1.0, 5.0):
+            for matched in (False, True):
+                fixes = synthetic_trace(n, interval_s, matched)
+                started = time.perf_counter()
+                block = encode_block(fixes, {"session_id": "1042"})
+                encode_s = time.perf_counter() - started
+                started = time.perf_counter()
+                decoded = decode_block(block)
+                decode_s = time.perf_counter() - started
+                check_round_trip(fixes, decoded)
+                stored = bson_bytes(fixes) / n
+                packed = len(block) / n
+                print(
+                    f"{n:>7} {interval_s:>8.0f}s {str(matched):>8} {stored:>11.1f} {packed:>12.2f} "
+                    f"{stored / packed:>6.0f}x {n / encode_s:>11.0f} {n / decode_s:>11.0f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""
+Fleet replay and load simulator for the tracking API.
+
+Buses drive along stored (or generated) route geometry and post fixes to
+/telemetry/ while passengers query /passenger/search-buses; latency and
+errors are reported per endpoint. See `python -m simulator --help`.
+"""
@@ -0,0 +1,76 @@
+"""
+Run from backend/:
+
+    python -m simulator --buses 200 --duration 120 --search-rate 20
+    python -m simulator --target http://localhost:8000 --buses 500
+    python -m simulator --mongo memory --generate-routes --buses 100
+
+In-process runs import app.main, so the usual environment (RPC_URL,
+CONTRACT_ADDRESS, MONGODB_URI, ...) still applies; `--mongo memory` swaps
+Motor for mongomock-motor, and generated routes use the straight-line
+routing provider unless ROUTING_PROVIDER is set.
+"""
+import argparse
+import asyncio
+import json
+import os
+
+from simulator.metrics import format_report
+from simulator.runner import ASGI_TARGET, SimulationConfig, run
+
+
+def use_in_memory_mongo():
+    # Must run before app.config creates its client
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise SystemExit("--mongo memory needs mongomock-motor (pip install mongomock-motor)")
+    import motor.motor_asyncio
+
+    motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m simulator", description="Replay a bus fleet against the tracking API")
+    parser.add_argument("--target", default=ASGI_TARGET, help="'asgi' (in-process) or a base URL such as http://localhost:8000")
+    parser.add_argument("--mongo", choices=["env", "memory"], default="env", help="in-process runs: MONGODB_URI or an in-memory stand-in")
+    parser.add_argument("--buses", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of load")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between fixes of one bus")
+    parser.add_argument("--speed-kmh", type=float, default=35.0, help="mean bus speed")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="driving seconds per wall-clock second")
+    parser.add_argument("--search-rate", type=float, default=0.0, help="passenger searches per second")
+    parser.add_argument("--routes", type=int, default=10, help="routes to drive on (loaded or generated)")
+    parser.add_argument("--generate-routes", action="store_true", help="create synthetic routes instead of using stored ones")
+    parser.add_argument("--max-inflight", type=int, default=200, help="cap on concurrent searches")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--cleanup", action="store_true", help="delete the simulated sessions afterwards")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.target == ASGI_TARGET and args.mongo == "memory":
+        use_in_memory_mongo()
+        os.environ.setdefault("ROUTING_PROVIDER", "straight")
+    config = SimulationConfig(
+        target=args.target,
+        buses=args.buses,
+        duration_s=args.duration,
+        fix_interval_s=args.interval,
+        speed_kmh=args.speed_kmh,
+        time_scale=args.time_scale,
+        search_rate=args.search_rate,
+        routes=args.routes,
+        generate_routes=args.generate_routes or (args.target == ASGI_TARGET and args.mongo == "memory"),
+        max_inflight=args.max_inflight,
+        seed=args.seed,
+        cleanup=args.cleanup,
+    )
+    report = asyncio.run(run(config))
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
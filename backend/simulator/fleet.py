@@ -0,0 +1,119 @@
+import random
+from typing import List, Optional
+
+import numpy as np
+
+from app.utils.geo import cumulative_distance_m
+
+# Stops for generated routes when the database has none
+PUNJAB_TOWNS = [
+    ("Amritsar", 31.6340, 74.8723),
+    ("Jalandhar", 31.3260, 75.5762),
+    ("Ludhiana", 30.9010, 75.8573),
+    ("Patiala", 30.3398, 76.3869),
+    ("Bathinda", 30.2110, 74.9455),
+    ("Mohali", 30.7046, 76.7179),
+    ("Phagwara", 31.2240, 75.7708),
+    ("Moga", 30.8165, 75.1717),
+    ("Hoshiarpur", 31.5143, 75.9115),
+    ("Firozpur", 30.9331, 74.6225),
+]
+
+
+def generated_routes(count: int, rng: random.Random, prefix: str) -> List[dict]:
+    """
+    RouteCreate payloads between random town pairs, with a few intermediate
+    stops. estimated_time is 0 so sessions stay open-ended, which is what
+    passenger search treats as active.
+    """
+    routes = []
+    for index in range(count):
+        (a_name, a_lat, a_lng), (b_name, b_lat, b_lng) = rng.sample(PUNJAB_TOWNS, 2)
+        stops = []
+        for step in range(1, 4):
+            fraction = step / 4
+            stops.append({
+                "name": f"{a_name}-{b_name} Stop {step}",
+                "latitude": a_lat + (b_lat - a_lat) * fraction + rng.uniform(-0.01, 0.01),
+                "longitude": a_lng + (b_lng - a_lng) * fraction + rng.uniform(-0.01, 0.01),
+            })
+        routes.append({
+            "route_name": f"SIM {a_name} - {b_name} #{index}",
+            "source": {"name": a_name, "latitude": a_lat, "longitude": a_lng},
+            "destination": {"name": b_name, "latitude": b_lat, "longitude": b_lng},
+            "vehicle_id": f"{prefix}-route-{index}",
+            "route_points": stops,
+            "estimated_time": 0,
+        })
+    return routes
+
+
+# ---------------- Route Tracks ----------------
+class RouteTrack:
+    """
+    A route's geometry with cumulative distances, for positions by distance
+    """
+
+    def __init__(self, route: dict):
+        self.route_id = str(route["id"])
+        self.destination = route["destination"]["name"]
+        self.stops = [stop["name"] for stop in route.get("route_points", [])]
+        geometry = route.get("route_geometry") or []
+        self.lats = np.array([point["latitude"] for point in geometry], dtype=np.float64)
+        self.lngs = np.array([point["longitude"] for point in geometry], dtype=np.float64)
+        self.cumulative = cumulative_distance_m(self.lats, self.lngs)
+        self.length_m = float(self.cumulative[-1]) if len(self.cumulative) else 0.0
+
+    def usable(self) -> bool:
+        return len(self.lats) >= 2 and self.length_m > 0
+
+    def position_at(self, distance_m: float):
+        distance_m = min(max(distance_m, 0.0), self.length_m)
+        segment = int(np.searchsorted(self.cumulative, distance_m, side="right")) - 1
+        segment = min(max(segment, 0), len(self.lats) - 2)
+        span = self.cumulative[segment + 1] - self.cumulative[segment]
+        fraction = (distance_m - self.cumulative[segment]) / span if span > 0 else 0.0
+        lat = self.lats[segment] + (self.lats[segment + 1] - self.lats[segment]) * fraction
+        lng = self.lngs[segment] + (self.lngs[segment + 1] - self.lngs[segment]) * fraction
+        return float(lat), float(lng)
+
+
+# ---------------- Buses ----------------
+class Bus:
+    """
+    One simulated vehicle driving its session's route, turning around at
+    either end, with speed jitter and GPS noise on every fix
+    """
+
+    def __init__(self, track: RouteTrack, session_id: str, driver_id: str, speed_kmh: float, rng: random.Random):
+        self.track = track
+        self.session_id = session_id
+        self.driver_id = driver_id
+        self.speed_kmh = speed_kmh
+        self.rng = rng
+        self.distance_m = rng.uniform(0, track.length_m)
+        self.direction = 1
+
+    def advance(self, seconds: float) -> dict:
+        """
+        Move `seconds` of driving time forward and return the fix to post
+        """
+        speed_kmh = max(0.0, self.rng.gauss(self.speed_kmh, self.speed_kmh * 0.15))
+        self.distance_m += self.direction * speed_kmh / 3.6 * seconds
+        if not 0 <= self.distance_m <= self.track.length_m:
+            self.direction = -self.direction
+            self.distance_m = min(max(self.distance_m, 0.0), self.track.length_m)
+        lat, lng = self.track.position_at(self.distance_m)
+        noise = 0.00003  # ~3 m
+        return {
+            "session_id": self.session_id,
+            "driver_id": self.driver_id,
+            "latitude": lat + self.rng.gauss(0, noise),
+            "longitude": lng + self.rng.gauss(0, noise),
+            "speed": round(speed_kmh, 1),
+        }
+
+    def search_request(self) -> Optional[dict]:
+        if not self.track.stops:
+            return None
+        return {"destination": self.track.destination, "bus_stop": self.rng.choice(self.track.stops)}
@@ -0,0 +1,67 @@
+import time
+from typing import Dict, List
+
+import numpy as np
+
+
+class EndpointStats:
+    __slots__ = ("latencies", "errors", "statuses")
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.statuses: Dict[str, int] = {}
+
+    def record(self, seconds: float, status: str, ok: bool):
+        self.latencies.append(seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if not ok:
+            self.errors += 1
+
+
+class Recorder:
+    """
+    Latency and outcome of every request, grouped by endpoint name
+    """
+
+    def __init__(self):
+        self.endpoints: Dict[str, EndpointStats] = {}
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, endpoint: str, seconds: float, status: str, ok: bool):
+        self.endpoints.setdefault(endpoint, EndpointStats()).record(seconds, status, ok)
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def report(self) -> dict:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        endpoints = {}
+        for name, stats in sorted(self.endpoints.items()):
+            latencies = np.array(stats.latencies) * 1000
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+            endpoints[name] = {
+                "requests": len(latencies),
+                "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "p99_ms": round(float(p99), 2),
+                "max_ms": round(float(latencies.max()), 2) if len(latencies) else 0.0,
+                "error_rate": round(stats.errors / len(latencies), 4) if len(latencies) else 0.0,
+                "statuses": stats.statuses,
+            }
+        return {"elapsed_s": round(elapsed, 2), "endpoints": endpoints}
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"elapsed {report['elapsed_s']} s",
+        f"{'endpoint':<28} {'requests':>9} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}",
+    ]
+    for name, row in report["endpoints"].items():
+        lines.append(
+            f"{name:<28} {row['requests']:>9} {row['throughput_rps']:>8.1f} {row['p50_ms']:>8.1f} "
+            f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f} {row['error_rate']:>7.2%}"
+        )
+    return "\n".join(lines)
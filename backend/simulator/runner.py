@@ -0,0 +1,183 @@
+import asyncio
+import contextlib
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional
+
+import httpx
+
+from simulator.fleet import Bus, RouteTrack, generated_routes
+from simulator.metrics import Recorder
+
+ASGI_TARGET = "asgi"
+
+
+class SimulationConfig:
+    def __init__(
+        self,
+        target: str = ASGI_TARGET,
+        buses: int = 50,
+        duration_s: float = 60.0,
+        fix_interval_s: float = 5.0,
+        speed_kmh: float = 35.0,
+        time_scale: float = 1.0,
+        search_rate: float = 0.0,
+        routes: int = 10,
+        generate_routes: bool = False,
+        max_inflight: int = 200,
+        seed: Optional[int] = None,
+        cleanup: bool = False,
+    ):
+        self.target = target
+        self.buses = buses
+        self.duration_s = duration_s
+        self.fix_interval_s = fix_interval_s  # wall-clock seconds between fixes of one bus
+        self.speed_kmh = speed_kmh
+        self.time_scale = time_scale  # driving seconds simulated per wall-clock second
+        self.search_rate = search_rate  # passenger searches per second across the fleet
+        self.routes = routes
+        self.generate_routes = generate_routes
+        self.max_inflight = max_inflight
+        self.seed = seed
+        self.cleanup = cleanup
+
+
+# ---------------- Transport ----------------
+@contextlib.asynccontextmanager
+async def open_client(target: str):
+    """
+    httpx client for a running server (base URL) or for the app in-process
+    over ASGI, with the app's startup/shutdown hooks run around it
+    """
+    if target != ASGI_TARGET:
+        async with httpx.AsyncClient(base_url=target, timeout=30.0) as client:
+            yield client
+        return
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://simulator", timeout=30.0) as client:
+            yield client
+
+
+async def timed(client: httpx.AsyncClient, recorder: Recorder, endpoint: str, method: str, url: str, **kwargs):
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except Exception as e:
+        recorder.record(endpoint, time.perf_counter() - started, type(e).__name__, False)
+        return None
+    recorder.record(endpoint, time.perf_counter() - started, str(response.status_code), response.status_code < 400)
+    return response
+
+
+# ---------------- Fleet Setup ----------------
+async def load_tracks(client: httpx.AsyncClient, config: SimulationConfig, rng: random.Random, run_tag: str) -> List[RouteTrack]:
+    tracks = []
+    if not config.generate_routes:
+        response = await client.get("/routes/", params={"geometry": "full", "limit": config.routes})
+        response.raise_for_status()
+        tracks = [track for track in map(RouteTrack, response.json()) if track.usable()]
+    if not tracks:
+        response = await client.post("/routes/bulk", json=generated_routes(config.routes, rng, run_tag))
+        response.raise_for_status()
+        body = response.json()
+        if body["errors"]:
+            print(f"Route generation errors: {body['errors'][:3]}")
+        tracks = [track for track in map(RouteTrack, body["created"]) if track.usable()]
+    if not tracks:
+        raise RuntimeError("No route with usable geometry to drive on")
+    return tracks
+
+
+async def start_sessions(client: httpx.AsyncClient, config: SimulationConfig, tracks: List[RouteTrack],
+                         rng: random.Random, run_tag: str) -> List[Bus]:
+    now = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+    rows = [
+        {
+            "vehicle_id": f"{run_tag}-v{index}",
+            "driver_id": f"{run_tag}-d{index}",
+            "route_id": tracks[index % len(tracks)].route_id,
+            "start_time": now,
+        }
+        for index in range(config.buses)
+    ]
+    buses = []
+    for offset in range(0, len(rows), 2000):
+        chunk = rows[offset:offset + 2000]
+        response = await client.post("/session/bulk", json=chunk)
+        response.raise_for_status()
+        for result in response.json()["results"]:
+            row = chunk[result["index"]]
+            if not result["accepted"]:
+                print(f"Session for {row['vehicle_id']} rejected: {result['error']}")
+                continue
+            track = tracks[(offset + result["index"]) % len(tracks)]
+            buses.append(Bus(track, result["id"], row["driver_id"], config.speed_kmh, random.Random(rng.random())))
+    if not buses:
+        raise RuntimeError("No session could be started")
+    return buses
+
+
+# ---------------- Load ----------------
+async def drive(client: httpx.AsyncClient, recorder: Recorder, bus: Bus, config: SimulationConfig, deadline: float):
+    # Spread the first fixes so buses do not report in lockstep
+    await asyncio.sleep(bus.rng.uniform(0, config.fix_interval_s))
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        fix = bus.advance(config.fix_interval_s * config.time_scale)
+        await timed(client, recorder, "POST /telemetry/", "POST", "/telemetry/", json=fix)
+        await asyncio.sleep(max(0.0, config.fix_interval_s - (time.perf_counter() - started)))
+
+
+async def search(client: httpx.AsyncClient, recorder: Recorder, buses: List[Bus], config: SimulationConfig,
+                 rng: random.Random, deadline: float):
+    inflight = set()
+    limit = asyncio.Semaphore(config.max_inflight)
+
+    async def one(payload: dict):
+        async with limit:
+            await timed(client, recorder, "POST /passenger/search-buses", "POST", "/passenger/search-buses", json=payload)
+
+    while True:
+        # Poisson arrivals at search_rate per second
+        await asyncio.sleep(rng.expovariate(config.search_rate))
+        if time.perf_counter() >= deadline:
+            break
+        payload = rng.choice(buses).search_request()
+        if payload is None:
+            continue
+        task = asyncio.create_task(one(payload))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+    if inflight:
+        await asyncio.gather(*inflight)
+
+
+async def run(config: SimulationConfig) -> dict:
+    """
+    Set up routes and sessions, drive the fleet for `duration_s` and return
+    the per-endpoint report
+    """
+    rng = random.Random(config.seed)
+    run_tag = f"sim-{uuid.UUID(int=rng.getrandbits(128)).hex[:8]}"
+    async with open_client(config.target) as client:
+        tracks = await load_tracks(client, config, rng, run_tag)
+        buses = await start_sessions(client, config, tracks, rng, run_tag)
+        print(f"{len(buses)} buses on {len(tracks)} routes, running {config.duration_s:.0f} s against {config.target}")
+
+        recorder = Recorder()
+        deadline = time.perf_counter() + config.duration_s
+        workers = [drive(client, recorder, bus, config, deadline) for bus in buses]
+        if config.search_rate > 0:
+            workers.append(search(client, recorder, buses, config, rng, deadline))
+        await asyncio.gather(*workers)
+        recorder.stop()
+
+        if config.cleanup:
+            for bus in buses:
+                await client.delete(f"/session/{bus.session_id}")
+    return recorder.report()
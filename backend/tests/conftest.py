@@ -0,0 +1,58 @@
+"""
+Tests run without MongoDB or an Ethereum node: before app.config is imported,
+Motor is swapped for mongomock-motor and web3 for an offline stand-in.
+"""
+import asyncio
+import os
+import sys
+import types
+
+import motor.motor_asyncio
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("RPC_URL", "http://localhost:8545")
+os.environ.setdefault("CONTRACT_ADDRESS", "0x" + "1" * 40)
+os.environ.setdefault("ANCHOR_PROVIDER", "mock")
+os.environ.setdefault("PUBSUB_BACKEND", "local")
+os.environ.setdefault("AUDIT_SPILL_PATH", "")
+
+motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+
+
+class _OfflineWeb3:
+    HTTPProvider = staticmethod(lambda url: url)
+
+    def __init__(self, provider=None):
+        self.provider = provider
+        self.eth = types.SimpleNamespace(contract=lambda address=None, abi=None: types.SimpleNamespace(address=address, abi=abi))
+
+    def is_connected(self):
+        return True
+
+    is_address = staticmethod(lambda value: isinstance(value, str) and value.startswith("0x") and len(value) == 42)
+    to_checksum_address = staticmethod(lambda value: value)
+
+
+sys.modules["web3"] = types.SimpleNamespace(Web3=_OfflineWeb3)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+@pytest.fixture
+def db():
+    """
+    The app database, emptied before each test
+    """
+    from app.config import db as database
+
+    async def clear():
+        for name in await database.list_collection_names():
+            await database[name].delete_many({})
+
+    run(clear())
+    return database
@@ -0,0 +1,64 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.services.anchoring import ANCHOR_COLLECTION, AnchoringService, MockAnchorProvider
+from conftest import run
+
+TIMEOUT = 60
+
+
+class SlowProvider(MockAnchorProvider):
+    def __init__(self):
+        super().__init__()
+        self.submitted = []
+
+    async def submit(self, root: str, anchor: dict) -> str:
+        self.submitted.append(anchor["_id"])
+        await asyncio.sleep(0.05)  # the receipt is still on its way
+        return await super().submit(root, anchor)
+
+
+def pending_anchor(anchor_id: int, created_ago: float, attempted_ago: float = None) -> dict:
+    now = datetime.utcnow()
+    anchor = {
+        "_id": anchor_id,
+        "audit_from_seq": 1,
+        "audit_to_seq": 0,
+        "provider": "mock",
+        "status": "pending",
+        "root": "ab" * 32,
+        "attempts": 1,
+        "created_at": now - timedelta(seconds=created_ago),
+    }
+    if attempted_ago is not None:
+        anchor["attempted_at"] = now - timedelta(seconds=attempted_ago)
+    return anchor
+
+
+def test_recent_submit_is_not_retried_however_old_the_anchor(db):
+    provider = SlowProvider()
+    service = AnchoringService(provider, interval=1, max_leaves=10, receipt_timeout=TIMEOUT)
+    run(ANCHOR_COLLECTION.insert_one(pending_anchor(1, created_ago=10 * TIMEOUT, attempted_ago=TIMEOUT / 2)))
+
+    run(service._retry_pending())
+
+    assert provider.submitted == []
+
+
+def test_stale_anchor_is_retried_by_one_worker(db):
+    provider = SlowProvider()
+    workers = [AnchoringService(provider, interval=1, max_leaves=10, receipt_timeout=TIMEOUT) for _ in range(3)]
+    run(ANCHOR_COLLECTION.insert_many([
+        pending_anchor(1, created_ago=3 * TIMEOUT, attempted_ago=2 * TIMEOUT),
+        pending_anchor(2, created_ago=3 * TIMEOUT),  # from before attempted_at was stored
+    ]))
+
+    async def retry_everywhere():
+        await asyncio.gather(*(worker._retry_pending() for worker in workers))
+
+    run(retry_everywhere())
+
+    assert sorted(provider.submitted) == [1, 2]
+    anchors = run(ANCHOR_COLLECTION.find({}).sort("_id", 1).to_list(None))
+    assert [anchor["status"] for anchor in anchors] == ["anchored", "anchored"]
+    assert all(anchor["attempted_at"] > datetime.utcnow() - timedelta(seconds=TIMEOUT) for anchor in anchors)
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+from app.services.schedule import ScheduleIndex
+from conftest import run
+
+NOW = datetime.utcnow().replace(microsecond=0)
+
+
+def session(session_id: int, start: datetime, hours: float, driver_id: str, vehicle_id: str = "V1") -> dict:
+    return {
+        "id": session_id,
+        "driver_id": driver_id,
+        "vehicle_id": vehicle_id,
+        "start_time": start,
+        "interval_end": start + timedelta(hours=hours),
+    }
+
+
+def test_changes_made_during_a_load_survive_the_swap(db, monkeypatch):
+    run(db.sessions.insert_many([session(1, NOW, 2, "7"), session(2, NOW + timedelta(days=1), 2, "8", "V2")]))
+    index = ScheduleIndex(db.sessions, 0)
+    added = session(3, NOW + timedelta(days=2), 2, "9", "V3")
+    find = index.collection.find
+
+    def find_while_writing(query, projection=None):
+        async def docs():
+            async for doc in find(query, projection):
+                yield doc
+                if added["id"] not in index.sessions:
+                    # Another request writes while the load is still reading
+                    index.add(added)
+                    index.remove("2")
+
+        return docs()
+
+    monkeypatch.setattr(index.collection, "find", find_while_writing)
+    run(index.load())
+
+    assert sorted(index.sessions) == ["1", "3"]
+    assert index.conflicts({"driver_id": "9"}, added["start_time"], added["interval_end"])
+    assert index._journal is None
+
+
+def test_load_skips_long_ended_sessions_but_check_still_finds_them(db):
+    old = session(1, NOW - timedelta(days=30), 2, "7")
+    current = session(2, NOW - timedelta(hours=1), 3, "8", "V2")
+    legacy = {"id": 3, "driver_id": "9", "vehicle_id": "V3", "start_time": NOW + timedelta(hours=5)}
+    run(db.sessions.insert_many([old, current, legacy]))
+    index = ScheduleIndex(db.sessions, 0)
+
+    run(index.load())
+
+    assert sorted(index.sessions) == ["2", "3"]
+    assert run(db.sessions.find_one({"id": 3}))["interval_end"] == legacy["start_time"]
+    found = run(index.check({"driver_id": "7"}, old["start_time"], old["interval_end"]))
+    assert [interval.session_id for _, interval in found] == ["1"]
@@ -0,0 +1,106 @@
+import time
+
+import pytest
+
+from app.crud import search
+from app.services.live_state import live_state
+from app.services.stop_index import stop_index
+from conftest import run
+
+# A corridor this busy used to take hundreds of sequential queries
+SEARCH_LATENCY_BUDGET_S = 0.5
+ROUND_TRIPS = 4  # routes, active sessions, drivers, live positions
+
+
+class QueryCounter:
+    """
+    Counts queries sent through every collection of the database
+    """
+
+    def __init__(self, monkeypatch, database):
+        self.calls = []
+        collection_type = type(database.routes)
+        for method in ("find", "find_one", "aggregate", "count_documents"):
+            original = getattr(collection_type, method)
+            monkeypatch.setattr(collection_type, method, self._counting(method, original))
+
+    def _counting(self, method, original):
+        def counted(collection, *args, **kwargs):
+            self.calls.append((collection.name, method))
+            return original(collection, *args, **kwargs)
+
+        return counted
+
+
+def seed_corridor(database, routes: int, buses_per_route: int):
+    async def insert():
+        stops = [{"name": f"Stop {i}", "latitude": 30.90 + i * 0.01, "longitude": 75.0} for i in range(10)]
+        await database.routes.insert_many([
+            {
+                "id": route_id,
+                "route_name": f"R{route_id}",
+                "estimated_time": 60,
+                "source": {"name": "Jalandhar", "latitude": 30.89, "longitude": 75.0},
+                "destination": {"name": "Ludhiana", "latitude": 31.0, "longitude": 75.0},
+                "route_points": stops,
+            }
+            for route_id in range(1, routes + 1)
+        ])
+        await database.drivers.insert_many([{"id": d, "name": f"Driver {d}"} for d in range(1, routes * buses_per_route + 1)])
+        sessions = []
+        for route_id in range(1, routes + 1):
+            for bus in range(buses_per_route):
+                session_id = len(sessions) + 1
+                sessions.append({
+                    "id": session_id,
+                    "route_id": str(route_id),
+                    "vehicle_id": str(session_id),
+                    "driver_id": str(session_id),
+                    "end_time": None,
+                    "gps_history": [{"lat": 30.90 + bus * 0.0005, "lng": 75.0, "speed": 30.0, "timestamp": "2024-01-01T08:00:00"}],
+                })
+        await database.sessions.insert_many(sessions)
+
+    run(insert())
+    live_state.tracks.clear()
+    for route_id in list(stop_index.route_stops):
+        stop_index.remove_route(route_id)
+
+
+def timed_search(**kwargs):
+    started = time.perf_counter()
+    result = run(search.search_buses("Ludhiana", **kwargs))
+    return result, time.perf_counter() - started
+
+
+@pytest.mark.parametrize("routes,buses_per_route", [(2, 5), (20, 25)])
+def test_search_makes_constant_round_trips(db, monkeypatch, routes, buses_per_route):
+    seed_corridor(db, routes, buses_per_route)
+    counter = QueryCounter(monkeypatch, db)
+
+    result, _ = timed_search(bus_stop="Stop 5")
+
+    assert len(result["buses"]) == routes * buses_per_route
+    assert len(counter.calls) == ROUND_TRIPS, counter.calls
+
+
+def test_search_by_location_makes_constant_round_trips(db, monkeypatch):
+    seed_corridor(db, 20, 25)
+    counter = QueryCounter(monkeypatch, db)
+
+    result, _ = timed_search(current_lat=30.951, current_lng=75.0)
+
+    assert result["nearest_stop"] == "Stop 5"
+    assert len(result["buses"]) == 500
+    assert len(counter.calls) == ROUND_TRIPS, counter.calls
+
+
+def test_busy_corridor_search_within_latency_budget(db):
+    seed_corridor(db, 20, 25)
+    timed_search(bus_stop="Stop 5")  # warm the live state cache, as in steady state
+
+    result, elapsed = timed_search(bus_stop="Stop 5")
+
+    assert len(result["buses"]) == 500
+    assert all(bus["eta_minutes"] is not None for bus in result["buses"])
+    assert elapsed < SEARCH_LATENCY_BUDGET_S, f"search took {elapsed:.3f}s"
@@ -0,0 +1,51 @@
+import pytest
+from pymongo.errors import BulkWriteError
+
+from app.crud import telemetry
+from app.services.archive import telemetry_archive
+from app.services.live_state import live_state
+from app.services.pubsub import TELEMETRY_CHANNEL, pubsub
+from conftest import run
+
+SESSION_ID = "41"
+
+
+@pytest.fixture
+def session(db):
+    run(db.sessions.insert_one({"id": int(SESSION_ID), "driver_id": "7", "vehicle_id": "V1", "status": "active"}))
+    live_state.tracks.clear()
+    live_state.dirty.clear()
+    telemetry_archive.pending.clear()
+    return db
+
+
+def fix(latitude: float, **extra) -> dict:
+    return {"session_id": SESSION_ID, "driver_id": "7", "latitude": latitude, "longitude": 75.8, "speed": 20, **extra}
+
+
+def test_failed_writes_are_rejected_and_never_published(session, monkeypatch):
+    original = telemetry.TELEMETRY_COLLECTION.insert_many
+
+    async def insert_failing_second(records, ordered=True):
+        await original([r for i, r in enumerate(records) if i != 1], ordered=ordered)
+        raise BulkWriteError({"writeErrors": [{"index": 1, "code": 11000, "errmsg": "duplicate key"}], "nInserted": 2})
+
+    monkeypatch.setattr(telemetry.TELEMETRY_COLLECTION, "insert_many", insert_failing_second)
+    published = []
+    monkeypatch.setitem(pubsub.handlers, TELEMETRY_CHANNEL, [published.append])
+
+    report = run(telemetry.create_telemetry_batch([fix(30.90), fix(30.91), fix(30.92), fix(91.0)]))
+
+    assert report["accepted"] == 2 and report["rejected"] == 2
+    assert [r["accepted"] for r in report["results"]] == [True, False, True, False]
+    assert "duplicate key" in report["results"][1]["error"]
+    assert report["results"][3]["error"] == "Invalid GPS coordinates"
+    assert [event["latitude"] for event in published] == [30.90, 30.92]
+    assert [point["lat"] for point in run(live_state.get_history(SESSION_ID))] == [30.90, 30.92]
+    assert [record["latitude"] for record in telemetry_archive.pending] == [30.90, 30.92]
+
+
+def test_single_fix_is_validated_like_a_batch(session):
+    with pytest.raises(ValueError, match="Invalid GPS coordinates"):
+        run(telemetry.create_telemetry_transmission(fix(120.0)))
+    assert run(session.telemetry.count_documents({})) == 0
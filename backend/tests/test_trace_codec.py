@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.utils.export import _trace_frames
+from app.utils.trace_codec import block_header, decode_block, decode_stream, encode_block, fix_time
+from conftest import run
+
+START = datetime(2026, 1, 5, 6, 30)
+
+
+def trace(n: int, step_ms: int = 1000) -> list:
+    return [
+        {
+            "timestamp": START + timedelta(milliseconds=i * step_ms),
+            "latitude": 30.9 + i * 0.0001,
+            "longitude": 75.8 - i * 0.0001,
+            "speed": 30 + i * 0.5,
+        }
+        for i in range(n)
+    ]
+
+
+def assert_same(original: list, decoded: list):
+    assert len(decoded) == len(original)
+    for fix, expected in zip(decoded, original):
+        assert fix["timestamp"] == fix_time(expected)
+        assert fix["latitude"] == pytest.approx(expected["latitude"], abs=0.5e-6)
+        assert fix["longitude"] == pytest.approx(expected["longitude"], abs=0.5e-6)
+        assert fix["speed"] == pytest.approx(expected["speed"], abs=0.05)
+        assert ("chainage_m" in fix) == (expected.get("chainage_m") is not None)
+        if "chainage_m" in fix:
+            assert fix["chainage_m"] == pytest.approx(expected["chainage_m"], abs=0.05)
+            assert fix["off_route_m"] == pytest.approx(expected["off_route_m"], abs=0.05)
+
+
+def test_empty_block_is_rejected():
+    with pytest.raises(ValueError):
+        encode_block([])
+
+
+def test_single_fix_round_trip_with_tags():
+    fixes = trace(1)
+    block = encode_block(fixes, {"session_id": "12"})
+    decoded = decode_block(block)
+    assert_same(fixes, decoded)
+    assert decoded[0]["session_id"] == "12"
+    assert block_header(block) == {"version": 1, "flags": 0, "count": 1, "tags": {"session_id": "12"}, "start": START}
+
+
+def test_negative_deltas_round_trip():
+    # Out-of-order device times and a bus heading back south-east
+    fixes = trace(6)
+    fixes[3]["timestamp"], fixes[4]["timestamp"] = fixes[4]["timestamp"], fixes[3]["timestamp"]
+    fixes[5]["timestamp"] = START - timedelta(seconds=30)
+    fixes[2]["latitude"] -= 0.01
+    fixes[2]["longitude"] += 0.01
+    assert_same(fixes, decode_block(encode_block(fixes)))
+
+
+def test_partial_chainage_round_trip():
+    fixes = trace(11)
+    for i, fix in enumerate(fixes):
+        if i % 3:
+            fix["chainage_m"] = 1500 - i * 12.3  # chainage can step backwards too
+            fix["off_route_m"] = i * 0.7
+    block = encode_block(fixes)
+    assert block_header(block)["flags"] == 1
+    assert_same(fixes, decode_block(block))
+
+
+def test_device_time_is_encoded_over_received_at():
+    received = START + timedelta(minutes=5)
+    fixes = [
+        {**trace(1)[0], "timestamp": "2026-01-05T12:00:00+05:30", "received_at": received},
+        {**trace(1)[0], "timestamp": "not a time", "received_at": received},
+        {**trace(1)[0], "timestamp": None, "received_at": received},
+    ]
+    times = [fix["timestamp"] for fix in decode_block(encode_block(fixes))]
+    assert times == [START, received, received]
+    with pytest.raises(ValueError):
+        encode_block([{**trace(1)[0], "timestamp": None}])
+
+
+def test_trace_export_skips_rows_without_a_time():
+    rows = [
+        {"session_id": "1", "latitude": 30.9, "longitude": 75.8, "speed": 10, "timestamp": START.isoformat()},
+        {"session_id": "1", "latitude": 30.9, "longitude": 75.8, "speed": 10},
+        {"session_id": "1", "latitude": 30.9, "longitude": 75.8, "speed": 10, "received_at": START},
+    ]
+
+    async def rows_cursor():
+        for row in rows:
+            yield row
+
+    async def collect():
+        return b"".join([block async for block in _trace_frames(rows_cursor(), dict)])
+
+    decoded = decode_stream(run(collect()))
+    assert [fix["timestamp"] for fix in decoded] == [START, START]
+    assert all(fix["session_id"] == "1" for fix in decoded)
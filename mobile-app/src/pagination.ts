@@ -0,0 +1,17 @@
+// List endpoints return one page at a time and put the cursor of the next
+// page in the X-Next-Cursor header; follow it until the list is complete.
+const PAGE_LIMIT = 1000;
+
+export async function fetchAllPages<T = any>(url: string): Promise<T[]> {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const params = new URLSearchParams({ limit: String(PAGE_LIMIT) });
+    if (cursor) params.set("cursor", cursor);
+    const res = await fetch(`${url}${url.includes("?") ? "&" : "?"}${params}`);
+    if (!res.ok) throw new Error(`Request failed: ${res.status}`);
+    items.push(...(await res.json()));
+    cursor = res.headers.get("x-next-cursor");
+  } while (cursor);
+  return items;
+}
@@ -9,6 +9,7 @@ import {
   Alert,
 } from "react-native";
 import Constants from "expo-constants";
+import { fetchAllPages } from "../pagination";
 
 // ✅ Get API base URL from app.config.js
 const API_BASE_URL = Constants.expoConfig?.extra?.API_BASE_URL as string;
@@ -38,9 +39,7 @@ export default function ConductorDashboardScreen() {
 
   async function fetchSessions() {
     try {
-      const res = await fetch(`${API_BASE_URL}/session/`);
-      if (!res.ok) throw new Error("Sessions fetch failed");
-      const allSessions = await res.json();
+      const allSessions = await fetchAllPages(`${API_BASE_URL}/session/`);
 
       const now = new Date();
       const threeDaysLater = new Date(now.getTime() + 3 * 24 * 60 * 60 * 1000);
@@ -11,6 +11,7 @@ import { useNavigation, useFocusEffect } from "@react-navigation/native";
 import { NativeStackNavigationProp } from "@react-navigation/native-stack";
 import Constants from "expo-constants";
 import { RootStackParamList } from "../../App"; // adjust the path if needed
+import { fetchAllPages } from "../pagination";
 
 // ✅ Pull API URL from app.config.js
 const API_BASE_URL = Constants.expoConfig?.extra?.API_BASE_URL as string;
@@ -78,9 +79,7 @@ export default function DriverDashboardScreen() {
 
   async function fetchSessions() {
     try {
-      const res = await fetch(`${API_BASE_URL}/session/`);
-      if (!res.ok) throw new Error("Session request failed");
-      const allSessions = await res.json();
+      const allSessions = await fetchAllPages(`${API_BASE_URL}/session/`);
       const driverSessions = allSessions.filter(
         (s: any) => String(s.driver_id) === String(DRIVER_ID)
       );
@@ -13,6 +13,7 @@ import {
 } from "react-native";
 import * as Location from "expo-location";
 import Constants from "expo-constants";
+import { fetchAllPages } from "../pagination";
 
 const defaultImage = require("../assets/default_driver.jpg");
 
@@ -58,8 +59,7 @@ export default function PassengerDashboardScreen({
   useEffect(() => {
     (async () => {
       try {
-        const res = await fetch(`${Constants.expoConfig?.extra?.API_BASE_URL}/routes/`);
-        const data: Route[] = await res.json();
+        const data = await fetchAllPages<Route>(`${Constants.expoConfig?.extra?.API_BASE_URL}/routes/`);
 
         setDestOptions([
           ...new Set(